@@ -29,10 +29,15 @@ from util.feedback import feedback_bp
 from util.notification import notification_bp, init_app as init_notification_app
 from util.materials import materials_bp, init_app as init_materials
 from util.stats_api import stats_api_bp, init_app as init_stats_api
+from util.event_stream import event_stream_bp
+from util.upload_stream import StreamingRequest
+from util import mail_outbox
 from flask import render_template, redirect, url_for
 
 def create_app():
     app = Flask(__name__)
+    # 上传文件在解析请求体时直接写入上传目录并计算校验和
+    app.request_class = StreamingRequest
 
     # 客户端下载页面路由
     @app.route('/download')
@@ -85,16 +90,28 @@ def create_app():
     app.register_blueprint(notification_bp)
     app.register_blueprint(materials_bp)  # 添加课程资料蓝图
     app.register_blueprint(stats_api_bp)  # 添加统计API蓝图
+    app.register_blueprint(event_stream_bp)  # 服务器推送事件
 
     # 初始化通知系统
     init_notification_app(app)
     init_materials(app)  # 初始化课程资料模块
     init_stats_api(app)  # 初始化统计API模块
+
+    # 启动邮件发送线程，继续发送上次退出前未发送完的邮件
+    mail_outbox.start_sender()
     
     # 添加请求日志中间件
     @app.before_request
     def log_request_info():
+        # 读取请求体会把上传文件整个载入内存，并使流式上传的大小限制失效，
+        # 因此只在调试日志开启时记录，且不读取文件上传请求的请求体
+        if not app.logger.isEnabledFor(logging.DEBUG):
+            return
         app.logger.debug('Headers: %s', dict(request.headers))
+        app.logger.debug('Request: %s %s', request.method, request.path)
+        if request.mimetype == 'multipart/form-data':
+            app.logger.debug('Body: <multipart data: %s bytes>', request.content_length)
+            return
         # 优雅之处理请求体日志，避免二进制文件内容污染日志
         raw_data = request.get_data()
         if raw_data:
@@ -105,11 +122,8 @@ def create_app():
                 app.logger.debug('Body: (text, %d bytes): %s', len(raw_data), snippet)
             except UnicodeDecodeError:
                 app.logger.debug('Body: <binary data: %d bytes>', len(raw_data))
-        app.logger.debug('Request: %s %s', request.method, request.path)
         if request.form:
             app.logger.debug('Form data: %s', dict(request.form))
-        if request.files:
-            app.logger.debug('Files: %s', request.files.keys())
     
     # 应用启动前，确保配置文件存在
     @app.before_first_request
@@ -121,13 +135,13 @@ def create_app():
             
             # 初始化所需的文件
             from util.utils import load_course_config
-            from util.models import save_users
+            from util.models import load_users, save_users
             
             # 加载课程配置
             load_course_config()
             
-            # 确保用户数据文件存在
-            if not os.path.exists('data/users.json'):
+            # 确保用户数据存在（使用SQLite后端时不会覆盖已有用户）
+            if not load_users():
                 save_users({})
                 
             # 确保提交记录文件存在
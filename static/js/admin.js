@@ -34,6 +34,8 @@ window.addEventListener('DOMContentLoaded', function() {
     // 按钮
     const addAssignmentBtn = document.getElementById('addAssignmentBtn');
     const downloadAllBtn = document.getElementById('downloadAllBtn');
+    const downloadCourseBtn = document.getElementById('downloadCourseBtn');
+    const exportCourseStatsBtn = document.getElementById('exportCourseStatsBtn');
     const exportSubmissionsBtn = document.getElementById('exportSubmissionsBtn');
     
     // 弹窗表单元素
@@ -188,6 +190,35 @@ window.addEventListener('DOMContentLoaded', function() {
         }, 5000);
     }
     
+    /**
+     * 轮询批量通知的发送进度，按班级显示已发送数量，完成后显示结果
+     * @param {string} runId - 发送任务ID
+     */
+    function pollNotificationRun(runId) {
+        fetch(`/admin/notification_runs/${encodeURIComponent(runId)}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status !== 'success') return;
+                
+                const groups = Object.entries(data.run.groups);
+                const summary = groups
+                    .map(([className, counts]) => `${className}: ${counts.success + counts.failed}/${counts.total}`)
+                    .join('，');
+                
+                if (data.run.status === 'finished') {
+                    const failed = groups.reduce((sum, [, counts]) => sum + counts.failed, 0);
+                    const results = groups
+                        .map(([className, counts]) => `${className}: 成功 ${counts.success}/${counts.total}`)
+                        .join('，');
+                    showToast(`通知邮件发送完成（${results}）`, failed ? 'warning' : 'success');
+                } else {
+                    showToast(`通知邮件发送中（${summary}）`, 'info');
+                    setTimeout(() => pollNotificationRun(runId), 3000);
+                }
+            })
+            .catch(error => console.error('Error loading notification progress:', error));
+    }
+    
     // region 标签页切换
     if (tabButtons) {
         console.info(tabButtons);
@@ -862,7 +893,10 @@ window.addEventListener('DOMContentLoaded', function() {
 
                 // Check notification status and show appropriate message
                 if (data.notification === 'success') {
-                    showToast('作业创建成功，通知邮件已发送给相关班级的学生', 'success');
+                    showToast('作业创建成功，正在向相关班级的学生发送通知邮件', 'success');
+                    if (data.notification_run) {
+                        pollNotificationRun(data.notification_run);
+                    }
                 } else if (data.notification === 'failed') {
                     showToast('作业已创建，但发送通知邮件失败，请检查日志', 'warning');
                 } else if (data.notification === 'error') {
@@ -904,6 +938,7 @@ window.addEventListener('DOMContentLoaded', function() {
         const maxFileSize = document.getElementById('maxFileSize') ? document.getElementById('maxFileSize').value : 256;
         const fileSizeUnit = document.getElementById('fileSizeUnit') ? document.getElementById('fileSizeUnit').value : 'MB';
         const dailyQuota = document.getElementById('dailyQuota') ? document.getElementById('dailyQuota').value : 1;
+        const reminderOffsets = document.getElementById('reminderOffsets') ? document.getElementById('reminderOffsets').value : '';
         const enableGrading = document.getElementById('enableGrading') ? document.getElementById('enableGrading').checked : false;
         const enableFeedback = document.getElementById('enableFeedback') ? document.getElementById('enableFeedback').checked : false;
         
@@ -934,6 +969,9 @@ window.addEventListener('DOMContentLoaded', function() {
             maxFileSize: parseInt(maxFileSize) || 256,
             fileSizeUnit: fileSizeUnit || 'MB',
             dailyQuota: parseInt(dailyQuota) || 1,
+            reminderOffsets: reminderOffsets.split(',')
+                .map(value => parseFloat(value))
+                .filter(value => value > 0),
             allowedTypes: allowedTypes,
             enableGrading: enableGrading,
             enableFeedback: enableFeedback
@@ -962,6 +1000,11 @@ window.addEventListener('DOMContentLoaded', function() {
             document.getElementById('dailyQuota').value = settings.dailyQuota;
         }
         
+        // 设置截止提醒时间
+        if (document.getElementById('reminderOffsets')) {
+            document.getElementById('reminderOffsets').value = (settings.reminderOffsets || [72, 24, 2]).join(',');
+        }
+        
         // 设置文件类型
         if (settings.allowedTypes && settings.allowedTypes.length > 0) {
             const typeGroups = {
@@ -1041,6 +1084,10 @@ window.addEventListener('DOMContentLoaded', function() {
             document.getElementById('dailyQuota').value = 1;
         }
         
+        if (document.getElementById('reminderOffsets')) {
+            document.getElementById('reminderOffsets').value = '72,24,2';
+        }
+        
         // 文件类型 - 全选
         document.querySelectorAll('input[name="allowedTypes"]').forEach(cb => {
             cb.checked = true;
@@ -1498,6 +1545,17 @@ window.addEventListener('DOMContentLoaded', function() {
         loadSubmissions(courseValue, classValue, assignmentValue);
     }
     
+    // 服务器推送：正在查看的作业有新的提交或删除时刷新提交记录
+    if (window.liveEvents) {
+        liveEvents.on('submission_count', data => {
+            if (data.course === submissionCourseFilter.value &&
+                data.class_name === submissionClassFilter.value &&
+                data.assignment === submissionAssignmentFilter.value) {
+                loadSubmissions(data.course, data.class_name, data.assignment);
+            }
+        });
+    }
+    
     // 下载所有提交按钮
     if (downloadAllBtn) {
         downloadAllBtn.addEventListener('click', () => {
@@ -1515,6 +1573,36 @@ window.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // 下载整门课程按钮
+    if (downloadCourseBtn) {
+        downloadCourseBtn.addEventListener('click', () => {
+            const courseValue = submissionCourseFilter ? submissionCourseFilter.value : '';
+            const classValue = submissionClassFilter ? submissionClassFilter.value : '';
+            
+            if (!courseValue || !classValue) {
+                showToast('请先选择班级和课程', 'error');
+                return;
+            }
+            
+            window.location.href = `/admin/download_course?class_name=${encodeURIComponent(classValue)}&course=${encodeURIComponent(courseValue)}`;
+        });
+    }
+
+    // 导出整门课程统计按钮（汇总矩阵 + 每个作业一个工作表）
+    if (exportCourseStatsBtn) {
+        exportCourseStatsBtn.addEventListener('click', () => {
+            const courseValue = submissionCourseFilter ? submissionCourseFilter.value : '';
+            const classValue = submissionClassFilter ? submissionClassFilter.value : '';
+            
+            if (!courseValue || !classValue) {
+                showToast('请先选择班级和课程', 'error');
+                return;
+            }
+            
+            window.location.href = `/admin/export-course-stats?class_name=${encodeURIComponent(classValue)}&course=${encodeURIComponent(courseValue)}`;
+        });
+    }
+
     //region 班级管理
 
     // 加载班级列表
@@ -331,6 +331,8 @@ function createPopoverContent(chartId, popoverId, course, assignment, submission
     popover.id = popoverId;
     popover.setAttribute('role', 'tooltip');
     popover.className = 'absolute z-50 hidden transition-opacity duration-300 bg-white border border-gray-200 rounded-lg shadow-lg dark:text-gray-400 dark:bg-gray-800 dark:border-gray-600 popover-chart';
+    popover.dataset.course = course;
+    popover.dataset.assignment = assignment;
     popover.style.width = '320px';
     popover.style.opacity = '0';
     popover.style.visibility = 'hidden';
@@ -340,7 +342,7 @@ function createPopoverContent(chartId, popoverId, course, assignment, submission
             <div class="flex justify-between mb-2">
                 <div class="mb-2">
                     <h5 class="text-xl font-bold leading-none text-gray-900 dark:text-white">
-                        ${course} ${submissionCount}/${totalStudents}
+                        ${course} <span class="submission-count">${submissionCount}</span>/${totalStudents}
                     </h5>
                     <p class="text-sm font-normal text-gray-500">提交数量</p>
                 </div>
@@ -368,6 +370,23 @@ function createPopoverContent(chartId, popoverId, course, assignment, submission
     return popover;
 }
 
+/**
+ * Update submission counts pushed by the server (submission_count event)
+ * @param {Object} data - { course, assignment, total }
+ */
+function updateSubmissionCount(data) {
+    document.querySelectorAll('.popover-chart').forEach(popover => {
+        if (popover.dataset.course !== data.course || popover.dataset.assignment !== data.assignment) return;
+        
+        const count = popover.querySelector('.submission-count');
+        if (count) count.textContent = data.total;
+        
+        // Clear the rendered chart so it is fetched again on the next hover
+        const chartElement = popover.querySelector('.chart-container');
+        if (chartElement) chartElement.innerHTML = '';
+    });
+}
+
 /**
  * Fetch submission data from API and render chart
  * @param {string} chartId - ID of the chart container
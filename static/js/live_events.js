@@ -0,0 +1,56 @@
+/**
+ * live_events.js - 服务器推送事件
+ *
+ * 通过 EventSource 连接 /events，接收服务器推送的数据变化，
+ * 页面不再需要反复请求通知列表、作业列表和提交统计。
+ * 断线后浏览器会自动重连，并通过 Last-Event-ID 补收断线期间的事件。
+ *
+ * 事件类型：
+ * - notification: 管理员发布了新通知
+ * - submission_count: 作业的提交数发生变化
+ * - upload_complete: 当前用户的文件上传处理完成
+ *
+ * 用法: liveEvents.on('submission_count', data => { ... });
+ */
+
+window.liveEvents = (function() {
+    const handlers = {};
+    let source = null;
+
+    function connect() {
+        if (source || typeof EventSource === 'undefined') return;
+
+        source = new EventSource('/events');
+        source.onerror = function() {
+            // 会话过期等原因导致连接被关闭时不再重连
+            if (source.readyState === EventSource.CLOSED) {
+                console.warn('推送连接已关闭');
+            }
+        };
+        Object.keys(handlers).forEach(listen);
+    }
+
+    function listen(type) {
+        source.addEventListener(type, function(e) {
+            let data;
+            try {
+                data = JSON.parse(e.data);
+            } catch (err) {
+                console.error('推送事件解析失败:', err);
+                return;
+            }
+            handlers[type].forEach(handler => handler(data));
+        });
+    }
+
+    function on(type, handler) {
+        if (!handlers[type]) {
+            handlers[type] = [];
+            if (source) listen(type);
+        }
+        handlers[type].push(handler);
+        connect();
+    }
+
+    return { on: on };
+})();
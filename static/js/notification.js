@@ -27,6 +27,11 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // 设置事件监听器
     setupEventListeners();
+    
+    // 管理员发布新通知时重新加载通知列表
+    if (window.liveEvents) {
+        liveEvents.on('notification', loadNotifications);
+    }
 });
 
 // 创建通知系统UI元素
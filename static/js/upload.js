@@ -126,6 +126,20 @@ document.addEventListener('DOMContentLoaded', function() {
     } else {
         console.error("找不到状态筛选器元素");
     }
+    // 服务器推送：上传完成后刷新当前显示的作业列表或提交记录，提交数变化时更新图表弹窗
+    if (window.liveEvents) {
+        liveEvents.on('upload_complete', () => {
+            const assignmentsTab = document.getElementById('assignmentsListTab');
+            const submissionsTab = document.getElementById('submissionsTab');
+            if (assignmentsTab && assignmentsTab.classList.contains('active')) {
+                loadAllAssignments();
+            } else if (submissionsTab && submissionsTab.classList.contains('active')) {
+                loadMySubmissions();
+            }
+        });
+        liveEvents.on('submission_count', updateSubmissionCount);
+    }
+
     /**
      * 加载所有作业列表
      * 获取所有课程的作业，并按照截止日期、提交状态等进行展示
@@ -1263,8 +1277,22 @@ if (assignmentSelect) {
         progressBar.classList.remove('bg-red-600', 'bg-green-600');
         progressBar.classList.add('bg-blue-600');
         
+        // 大文件使用分片上传，网络中断后只需补传未完成的分片
+        if (file.size >= CHUNKED_UPLOAD_THRESHOLD) {
+            uploadFileChunked(file, courseSelect.value, assignmentSelect.value)
+                .then(() => handleUploadSuccess(fileObj, index))
+                .catch(error => handleUploadError(error.message || '上传失败'));
+            return;
+        }
+        
+        // 课程和作业同时放在查询参数中，服务器可在接收文件前确定大小限制
+        const uploadParams = new URLSearchParams({
+            course: courseSelect.value,
+            assignment_name: assignmentSelect.value
+        });
+        
         const xhr = new XMLHttpRequest();
-        xhr.open('POST', '/', true);
+        xhr.open('POST', `/?${uploadParams.toString()}`, true);
         
         // 进度追踪
         let startTime = Date.now();
@@ -1287,28 +1315,7 @@ if (assignmentSelect) {
             try {
                 const response = JSON.parse(xhr.responseText);
                 if (xhr.status === 200 && response.status === 'success') {
-                    // 从列表中移除已上传的文件
-                    const fileItem = document.querySelector(`.file-item[data-id="${fileObj.id}"]`);
-                    if (fileItem) {
-                        fileItem.classList.add('bg-green-50');
-                        setTimeout(() => {
-                            fileItem.remove();
-                        }, 500);
-                    }
-                    
-                    // 显示成功信息
-                    progressText.textContent = `${file.name} 上传成功`;
-                    progressText.classList.remove('text-gray-600');
-                    progressText.classList.add('text-green-600');
-                    progressBar.classList.remove('bg-blue-600');
-                    progressBar.classList.add('bg-green-600');
-                    
-                    showToast(`${file.name} 上传成功`, 'success');
-                    
-                    // 上传下一个文件
-                    setTimeout(() => {
-                        uploadFile(index + 1);
-                    }, 500);
+                    handleUploadSuccess(fileObj, index);
                 } else {
                     handleUploadError(response.message || '上传失败');
                 }
@@ -1324,6 +1331,161 @@ if (assignmentSelect) {
         xhr.send(formData);
     }
     
+    function handleUploadSuccess(fileObj, index) {
+        const file = fileObj.file;
+        
+        // 从列表中移除已上传的文件
+        const fileItem = document.querySelector(`.file-item[data-id="${fileObj.id}"]`);
+        if (fileItem) {
+            fileItem.classList.add('bg-green-50');
+            setTimeout(() => {
+                fileItem.remove();
+            }, 500);
+        }
+        
+        // 显示成功信息
+        progressText.textContent = `${file.name} 上传成功`;
+        progressText.classList.remove('text-gray-600');
+        progressText.classList.add('text-green-600');
+        progressBar.classList.remove('bg-blue-600');
+        progressBar.classList.add('bg-green-600');
+        
+        showToast(`${file.name} 上传成功`, 'success');
+        
+        // 上传下一个文件
+        setTimeout(() => {
+            uploadFile(index + 1);
+        }, 500);
+    }
+    
+    // ===== 分片上传 =====
+    
+    // 超过该大小的文件使用分片上传
+    const CHUNKED_UPLOAD_THRESHOLD = 20 * 1024 * 1024;
+    // 单个分片的最大重试次数
+    const CHUNK_MAX_RETRIES = 5;
+    
+    async function readJsonResponse(response) {
+        let data = {};
+        try {
+            data = await response.json();
+        } catch (e) {
+            throw new Error('服务器响应异常');
+        }
+        if (!response.ok || data.status !== 'success') {
+            throw new Error(data.message || '上传失败');
+        }
+        return data;
+    }
+    
+    // 上传单个分片，返回 Promise；onProgress 接收本分片已发送的字节数
+    function putChunk(uploadId, index, blob, onProgress) {
+        return new Promise((resolve, reject) => {
+            const xhr = new XMLHttpRequest();
+            xhr.open('PUT', `/upload/${uploadId}/chunk/${index}`, true);
+            xhr.setRequestHeader('Content-Type', 'application/octet-stream');
+            
+            xhr.upload.onprogress = (e) => {
+                if (e.lengthComputable) {
+                    onProgress(e.loaded);
+                }
+            };
+            
+            xhr.onload = () => {
+                let response = {};
+                try {
+                    response = JSON.parse(xhr.responseText);
+                } catch (e) {
+                    // 非JSON响应按可重试的错误处理
+                }
+                if (xhr.status === 200 && response.status === 'success') {
+                    resolve(response);
+                } else {
+                    const error = new Error(response.message || `分片 ${index + 1} 上传失败`);
+                    // 4xx 错误（会话不存在、分片无效等）重试也不会成功
+                    error.fatal = xhr.status >= 400 && xhr.status < 500;
+                    reject(error);
+                }
+            };
+            xhr.onerror = () => reject(new Error('网络错误，上传失败'));
+            
+            xhr.send(blob);
+        });
+    }
+    
+    async function uploadFileChunked(file, course, assignmentName) {
+        progressText.textContent = '准备分片上传...';
+        
+        // 创建或恢复上传会话
+        const session = await readJsonResponse(await fetch('/upload/init', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                course: course,
+                assignment_name: assignmentName,
+                filename: file.name,
+                size: file.size,
+                last_modified: file.lastModified
+            })
+        }));
+        
+        const chunkSize = session.chunk_size;
+        const received = new Set(session.received);
+        const chunkBytes = (i) => Math.min(chunkSize, file.size - i * chunkSize);
+        
+        // 已上传的分片计入进度，速度只统计本次实际发送的数据
+        let uploadedBytes = 0;
+        received.forEach(i => { uploadedBytes += chunkBytes(i); });
+        const resumedBytes = uploadedBytes;
+        const startTime = Date.now();
+        
+        if (received.size > 0) {
+            showToast(`继续上传 ${file.name}（已完成 ${received.size}/${session.total_chunks} 个分片）`, 'success');
+        }
+        
+        const updateProgress = (currentChunkBytes) => {
+            const loaded = uploadedBytes + currentChunkBytes;
+            const percentComplete = (loaded / file.size) * 100;
+            progressBar.style.width = `${percentComplete}%`;
+            progressText.textContent = `上传中: ${percentComplete.toFixed(0)}%`;
+            
+            const elapsedTime = (Date.now() - startTime) / 1000;
+            if (elapsedTime > 0) {
+                const speedInKBps = ((loaded - resumedBytes) / elapsedTime / 1024).toFixed(2);
+                uploadSpeed.textContent = `${speedInKBps} KB/s`;
+            }
+        };
+        updateProgress(0);
+        
+        for (let i = 0; i < session.total_chunks; i++) {
+            if (received.has(i)) {
+                continue;
+            }
+            
+            const blob = file.slice(i * chunkSize, i * chunkSize + chunkBytes(i));
+            
+            for (let attempt = 1; ; attempt++) {
+                try {
+                    await putChunk(session.upload_id, i, blob, updateProgress);
+                    break;
+                } catch (error) {
+                    if (error.fatal || attempt >= CHUNK_MAX_RETRIES) {
+                        throw error;
+                    }
+                    // 指数退避后重试当前分片
+                    progressText.textContent = `网络不稳定，正在重试分片 ${i + 1}（第 ${attempt} 次）...`;
+                    await new Promise(resolve => setTimeout(resolve, 1000 * Math.pow(2, attempt - 1)));
+                }
+            }
+            
+            uploadedBytes += chunkBytes(i);
+            updateProgress(0);
+        }
+        
+        progressText.textContent = '正在合并文件...';
+        return readJsonResponse(await fetch(`/upload/${session.upload_id}/finalize`, { method: 'POST' }));
+    }
+    
     function handleUploadError(message) {
         progressText.textContent = message;
         progressText.classList.remove('text-gray-600');
@@ -14,33 +14,35 @@
 - /submissions: 获取作业提交情况
 - /file/<course>/<assignment>/<folder>/<filename>: 提供文件下载
 - /download: 下载单个学生提交或整个作业的所有提交
+- /download_course: 下载多个作业或整门课程的所有提交
 
 作者: Frank
 版本: 1.0
 日期: 2025-04-04
 """
 
-import json
 import os
-import io
+import tempfile
 import xlsxwriter
 import shutil
 import logging
 import datetime
 from datetime import timedelta
-import zipfile
 from flask import Blueprint, render_template, request, jsonify, send_from_directory, send_file, redirect, url_for
 from flask_login import current_user
 
 from util.auth import admin_required
 from util.utils import (
-    load_course_config, load_assignments, save_assignments,
-    compress_folder, format_file_size
+    load_course_config, save_course_config, load_assignments, save_assignments,
+    format_file_size
 )
-from util.config import UPLOAD_FOLDER, ADMIN_USERNAME, COURSE_CONFIG_FILE
-from util.models import load_users, save_users
+from util.assignment_repo import find_assignment, class_assignments
+from util.config import UPLOAD_FOLDER, ADMIN_USERNAME
+from util.models import load_users, save_users, get_class_students as find_class_students
+from util import submission_index, submission_events, analytics, file_cache, archive_cache, zip_stream, job_queue, mail_transport, mail_fanout, mail_outbox
 
 from util.assignment_notification import send_assignment_notifications
+from util.schedule_tasks import refresh_reminder_schedule, get_current_schedule
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -144,15 +146,10 @@ def get_assignments_by_class_and_course():
     class_name = request.args.get('class_name')
     course_name = request.args.get('course')
     
-    # 获取所有作业
-    assignments = load_assignments()
     logging.info(f"获取作业列表: 班级={class_name}, 课程={course_name}")
     
-    # 筛选出符合条件的作业
-    filtered_assignments = [
-        assignment for assignment in assignments 
-        if assignment['course'] == course_name and class_name in assignment.get('classNames', [])
-    ]
+    # 布置给该班级的该课程的作业
+    filtered_assignments = class_assignments(class_name, course_name)
 
     # 修改为作业名称返回
     filtered_assignments = [
@@ -206,13 +203,11 @@ def get_assignments_admin():
                 os.path.join(UPLOAD_FOLDER, course, assignment_name)               # 最旧结构: /课程/作业/
             ]
             
-            # 检查所有可能的路径
+            # 从提交索引检查所有可能的路径
             for path in possible_paths:
-                if os.path.exists(path):
-                    student_folders = [f for f in os.listdir(path) 
-                                     if os.path.isdir(os.path.join(path, f)) 
-                                     and not f.endswith('.zip')]
-                    submission_count += len(student_folders)
+                student_folders = [f for f in submission_index.get_student_folders(path)
+                                 if not f['folder'].endswith('.zip')]
+                submission_count += len(student_folders)
         
         # 更新作业对象
         assignment['submissionCount'] = submission_count
@@ -265,18 +260,19 @@ def create_assignment():
                     course_info['assignments'].append(data['name'])
                     
     # 保存更新后的课程配置
-    with open(COURSE_CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    save_course_config(config)
+    refresh_reminder_schedule()
 
     # Send notifications to students in the selected classes
     try:
-        notification_sent = send_assignment_notifications(new_assignment)
-        if notification_sent:
+        notification_run = send_assignment_notifications(new_assignment)
+        if notification_run:
             # Add notification status to the response
             return jsonify({
                 'status': 'success', 
                 'assignment': new_assignment,
-                'notification': 'success'
+                'notification': 'success',
+                'notification_run': notification_run
             })
         else:
             # Notification failed but assignment created
@@ -316,6 +312,7 @@ def update_assignment(assignment_id):
             
             # 保存更改
             save_assignments(assignments)
+            refresh_reminder_schedule()
             return jsonify({'status': 'success', 'assignment': assignments[i]})
     
     return jsonify({'status': 'error', 'message': '作业不存在'}), 404
@@ -335,6 +332,7 @@ def delete_assignment(assignment_id):
             # 从列表中移除
             deleted = assignments.pop(i)
             save_assignments(assignments)
+            refresh_reminder_schedule()
             
             # 更新课程配置
             course_config = load_course_config()
@@ -342,14 +340,14 @@ def delete_assignment(assignment_id):
                 if course_item['name'] == course and name in course_item['assignments']:
                     course_item['assignments'].remove(name)
             
-            with open(COURSE_CONFIG_FILE, 'w', encoding='utf-8') as f:
-                import json
-                json.dump(course_config, f, ensure_ascii=False, indent=2)
+            save_course_config(course_config)
             
             # 可选：删除作业目录
             assignment_dir = os.path.join(UPLOAD_FOLDER, course, name)
             if os.path.exists(assignment_dir):
                 shutil.rmtree(assignment_dir)
+                submission_index.remove_path(assignment_dir)
+                submission_events.record_removal(assignment_dir)
             
             return jsonify({'status': 'success'})
     
@@ -371,9 +369,7 @@ def get_submissions():
     logging.info(f"管理员查询提交情况: 课程={course}, 班级={class_name}, 作业={assignment}")
     
     # 获取作业详情
-    from util.utils import load_assignments
-    assignments = load_assignments()
-    assignment_obj = next((a for a in assignments if a['course'] == course and a['name'] == assignment), None)
+    assignment_obj = find_assignment(course, assignment)
     logging.info(f"作业对象: {assignment_obj}")
     
     # 如果作业不存在于assignments.json但存在于course_config中，创建默认作业对象
@@ -411,18 +407,16 @@ def get_submissions():
     
     # 检查所有可能的路径
     for path in possible_paths:
-        if os.path.exists(path) and os.path.isdir(path):
+        if submission_index.assignment_path_exists(path):
             assignment_paths.append(path)
             logging.info(f"找到有效路径: {path}")
     
     # 整合所有路径下的提交
     student_folders_all = []
     for assignment_path in assignment_paths:
-        student_folders = [f for f in os.listdir(assignment_path) 
-                          if os.path.isdir(os.path.join(assignment_path, f)) 
-                          and not f.endswith('.zip')]
-        for folder in student_folders:
-            student_folders_all.append((folder, assignment_path))
+        for folder_info in submission_index.get_student_folders(assignment_path):
+            if not folder_info['folder'].endswith('.zip'):
+                student_folders_all.append(folder_info)
     
     # 获取所有用户，统计学生数量
     users = load_users()
@@ -443,7 +437,8 @@ def get_submissions():
         }})
     
     # 处理所有找到的学生文件夹
-    for folder, assignment_path in student_folders_all:
+    for folder_info in student_folders_all:
+        folder = folder_info['folder']
         # 文件夹名称格式: student_id_name
         parts = folder.split('_', 1)
         if len(parts) < 2:
@@ -451,28 +446,25 @@ def get_submissions():
                 
         student_id = parts[0]
         student_name = parts[1]
-        folder_path = os.path.join(assignment_path, folder)
         
         # 获取文件夹中的文件
         files = []
         latest_time = None
         
-        for file in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file)
-            if os.path.isfile(file_path):
-                file_size = os.path.getsize(file_path)
-                file_time = os.path.getmtime(file_path)
-                file_datetime = datetime.datetime.fromtimestamp(file_time)
-                
-                if latest_time is None or file_time > latest_time:
-                    latest_time = file_time
-                
-                files.append({
-                    'name': file,
-                    'size': format_file_size(file_size),
-                    'uploadTime': file_datetime.isoformat(),
-                    'path': f"/admin/file/{class_name}/{course}/{assignment}/{folder}/{file}"
-                })
+        for file_info in folder_info['files']:
+            file = file_info['name']
+            file_time = file_info['mtime']
+            file_datetime = datetime.datetime.fromtimestamp(file_time)
+            
+            if latest_time is None or file_time > latest_time:
+                latest_time = file_time
+            
+            files.append({
+                'name': file,
+                'size': format_file_size(file_info['size']),
+                'uploadTime': file_datetime.isoformat(),
+                'path': f"/admin/file/{class_name}/{course}/{assignment}/{folder}/{file}"
+            })
         
         submission_time = datetime.datetime.fromtimestamp(latest_time) if latest_time else datetime.now()
         
@@ -544,26 +536,20 @@ def download_submissions():
     ]
     
     # 查找存在的有效路径
-    valid_paths = [path for path in possible_paths if os.path.exists(path)]
+    valid_paths = [path for path in possible_paths if submission_index.assignment_path_exists(path)]
     
     if not valid_paths:
         return "作业未找到", 404
     
-    # 临时目录用于准备下载
-    temp_dir = os.path.join(UPLOAD_FOLDER, 'temp')
-    os.makedirs(temp_dir, exist_ok=True)
-    
     timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
     
     if student != 'all':
         # 下载单个学生的提交
         student_folders = []
         for path in valid_paths:
-            folders = [f for f in os.listdir(path) 
-                     if os.path.isdir(os.path.join(path, f)) 
-                     and f.startswith(student)]
-            if folders:
-                student_folders.append((folders[0], path))
+            folder_info = submission_index.find_student_folder(path, student)
+            if folder_info:
+                student_folders.append((folder_info['folder'], path))
         
         if not student_folders:
             return "学生提交未找到", 404
@@ -572,134 +558,140 @@ def download_submissions():
         student_folder, assignment_path = student_folders[0]
         student_path = os.path.join(assignment_path, student_folder)
         
-        # 创建zip文件
+        # 获取缓存的压缩包（与学生自己下载时共用）
         zip_filename = f"{class_name}_{course}_{assignment}_{student_folder}_{timestamp}.zip"
-        zip_path = os.path.join(temp_dir, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(student_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, student_path)
-                    zipf.write(file_path, arcname=arcname)
+        zip_path = archive_cache.get_student_archive(student_path)
         
         # 提供zip文件下载
-        return send_from_directory(temp_dir, zip_filename, as_attachment=True)
+        return send_file(zip_path, as_attachment=True, download_name=zip_filename)
     else:
         # 下载所有提交
-        # 创建包含所有提交的新zip文件
         zip_filename = f"{course}_{class_name}_{assignment}_all_{timestamp}.zip"
-        zip_path = os.path.join(temp_dir, zip_filename)
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 遍历所有有效路径下的学生文件夹
-            for path in valid_paths:
-                student_folders = [f for f in os.listdir(path) 
-                                 if os.path.isdir(os.path.join(path, f)) 
-                                 and not f.endswith('.zip')]
-                
-                for folder in student_folders:
-                    folder_path = os.path.join(path, folder)
-                    
-                    for root, _, files in os.walk(folder_path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            # 使用学生文件夹作为zip中的顶层目录
-                            arcname = os.path.join(folder, os.path.relpath(file_path, folder_path))
-                            zipf.write(file_path, arcname=arcname)
+        # 遍历所有有效路径下的学生文件夹，使用学生文件夹作为zip中的顶层目录
+        entries = []
+        for path in valid_paths:
+            student_folders = [f['folder'] for f in submission_index.get_student_folders(path)
+                             if not f['folder'].endswith('.zip')]
+            
+            for folder in student_folders:
+                entries.extend(zip_stream.folder_entries(os.path.join(path, folder), folder))
         
-        # 提供zip文件下载
-        return send_from_directory(temp_dir, zip_filename, as_attachment=True)
+        # 边打包边发送，不生成临时文件
+        return zip_stream.zip_response(entries, zip_filename)
 
 #region 导出作业提交统计为Excel文件
-@admin_bp.route('/export-stats')
-@admin_required
-def export_stats():
-    """导出作业提交统计为Excel文件"""
-    class_name = request.args.get('class_name')  # 班级参数
-    course = request.args.get('course')
-    assignment = request.args.get('assignment')
-    
-    if not course or not class_name or not assignment:
-        return jsonify({'status': 'error', 'message': '缺少课程、班级或作业名称参数'}), 400
-    
-    # 获取作业详情
-    assignment_obj = next((a for a in load_assignments() if a['course'] == course and a['name'] == assignment), None)
-    if not assignment_obj:
-        return jsonify({'status': 'error', 'message': '作业不存在'}), 404
-    
-    # 获取所有学生信息 - 筛选特定班级的学生
-    users = load_users()
-    students = [
-        {'username': username, 'name': info.get('name', ''), 'student_id': info.get('student_id', ''), 
-         'email': info.get('email', ''), 'class_name': info.get('class_name', '')} 
-        for username, info in users.items() 
+
+# Excel 工作表名称的长度限制和不允许的字符
+SHEET_NAME_MAX_LENGTH = 31
+SHEET_NAME_INVALID_CHARS = '[]:*?/\\'
+
+
+def _new_export_workbook():
+    """
+    创建导出用的工作簿
+
+    使用 constant_memory 模式：每行写完后即写入临时文件，内存占用与学生人数无关；
+    工作簿输出到临时文件，发送完成后自动删除。
+
+    Returns:
+        tuple: (临时文件, 工作簿, 单元格格式字典)
+    """
+    output = tempfile.TemporaryFile()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+
+    base = {'border': 1, 'align': 'center', 'valign': 'vcenter'}
+    formats = {
+        # 标题样式
+        'header': workbook.add_format({**base, 'bold': True, 'bg_color': '#4B5563', 'color': 'white',
+                                       'text_wrap': True}),
+        # 单元格样式
+        'cell': workbook.add_format(base),
+        # 日期格式
+        'date': workbook.add_format({**base, 'num_format': 'yyyy-mm-dd hh:mm:ss'}),
+        # 未提交样式(红色)
+        'not_submitted': workbook.add_format({**base, 'color': 'red', 'bold': True}),
+        # 提交样式(绿色)
+        'submitted': workbook.add_format({**base, 'color': 'green', 'bold': True}),
+        # 逾期提交样式(橙色)
+        'late': workbook.add_format({**base, 'color': 'orange', 'bold': True}),
+        'bold': workbook.add_format({'bold': True, 'align': 'right'})
+    }
+    return output, workbook, formats
+
+
+def _send_workbook(output, workbook, filename):
+    """关闭工作簿并发送临时文件"""
+    workbook.close()
+    output.seek(0)
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name=filename,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def _sheet_name(name, used):
+    """生成合法且不重复的工作表名称"""
+    name = ''.join('_' if ch in SHEET_NAME_INVALID_CHARS else ch for ch in name)[:SHEET_NAME_MAX_LENGTH] or 'Sheet'
+    candidate, counter = name, 2
+    while candidate.lower() in used:
+        suffix = f"({counter})"
+        candidate = name[:SHEET_NAME_MAX_LENGTH - len(suffix)] + suffix
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _class_students(users, class_name):
+    """获取班级的学生信息列表"""
+    return [
+        {'username': username, 'name': info.get('name', ''), 'student_id': info.get('student_id', ''),
+         'email': info.get('email', ''), 'class_name': info.get('class_name', '')}
+        for username, info in users.items()
         if not info.get('is_admin', False) and info.get('class_name') == class_name  # 只包含指定班级
     ]
-    
-    # 创建内存中的Excel文件
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet(f"{class_name}提交统计")
-    
-    # 添加标题样式
-    header_format = workbook.add_format({
-        'bold': True,
-        'bg_color': '#4B5563',
-        'color': 'white',
-        'border': 1,
-        'align': 'center',
-        'valign': 'vcenter',
-        'text_wrap': True
-    })
-    
-    # 添加单元格样式
-    cell_format = workbook.add_format({
-        'border': 1,
-        'align': 'center',
-        'valign': 'vcenter'
-    })
-    
-    # 添加日期格式
-    date_format = workbook.add_format({
-        'border': 1,
-        'align': 'center',
-        'valign': 'vcenter',
-        'num_format': 'yyyy-mm-dd hh:mm:ss'
-    })
-    
-    # 添加未提交样式(红色)
-    not_submitted_format = workbook.add_format({
-        'border': 1,
-        'align': 'center',
-        'valign': 'vcenter',
-        'color': 'red',
-        'bold': True
-    })
-    
-    # 添加提交样式(绿色)
-    submitted_format = workbook.add_format({
-        'border': 1,
-        'align': 'center',
-        'valign': 'vcenter',
-        'color': 'green',
-        'bold': True
-    })
-    
-    # 添加逾期提交样式(橙色)
-    late_format = workbook.add_format({
-        'border': 1,
-        'align': 'center',
-        'valign': 'vcenter',
-        'color': 'orange',
-        'bold': True
-    })
 
+
+def _assignment_submissions(class_name, course, assignment):
+    """
+    从提交索引获取班级某个作业的提交情况
+
+    Returns:
+        dict: {用户名: {student_id, file_count, total_size, latest_time}}
+    """
+    assignment_path = os.path.join(UPLOAD_FOLDER, class_name, course, assignment)
+    submissions = {}
+
+    for folder_info in submission_index.get_student_folders(assignment_path):
+        folder = folder_info['folder']
+        if folder.endswith('.zip'):
+            continue
+        # 文件夹名称格式: student_id_username
+        parts = folder.split('_', 1)
+        if len(parts) < 2 or not folder_info['files']:
+            continue
+
+        submissions[parts[1]] = {
+            'student_id': parts[0],
+            'file_count': len(folder_info['files']),
+            'total_size': sum(f['size'] for f in folder_info['files']),
+            'latest_time': max(f['mtime'] for f in folder_info['files'])
+        }
+    return submissions
+
+
+def _write_assignment_sheet(worksheet, formats, students, submissions, due_date):
+    """
+    写入单个作业的提交统计工作表（按行顺序写入，适用于 constant_memory 模式）
+
+    Returns:
+        int: 逾期提交人数
+    """
     # 表头增加班级字段
     headers = ['序号', '班级', '学号', '姓名', '邮箱', '提交时间', '提交状态', '文件数量', '文件大小(总计)']
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_format)
-    
+
     # 设置列宽
     worksheet.set_column(0, 0, 5)    # 序号
     worksheet.set_column(1, 1, 20)   # 班级
@@ -710,121 +702,174 @@ def export_stats():
     worksheet.set_column(6, 6, 10)   # 提交状态
     worksheet.set_column(7, 7, 10)   # 文件数量
     worksheet.set_column(8, 8, 15)   # 文件大小
-    
-    # 获取提交情况 - 修改文件路径包含班级
-    assignment_path = os.path.join(UPLOAD_FOLDER, class_name, course, assignment)
-    submissions = {}
-    
-    if os.path.exists(assignment_path):
-        for folder in os.listdir(assignment_path):
-            folder_path = os.path.join(assignment_path, folder)
-            if os.path.isdir(folder_path) and not folder.endswith('.zip'):
-                # 文件夹名称格式: student_id_username
-                parts = folder.split('_', 1)
-                if len(parts) < 2:
-                    continue
-                    
-                student_id = parts[0]
-                username = parts[1]
-                
-                # 获取文件列表和总大小
-                files = []
-                total_size = 0
-                latest_time = None
-                
-                for file in os.listdir(folder_path):
-                    file_path = os.path.join(folder_path, file)
-                    if os.path.isfile(file_path):
-                        file_size = os.path.getsize(file_path)
-                        file_time = os.path.getmtime(file_path)
-                        
-                        if latest_time is None or file_time > latest_time:
-                            latest_time = file_time
-                        
-                        total_size += file_size
-                        files.append({
-                            'name': file,
-                            'size': file_size,
-                            'time': file_time
-                        })
-                
-                # 记录提交信息
-                submissions[username] = {
-                    'student_id': student_id,
-                    'files': files,
-                    'file_count': len(files),
-                    'total_size': total_size,
-                    'latest_time': latest_time
-                }
-    
-    # 获取截止时间
-    due_date = datetime.datetime.fromisoformat(assignment_obj['dueDate'])
-    
+
+    for col, header in enumerate(headers):
+        worksheet.write(0, col, header, formats['header'])
+
     # 填充数据
+    cell_format = formats['cell']
+    submitted_count = 0
+    late_count = 0
     for row, student in enumerate(students, 1):
-        username = student['username']
-        submission = submissions.get(username)
-        
+        submission = submissions.get(student['username'])
+
         worksheet.write(row, 0, row, cell_format)                              # 序号
         worksheet.write(row, 1, student['class_name'], cell_format)            # 班级
         worksheet.write(row, 2, student['student_id'], cell_format)            # 学号
         worksheet.write(row, 3, student['name'], cell_format)                  # 姓名
         worksheet.write(row, 4, student['email'], cell_format)                 # 邮箱
-        
+
         if submission:
             # 有提交记录
+            submitted_count += 1
             submission_time = datetime.datetime.fromtimestamp(submission['latest_time'])
-            worksheet.write_datetime(row, 5, submission_time, date_format)      # 提交时间
-            
+            worksheet.write_datetime(row, 5, submission_time, formats['date'])  # 提交时间
+
             # 判断是否逾期提交
             if submission_time > due_date:
-                worksheet.write(row, 6, "逾期提交", late_format)                 # 提交状态
+                late_count += 1
+                worksheet.write(row, 6, "逾期提交", formats['late'])             # 提交状态
             else:
-                worksheet.write(row, 6, "已提交", submitted_format)              # 提交状态
-                
+                worksheet.write(row, 6, "已提交", formats['submitted'])          # 提交状态
+
             worksheet.write(row, 7, submission['file_count'], cell_format)      # 文件数量
             worksheet.write(row, 8, format_file_size(submission['total_size']), cell_format)  # 文件大小
         else:
             # 无提交记录
             worksheet.write(row, 5, "未提交", cell_format)                       # 提交时间
-            worksheet.write(row, 6, "未提交", not_submitted_format)              # 提交状态
+            worksheet.write(row, 6, "未提交", formats['not_submitted'])          # 提交状态
             worksheet.write(row, 7, 0, cell_format)                             # 文件数量
             worksheet.write(row, 8, "0 B", cell_format)                         # 文件大小
-    
-    # 添加统计信息
+
+    # 添加统计信息（只统计本班级学生的提交）
     summary_row = len(students) + 2
-    bold_format = workbook.add_format({'bold': True, 'align': 'right'})
-    
+    bold_format = formats['bold']
+
     worksheet.write(summary_row, 0, "统计信息:", bold_format)
     worksheet.write(summary_row, 1, "总人数:", bold_format)
     worksheet.write(summary_row, 2, len(students), cell_format)
-    
+
     worksheet.write(summary_row + 1, 1, "已提交:", bold_format)
-    worksheet.write(summary_row + 1, 2, len(submissions), cell_format)
-    
+    worksheet.write(summary_row + 1, 2, submitted_count, cell_format)
+
     worksheet.write(summary_row + 2, 1, "提交率:", bold_format)
-    submission_rate = f"{(len(submissions) / len(students) * 100) if len(students) > 0 else 0:.1f}%"
+    submission_rate = f"{(submitted_count / len(students) * 100) if len(students) > 0 else 0:.1f}%"
     worksheet.write(summary_row + 2, 2, submission_rate, cell_format)
-    
+
     worksheet.write(summary_row + 3, 1, "逾期提交:", bold_format)
-    late_count = sum(1 for username, data in submissions.items() 
-                   if datetime.datetime.fromtimestamp(data['latest_time']) > due_date)
     worksheet.write(summary_row + 3, 2, late_count, cell_format)
+    return late_count
+
+
+@admin_bp.route('/export-stats')
+@admin_required
+def export_stats():
+    """导出作业提交统计为Excel文件"""
+    class_name = request.args.get('class_name')  # 班级参数
+    course = request.args.get('course')
+    assignment = request.args.get('assignment')
     
-    # 关闭工作簿并获取输出
-    workbook.close()
-    output.seek(0)
+    if not course or not class_name or not assignment:
+        return jsonify({'status': 'error', 'message': '缺少课程、班级或作业名称参数'}), 400
+    
+    # 获取作业详情
+    assignment_obj = find_assignment(course, assignment)
+    if not assignment_obj:
+        return jsonify({'status': 'error', 'message': '作业不存在'}), 404
+    
+    # 获取所有学生信息 - 筛选特定班级的学生
+    students = _class_students(load_users(), class_name)
+    
+    output, workbook, formats = _new_export_workbook()
+    worksheet = workbook.add_worksheet(_sheet_name(f"{class_name}提交统计", set()))
+    _write_assignment_sheet(
+        worksheet, formats, students,
+        _assignment_submissions(class_name, course, assignment),
+        datetime.datetime.fromisoformat(assignment_obj['dueDate'])
+    )
     
     # 生成文件名
     filename = f"{course}_{class_name}_{assignment}_提交统计_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
+    return _send_workbook(output, workbook, filename)
+
+
+@admin_bp.route('/export-course-stats')
+@admin_required
+def export_course_stats():
+    """
+    导出班级某门课程所有作业的提交统计
+
+    第一个工作表为汇总矩阵（学生 × 作业的提交状态），之后每个作业一个工作表。
+    """
+    class_name = request.args.get('class_name')
+    course = request.args.get('course')
     
-    # 发送文件
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    if not course or not class_name:
+        return jsonify({'status': 'error', 'message': '缺少课程或班级参数'}), 400
+    
+    # 该班级该课程的作业，按截止日期排序
+    assignments = sorted(class_assignments(class_name, course, include_unassigned=True), key=lambda a: a['dueDate'])
+    if not assignments:
+        return jsonify({'status': 'error', 'message': '该班级的课程没有作业'}), 404
+    
+    students = _class_students(load_users(), class_name)
+    
+    # 先从提交索引读取所有作业的提交情况，再按顺序写入各工作表
+    sheets = []
+    for assignment_obj in assignments:
+        sheets.append((
+            assignment_obj,
+            datetime.datetime.fromisoformat(assignment_obj['dueDate']),
+            _assignment_submissions(class_name, course, assignment_obj['name'])
+        ))
+    
+    output, workbook, formats = _new_export_workbook()
+    used_names = set()
+    
+    # 汇总矩阵
+    summary = workbook.add_worksheet(_sheet_name('汇总', used_names))
+    summary.set_column(0, 0, 12)
+    summary.set_column(1, 1, 12)
+    summary.set_column(2, 1 + len(sheets), 14)
+    summary.set_column(2 + len(sheets), 3 + len(sheets), 10)
+    
+    headers = ['学号', '姓名'] + [a['name'] for a, _, _ in sheets] + ['已提交', '逾期']
+    for col, header in enumerate(headers):
+        summary.write(0, col, header, formats['header'])
+    
+    for row, student in enumerate(students, 1):
+        summary.write(row, 0, student['student_id'], formats['cell'])
+        summary.write(row, 1, student['name'], formats['cell'])
+        submitted = late = 0
+        for col, (_, due_date, submissions) in enumerate(sheets, 2):
+            submission = submissions.get(student['username'])
+            if not submission:
+                summary.write(row, col, "未提交", formats['not_submitted'])
+            elif datetime.datetime.fromtimestamp(submission['latest_time']) > due_date:
+                submitted += 1
+                late += 1
+                summary.write(row, col, "逾期提交", formats['late'])
+            else:
+                submitted += 1
+                summary.write(row, col, "已提交", formats['submitted'])
+        summary.write(row, 2 + len(sheets), submitted, formats['cell'])
+        summary.write(row, 3 + len(sheets), late, formats['cell'])
+    
+    # 每个作业的提交率
+    rate_row = len(students) + 2
+    summary.write(rate_row, 1, "提交率:", formats['bold'])
+    student_ids = {student['username'] for student in students}
+    for col, (_, _, submissions) in enumerate(sheets, 2):
+        count = len(student_ids & submissions.keys())
+        summary.write(rate_row, col, f"{(count / len(students) * 100) if students else 0:.1f}%", formats['cell'])
+    
+    # 每个作业一个工作表
+    for assignment_obj, due_date, submissions in sheets:
+        worksheet = workbook.add_worksheet(_sheet_name(assignment_obj['name'], used_names))
+        _write_assignment_sheet(worksheet, formats, students, submissions, due_date)
+    
+    filename = f"{course}_{class_name}_全部作业_提交统计_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
+    return _send_workbook(output, workbook, filename)
 
 #region 管理班级
 @admin_bp.route('/classes', methods=['GET'])
@@ -872,8 +917,7 @@ def add_class():
     })
     
     # 保存更改
-    with open(COURSE_CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    save_course_config(config)
     
     return jsonify({
         'status': 'success', 
@@ -913,8 +957,7 @@ def update_class(class_name):
             class_item['description'] = new_description
             
             # 保存更改
-            with open(COURSE_CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            save_course_config(config)
             
             return jsonify({
                 'status': 'success', 
@@ -939,12 +982,13 @@ def delete_class(class_name):
             # 删除班级
             config['classes'].remove(class_item)
             # 保存更改
-            with open(COURSE_CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            save_course_config(config)
             # 删除班级对应的文件夹
             class_folder = os.path.join(UPLOAD_FOLDER, class_name)
             if os.path.exists(class_folder):
                 shutil.rmtree(class_folder)
+                submission_index.remove_path(class_folder)
+                submission_events.record_removal(class_folder)
             # 删除班级对应的用户
             users = load_users()
             for username, user_data in users.items():
@@ -966,19 +1010,15 @@ def get_class_students(class_name):
     if not class_name:
         return jsonify({'status': 'error', 'message': '班级名称不能为空'}), 400
     
-    # 加载所有用户
-    users = load_users()
-    
-    # 筛选该班级的学生
+    # 按班级索引查找该班级的学生
     students = []
-    for username, user_data in users.items():
-        if not user_data.get('is_admin', False) and user_data.get('class_name') == class_name:
-            students.append({
-                'username': username,
-                'name': user_data.get('name', username),
-                'student_id': user_data.get('student_id', ''),
-                'email': user_data.get('email', '')
-            })
+    for username, user_data in find_class_students(class_name).items():
+        students.append({
+            'username': username,
+            'name': user_data.get('name', username),
+            'student_id': user_data.get('student_id', ''),
+            'email': user_data.get('email', '')
+        })
     
     # 按学号排序
     students.sort(key=lambda x: x['student_id'])
@@ -1027,4 +1067,135 @@ def trigger_deadline_check():
         return jsonify({
             'status': 'error', 
             'message': '触发截止日期检查失败，请查看日志'
-        }), 500
\ No newline at end of file
+        }), 500
+
+@admin_bp.route('/rebuild_submission_index', methods=['POST'])
+@admin_required
+def rebuild_submission_index():
+    """手动重建提交索引（上传目录被外部修改后使用）"""
+    try:
+        count = submission_index.rebuild_index()
+        return jsonify({
+            'status': 'success',
+            'message': f"提交索引已重建，共 {count} 个目录"
+        })
+    except Exception as e:
+        logging.error(f"重建提交索引失败: {e}")
+        return jsonify({'status': 'error', 'message': f'重建提交索引失败: {str(e)}'}), 500
+
+
+@admin_bp.route('/cache_stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    """查看数据文件缓存的命中统计"""
+    return jsonify({'status': 'success', 'stats': file_cache.get_stats()})
+
+
+@admin_bp.route('/job_stats', methods=['GET'])
+@admin_required
+def job_stats():
+    """查看后台任务队列、邮件连接池和发件箱的运行统计"""
+    return jsonify({
+        'status': 'success',
+        'stats': job_queue.get_stats(),
+        'mail': mail_transport.get_stats(),
+        'outbox': mail_outbox.get_stats()
+    })
+
+
+@admin_bp.route('/download_course', methods=['GET'])
+@admin_required
+def download_course():
+    """
+    一次下载多个作业或整门课程的所有提交
+
+    参数 assignments 为逗号分隔的作业名称，省略时下载该班级该课程的全部作业。
+    压缩包内的目录结构为 作业/学生文件夹/文件。
+    """
+    course = request.args.get('course')
+    class_name = request.args.get('class_name')
+    assignments = [name.strip() for name in request.args.get('assignments', '').split(',') if name.strip()]
+    logging.info(f"批量下载请求: 课程={course}, 班级={class_name}, 作业={assignments or '全部'}")
+
+    if not course or not class_name:
+        return "缺少参数", 400
+
+    if not assignments:
+        # 从提交索引中找出该班级该课程下的所有作业目录
+        assignments = sorted(parts[2] for parts in submission_index.get_assignment_dirs()
+                             if len(parts) == 3 and parts[0] == class_name and parts[1] == course)
+
+    entries = []
+    for assignment in assignments:
+        path = os.path.join(UPLOAD_FOLDER, class_name, course, assignment)
+        if not submission_index.assignment_path_exists(path):
+            continue
+        for folder in submission_index.get_student_folders(path):
+            if folder['folder'].endswith('.zip'):
+                continue
+            entries.extend(zip_stream.folder_entries(os.path.join(path, folder['folder']),
+                                                     os.path.join(assignment, folder['folder'])))
+
+    if not entries:
+        return "没有找到提交", 404
+
+    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    suffix = assignments[0] if len(assignments) == 1 else 'all'
+    zip_filename = f"{course}_{class_name}_{suffix}_{timestamp}.zip"
+    return zip_stream.zip_response(entries, zip_filename)
+
+
+@admin_bp.route('/notification_runs', methods=['GET'])
+@admin_required
+def notification_runs():
+    """查看最近的批量通知发送任务"""
+    return jsonify({'status': 'success', 'runs': mail_fanout.list_runs()})
+
+
+@admin_bp.route('/notification_runs/<run_id>', methods=['GET'])
+@admin_required
+def notification_run(run_id):
+    """查看批量通知发送任务的进度（按班级统计）"""
+    run = mail_fanout.get_run(run_id)
+    if run is None:
+        return jsonify({'status': 'error', 'message': '发送任务不存在'}), 404
+    return jsonify({'status': 'success', 'run': run})
+
+
+@admin_bp.route('/schedule', methods=['GET'])
+@admin_required
+def schedule_status():
+    """查看定时任务的调度信息和最近的执行历史"""
+    return jsonify({'status': 'success', 'schedule': get_current_schedule()})
+
+
+@admin_bp.route('/analytics', methods=['GET'])
+@admin_required
+def course_analytics():
+    """
+    课程提交分析（学期看板）
+
+    参数 course 必填；class_name 只统计该班级；start、end（YYYY-MM-DD）按作业截止日期筛选。
+    """
+    course = request.args.get('course')
+    if not course:
+        return jsonify({'status': 'error', 'message': '缺少课程参数'}), 400
+
+    if not analytics.is_available():
+        return jsonify({'status': 'error', 'message': '服务器未安装 NumPy，无法生成提交分析'}), 501
+
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.datetime.fromisoformat(start) if start else None
+        # 结束日期包含当天
+        end = datetime.datetime.fromisoformat(end) + timedelta(days=1) if end else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': '日期格式应为 YYYY-MM-DD'}), 400
+
+    try:
+        result = analytics.course_analytics(course, request.args.get('class_name') or None, start, end)
+        return jsonify({'status': 'success', 'analytics': result})
+    except Exception as e:
+        logging.error(f"生成课程提交分析失败: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -17,6 +17,7 @@ import json
 import logging
 from werkzeug.security import check_password_hash, generate_password_hash
 
+from util import file_cache, file_store
 from util.config import ADMIN_USERNAME, ADMIN_PASSWORD_HASH
 
 # 管理员文件路径
@@ -31,8 +32,7 @@ def load_admins():
     """
     if os.path.exists(ADMIN_FILE):
         try:
-            with open(ADMIN_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return file_cache.load_json(ADMIN_FILE)
         except json.JSONDecodeError:
             logging.error(f"admin.json 文件格式错误")
             return {}
@@ -49,8 +49,7 @@ def save_admins(admins):
         admins (dict): 管理员数据字典
     """
     try:
-        with open(ADMIN_FILE, 'w', encoding='utf-8') as f:
-            json.dump(admins, f, ensure_ascii=False, indent=2)
+        file_store.write_json(ADMIN_FILE, admins)
         return True
     except Exception as e:
         logging.error(f"保存管理员数据出错: {e}")
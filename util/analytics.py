@@ -0,0 +1,240 @@
+"""
+作业传输系统 - 课程提交分析模块
+
+为管理员的学期/课程看板一次性计算整门课程（可按班级、截止日期范围筛选）的统计数据，
+不再需要逐个作业、逐个班级请求统计接口：
+- 各班级按时提交率、逾期提交率和未提交率
+- 提交时间相对截止时间的分布（按截止前/后的小时数分段）及分位数
+- 学生 × 作业的完成情况矩阵
+- 提交文件大小的分位数
+
+提交数据从提交索引中一次读取并整理为按列存放的数组，统计使用 NumPy 向量化计算。
+NumPy 为可选依赖，未安装时 is_available() 返回 False，分析接口返回错误提示。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import logging
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 NumPy 时分析功能不可用，其他功能不受影响
+    np = None
+
+from util.models import load_users
+from util.utils import load_assignments, load_course_config, get_assignment_classes
+from util import submission_index
+
+# 提交时间分布的分段边界（截止前的小时数，负数表示逾期）
+LEAD_TIME_EDGES = [-24, 0, 1, 6, 24, 72, 168]
+LEAD_TIME_LABELS = ['逾期超过1天', '逾期1天内', '截止前1小时内', '截止前1-6小时',
+                    '截止前6-24小时', '截止前1-3天', '截止前3-7天', '截止前7天以上']
+
+# 提交时间和文件大小统计的分位数
+PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+
+# 完成情况矩阵中的取值
+STATUS_NOT_REQUIRED = -1
+STATUS_MISSING = 0
+STATUS_ON_TIME = 1
+STATUS_LATE = 2
+
+
+def is_available():
+    """是否可以使用分析功能（已安装 NumPy）"""
+    return np is not None
+
+
+def _percentiles(values):
+    """计算分位数，没有数据时返回空字典"""
+    if not len(values):
+        return {}
+    result = np.percentile(values, PERCENTILES)
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, result)}
+
+
+def collect_columns(course, class_name=None, start=None, end=None):
+    """
+    从提交索引中读取课程的所有提交，整理为按列存放的数据
+
+    Args:
+        course (str): 课程名称
+        class_name (str, optional): 只统计该班级
+        start (datetime, optional): 只统计截止日期不早于该时间的作业
+        end (datetime, optional): 只统计截止日期不晚于该时间的作业
+
+    Returns:
+        dict: assignments、students、required（学生 × 作业是否需要提交）以及每份提交的
+              student / assignment / submit_time / total_size / file_count 列和 file_sizes
+    """
+    config = load_course_config()
+
+    assignments = []
+    for assignment in load_assignments():
+        if assignment['course'] != course:
+            continue
+        try:
+            due_date = datetime.fromisoformat(assignment['dueDate'])
+        except Exception:
+            logging.warning(f"作业截止日期无效，已跳过: {course} - {assignment['name']}")
+            continue
+        if (start and due_date < start) or (end and due_date > end):
+            continue
+        classes = set(get_assignment_classes(assignment, config))
+        if class_name:
+            classes &= {class_name}
+        if classes:
+            assignments.append((due_date, assignment['name'], classes))
+    assignments.sort(key=lambda item: item[0])
+
+    all_classes = set().union(*(classes for _, _, classes in assignments)) if assignments else set()
+    students = sorted(
+        ((username, info) for username, info in load_users().items()
+         if not info.get('is_admin', False) and info.get('class_name') in all_classes),
+        key=lambda item: (item[1].get('class_name', ''), item[1].get('student_id', ''))
+    )
+    student_index = {username: i for i, (username, _) in enumerate(students)}
+
+    required = np.zeros((len(students), len(assignments)), dtype=bool)
+    columns = {'student': [], 'assignment': [], 'submit_time': [], 'total_size': [], 'file_count': []}
+    file_sizes = []
+    seen = set()
+
+    for j, (due_date, assignment_name, classes) in enumerate(assignments):
+        for i, (_, info) in enumerate(students):
+            required[i, j] = info.get('class_name') in classes
+
+        for cls in classes:
+            for path in submission_index.assignment_paths(cls, course, assignment_name):
+                for folder in submission_index.get_student_folders(path):
+                    parts = folder['folder'].split('_', 1)
+                    if folder['folder'].endswith('.zip') or len(parts) < 2 or not folder['files']:
+                        continue
+                    i = student_index.get(parts[1])
+                    # 最旧结构中各班级的提交在同一目录下，只统计本班级的学生
+                    if i is None or (i, j) in seen or students[i][1].get('class_name') != cls:
+                        continue
+                    seen.add((i, j))
+
+                    sizes = [f['size'] for f in folder['files']]
+                    columns['student'].append(i)
+                    columns['assignment'].append(j)
+                    columns['submit_time'].append(max(f['mtime'] for f in folder['files']))
+                    columns['total_size'].append(sum(sizes))
+                    columns['file_count'].append(len(sizes))
+                    file_sizes.extend(sizes)
+
+    return {
+        'assignments': [{'name': name, 'due_date': due_date, 'due_ts': due_date.timestamp()}
+                        for due_date, name, _ in assignments],
+        'students': [{'username': username, 'name': info.get('name', ''),
+                      'student_id': info.get('student_id', ''), 'class_name': info.get('class_name', '')}
+                     for username, info in students],
+        'required': required,
+        'student': np.array(columns['student'], dtype=np.int64),
+        'assignment': np.array(columns['assignment'], dtype=np.int64),
+        'submit_time': np.array(columns['submit_time'], dtype=np.float64),
+        'total_size': np.array(columns['total_size'], dtype=np.int64),
+        'file_count': np.array(columns['file_count'], dtype=np.int64),
+        'file_sizes': np.array(file_sizes, dtype=np.int64)
+    }
+
+
+def course_analytics(course, class_name=None, start=None, end=None):
+    """
+    计算课程的提交分析数据
+
+    Args:
+        course (str): 课程名称
+        class_name (str, optional): 只统计该班级
+        start (datetime, optional): 只统计截止日期不早于该时间的作业
+        end (datetime, optional): 只统计截止日期不晚于该时间的作业
+
+    Returns:
+        dict: 可直接序列化为 JSON 的分析结果
+    """
+    data = collect_columns(course, class_name, start, end)
+    assignments, students, required = data['assignments'], data['students'], data['required']
+
+    # 每份提交相对截止时间的小时数（正数为提前，负数为逾期）
+    due_ts = np.array([a['due_ts'] for a in assignments], dtype=np.float64)
+    lead_hours = (due_ts[data['assignment']] - data['submit_time']) / 3600 if len(due_ts) else np.empty(0)
+    late = lead_hours < 0
+
+    # 学生 × 作业完成情况矩阵
+    status = np.where(required, STATUS_MISSING, STATUS_NOT_REQUIRED).astype(np.int8)
+    status[data['student'], data['assignment']] = np.where(late, STATUS_LATE, STATUS_ON_TIME)
+
+    # 各班级按时、逾期、未提交率
+    class_of_student = np.array([s['class_name'] for s in students], dtype=object)
+    classes = []
+    for cls in sorted(set(class_of_student)):
+        rows = status[class_of_student == cls]
+        expected = int((rows != STATUS_NOT_REQUIRED).sum())
+        on_time = int((rows == STATUS_ON_TIME).sum())
+        late_count = int((rows == STATUS_LATE).sum())
+        missing = int((rows == STATUS_MISSING).sum())
+        classes.append({
+            'class_name': cls,
+            'students': int(len(rows)),
+            'expected': expected,
+            'on_time': on_time,
+            'late': late_count,
+            'missing': missing,
+            'on_time_rate': round(on_time / expected * 100, 1) if expected else 0,
+            'late_rate': round(late_count / expected * 100, 1) if expected else 0,
+            'missing_rate': round(missing / expected * 100, 1) if expected else 0
+        })
+
+    # 每个作业的提交情况
+    per_assignment = []
+    for j, assignment in enumerate(assignments):
+        column = status[:, j]
+        per_assignment.append({
+            'name': assignment['name'],
+            'due_date': assignment['due_date'].strftime('%Y-%m-%d %H:%M'),
+            'expected': int((column != STATUS_NOT_REQUIRED).sum()),
+            'on_time': int((column == STATUS_ON_TIME).sum()),
+            'late': int((column == STATUS_LATE).sum()),
+            'missing': int((column == STATUS_MISSING).sum())
+        })
+
+    # 提交时间分布
+    buckets = np.bincount(np.digitize(lead_hours, LEAD_TIME_EDGES), minlength=len(LEAD_TIME_LABELS))
+    distribution = [{'label': label, 'count': int(count)} for label, count in zip(LEAD_TIME_LABELS, buckets)]
+
+    # 学生完成情况
+    completed = (status == STATUS_ON_TIME) | (status == STATUS_LATE)
+    matrix = [{
+        **student,
+        'statuses': status[i].tolist(),
+        'completed': int(completed[i].sum()),
+        'required': int(required[i].sum())
+    } for i, student in enumerate(students)]
+
+    return {
+        'course': course,
+        'class_name': class_name,
+        'assignments': per_assignment,
+        'classes': classes,
+        'submission_count': int(len(lead_hours)),
+        'submission_time': {
+            'distribution': distribution,
+            'hours_before_due': _percentiles(lead_hours)
+        },
+        'completion': {
+            'assignments': [a['name'] for a in assignments],
+            'legend': {str(STATUS_NOT_REQUIRED): '无需提交', str(STATUS_MISSING): '未提交',
+                       str(STATUS_ON_TIME): '按时提交', str(STATUS_LATE): '逾期提交'},
+            'students': matrix
+        },
+        'file_size': {
+            'files': int(len(data['file_sizes'])),
+            'total': int(data['file_sizes'].sum()) if len(data['file_sizes']) else 0,
+            'per_file': _percentiles(data['file_sizes']),
+            'per_submission': _percentiles(data['total_size'])
+        }
+    }
@@ -17,17 +17,17 @@
 日期: 2025-04-04
 """
 
-import os
 import logging
-from datetime import datetime, timedelta
 
 from flask import Blueprint, request, jsonify, send_from_directory, current_app, redirect, url_for
 from flask_login import login_required, current_user
 
 from util.config import UPLOAD_FOLDER
-from util.utils import load_course_config, load_assignments
+from util.utils import load_course_config
+from util.assignment_repo import get_repository
 
 from util.models import load_users, save_users
+from util import dashboard
 
 api_bp = Blueprint('api', __name__)
 
@@ -174,92 +174,11 @@ def all_assignments():
         save_users(users)  # 保存更改
         logging.warning(f"用户 {current_user.id} 没有班级，已分配默认班级")
     
-    # 获取所有作业信息
-    assignments_data = load_assignments()
-    
-    # 获取课程配置
-    config = load_course_config()
-    
-    # 用于存储完整的作业列表
-    all_assignments = []
-    
-    # 找到该学生所在班级的课程列表
-    student_courses = []
-    class_found = False
-    
-    for class_info in config.get('classes', []):
-        if class_info['name'] == class_name:
-            class_found = True
-            # 遍历该班级的所有课程和作业
-            for course_info in class_info.get('courses', []):
-                course_name = course_info['name']
-                
-                # 遍历该课程的所有作业
-                for assignment_name in course_info.get('assignments', []):
-                    # 从assignments.json中查找匹配的作业详情
-                    assignment_detail = next((a for a in assignments_data if a['course'] == course_name and a['name'] == assignment_name), None)
-                    
-                    # 如果没有找到，创建默认详情
-                    if not assignment_detail:
-                        # 默认截止日期为一周后
-                        default_due_date = (datetime.now() + timedelta(days=7)).isoformat()
-                        assignment_detail = {
-                            'course': course_name,
-                            'name': assignment_name,
-                            'dueDate': default_due_date,
-                            'description': ''
-                        }
-                    
-                    # 检查截止状态
-                    due_date = datetime.fromisoformat(assignment_detail['dueDate'])
-                    is_expired = due_date < datetime.now()
-                    
-                    # 构建作业目录路径 - 包含班级层级
-                    assignment_path = os.path.join(UPLOAD_FOLDER, class_name, course_name, assignment_name)
-                    
-                    # 检查目录是否存在，如果不存在则创建
-                    if not os.path.exists(assignment_path):
-                        os.makedirs(assignment_path, exist_ok=True)
-                    
-                    # 检查当前用户是否已提交
-                    has_submitted = False
-
-                    # 调试输出
-                    logging.info(f"检查提交状态: {assignment_path}, 学号: {student_id}, 用户ID: {current_user.id}")
-                    
-                    if os.path.exists(assignment_path):
-                        # 查找匹配学生ID的文件夹
-                        student_folder_pattern = f"{student_id}_{current_user.id}"
-                        has_submitted = any(
-                            os.path.isdir(os.path.join(assignment_path, f)) and 
-                            f.startswith(student_folder_pattern) 
-                            for f in os.listdir(assignment_path) 
-                            if os.path.isdir(os.path.join(assignment_path, f))
-                        )
-                    
-                    # 获取提交人数
-                    submission_count = 0
-                    if os.path.exists(assignment_path):
-                        submission_count = len([
-                            f for f in os.listdir(assignment_path) 
-                            if os.path.isdir(os.path.join(assignment_path, f)) and 
-                            not f.endswith('.zip')
-                        ])
-                    
-                    # 添加到完整列表
-                    all_assignments.append({
-                        'id': assignment_detail.get('id', f"{course_name}_{assignment_name}"),
-                        'course': course_name,
-                        'name': assignment_name,
-                        'dueDate': assignment_detail['dueDate'],
-                        'description': assignment_detail.get('description', ''),
-                        'isExpired': is_expired,
-                        'hasSubmitted': has_submitted,
-                        'submissionCount': submission_count
-                    })
+    # 班级作业视图和提交情况已预先计算，这里只需合并当前学生的提交状态
+    all_assignments = dashboard.get_student_assignments(class_name, student_id, current_user.id)
     
     # 如果找不到班级，记录警告
-    if not class_found:
+    if all_assignments is None:
         logging.warning(f"找不到班级: {class_name}")
         # 返回空作业列表
         return jsonify({'assignments': []})
@@ -281,12 +200,8 @@ def get_assignment_settings():
     if not course or not assignment:
         return jsonify({'settings': get_default_settings()})
     
-    # 获取作业信息
-    assignments = load_assignments()
-    assignment_obj = next((a for a in assignments 
-                           if a['course'] == course and
-                              a['name'] == assignment and
-                              class_name in a['classNames']), None)
+    # 获取布置给该班级的作业
+    assignment_obj = get_repository().find_in_class(class_name, course, assignment)
     
     if not assignment_obj:
         return jsonify({'settings': get_default_settings()})
@@ -348,13 +263,8 @@ def get_assignment_details():
     if not course or not assignment:
         return jsonify({'status': 'error', 'message': '缺少课程或作业名称'}), 400
     
-    # 获取作业信息
-    assignments = load_assignments()
-    # print(f"Assignments: {assignments}")
-    assignment_obj = next((a for a in assignments 
-                           if a['course'] == course and
-                              a['name'] == assignment and 
-                              class_name in a['classNames']), None)
+    # 获取布置给该班级的作业
+    assignment_obj = get_repository().find_in_class(class_name, course, assignment)
     
     if not assignment_obj:
         return jsonify({'status': 'error', 'message': '作业不存在'}), 404
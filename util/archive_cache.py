@@ -0,0 +1,166 @@
+"""
+作业传输系统 - 提交压缩包缓存模块
+
+学生提交文件夹的 ZIP 压缩包不再在每次上传后重新生成，而是在第一次下载时按需生成并缓存：
+- 缓存按学生文件夹的内容指纹（文件名、大小、修改时间）命名，文件夹变化后自动使用新的压缩包
+- 生成新压缩包后删除同一文件夹的旧压缩包，长期未访问的压缩包定期清理
+- 多个请求同时下载同一文件夹时只生成一次，其余请求等待生成结果
+
+压缩包存放在 上传目录/temp/archives 下，不会出现在提交索引中。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+from util.config import UPLOAD_FOLDER
+from util.zip_stream import write_zip
+
+# 压缩包缓存目录
+ARCHIVE_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'temp', 'archives')
+
+# 超过该时间未被下载的压缩包会被清理（秒）
+ARCHIVE_CACHE_EXPIRE = 7 * 24 * 3600
+
+# 正在生成的压缩包: {压缩包路径: threading.Event}
+_building = {}
+_building_lock = threading.Lock()
+
+
+def _iter_folder_files(folder_path):
+    """遍历文件夹中的文件，返回 (文件路径, 压缩包内路径) 列表（按压缩包内路径排序）"""
+    entries = []
+    for root, _, files in os.walk(folder_path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            entries.append((file_path, os.path.relpath(file_path, folder_path)))
+    return sorted(entries, key=lambda entry: entry[1])
+
+
+def folder_fingerprint(folder_path):
+    """
+    计算文件夹的内容指纹（只读取文件元数据，不读取文件内容）
+
+    Args:
+        folder_path (str): 学生文件夹路径
+
+    Returns:
+        str: 指纹字符串
+    """
+    digest = hashlib.sha1()
+    for file_path, arcname in _iter_folder_files(folder_path):
+        stat = os.stat(file_path)
+        digest.update(f"{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()[:20]
+
+
+def _folder_key(folder_path):
+    """学生文件夹对应的缓存文件名前缀"""
+    return hashlib.sha1(os.path.abspath(folder_path).encode('utf-8')).hexdigest()[:16]
+
+
+def _remove_archives(prefix, keep=None):
+    """删除指定前缀的缓存压缩包"""
+    if not os.path.isdir(ARCHIVE_CACHE_FOLDER):
+        return
+    with os.scandir(ARCHIVE_CACHE_FOLDER) as entries:
+        for entry in entries:
+            if entry.name.startswith(prefix) and entry.name.endswith('.zip') and entry.path != keep:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    logging.warning(f"删除缓存压缩包失败: {entry.path}, 错误: {e}")
+
+
+def _cleanup_expired():
+    """清理长期未访问的缓存压缩包"""
+    expire_before = time.time() - ARCHIVE_CACHE_EXPIRE
+    with os.scandir(ARCHIVE_CACHE_FOLDER) as entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith('.zip') and entry.stat().st_mtime < expire_before:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _build_archive(folder_path, archive_path):
+    """生成压缩包（先写入临时文件再重命名）"""
+    fd, tmp_path = tempfile.mkstemp(dir=ARCHIVE_CACHE_FOLDER, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_zip(_iter_folder_files(folder_path), f)
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def get_student_archive(folder_path):
+    """
+    获取学生文件夹的压缩包，缓存不存在或文件夹已变化时生成新的压缩包
+
+    压缩包内的文件路径相对于学生文件夹。
+
+    Args:
+        folder_path (str): 学生文件夹路径
+
+    Returns:
+        str: 压缩包路径
+    """
+    os.makedirs(ARCHIVE_CACHE_FOLDER, exist_ok=True)
+    prefix = _folder_key(folder_path)
+
+    while True:
+        archive_path = os.path.join(ARCHIVE_CACHE_FOLDER, f"{prefix}-{folder_fingerprint(folder_path)}.zip")
+
+        if os.path.exists(archive_path):
+            # 更新修改时间，记录最近访问
+            try:
+                os.utime(archive_path)
+            except OSError:
+                pass
+            return archive_path
+
+        with _building_lock:
+            event = _building.get(archive_path)
+            is_builder = event is None
+            if is_builder:
+                event = _building[archive_path] = threading.Event()
+
+        if not is_builder:
+            # 其他请求正在生成同一个压缩包，等待完成后重新检查
+            event.wait()
+            continue
+
+        try:
+            start = time.time()
+            _build_archive(folder_path, archive_path)
+            _remove_archives(f"{prefix}-", keep=archive_path)
+            _cleanup_expired()
+            logging.info(f"已生成提交压缩包: {folder_path}, 耗时 {time.time() - start:.2f} 秒")
+            return archive_path
+        finally:
+            with _building_lock:
+                del _building[archive_path]
+            event.set()
+
+
+def invalidate(folder_path):
+    """
+    删除学生文件夹的缓存压缩包（删除提交后调用）
+
+    Args:
+        folder_path (str): 学生文件夹路径
+    """
+    _remove_archives(f"{_folder_key(folder_path)}-")
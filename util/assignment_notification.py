@@ -13,197 +13,74 @@
 """
 
 import os
-import smtplib
 import logging
-import threading
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 
-from util.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD
+from util.config import SMTP_USERNAME
 from util.models import load_users
 from util.utils import load_course_config
+from util import mail_outbox, mail_fanout, email_render
 
-# HTML邮件模板
-ASSIGNMENT_NOTIFICATION_HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>新作业发布通知</title>
-    <style>
-        body {{
-            font-family: 'Helvetica Neue', Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            background-color: #f7f7f7;
-            margin: 0;
-            padding: 0;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 20px auto;
-            background-color: #ffffff;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
-            overflow: hidden;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #4f46e5, #3b82f6);
-            color: white;
-            padding: 30px 20px;
-            text-align: center;
-        }}
-        .header h2 {{
-            margin: 0;
-            font-size: 24px;
-            font-weight: 700;
-        }}
-        .header p {{
-            margin: 5px 0 0;
-            font-size: 16px;
-            opacity: 0.9;
-        }}
-        .content {{
-            padding: 30px 20px;
-        }}
-        .assignment-details {{
-            background-color: #f0f9ff;
-            border-left: 4px solid #3b82f6;
-            padding: 15px;
-            margin: 20px 0;
-            border-radius: 0 4px 4px 0;
-        }}
-        .detail-item {{
-            margin-bottom: 10px;
-        }}
-        .detail-label {{
-            font-weight: bold;
-            color: #4f46e5;
-            margin-right: 5px;
-        }}
-        .due-date {{
-            background-color: #fef3c7;
-            border-radius: 4px;
-            padding: 8px 12px;
-            margin: 15px 0;
-            font-weight: bold;
-            color: #b45309;
-            display: inline-block;
-        }}
-        .button-container {{
-            margin: 25px 0;
-            text-align: center;
-        }}
-        .button {{
-            display: inline-block;
-            background-color: #4f46e5;
-            color: white !important; /* 强制使用白色，覆盖链接默认颜色 */
-            padding: 12px 25px;
-            text-decoration: none;
-            border-radius: 4px;
-            font-weight: 600;
-            transition: background-color 0.2s;
-        }}
-        .button:hover {{
-            background-color: #4338ca;
-        }}
-        .description {{
-            background-color: #f9fafb;
-            padding: 15px;
-            border-radius: 4px;
-            margin: 20px 0;
-            border: 1px solid #e5e7eb;
-        }}
-        .footer {{
-            background-color: #f9fafb;
-            border-top: 1px solid #e5e7eb;
-            padding: 20px;
-            text-align: center;
-            font-size: 12px;
-            color: #6b7280;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h2>📚 新作业发布通知</h2>
-            <p>课程: {course_name}</p>
-        </div>
-        
-        <div class="content">
-            <p>亲爱的 {student_name} 同学，您好：</p>
-            
-            <p>您的课程 <strong>{course_name}</strong> 有一个新作业已发布：</p>
-            
-            <div class="assignment-details">
-                <div class="detail-item">
-                    <span class="detail-label">作业名称:</span> {assignment_name}
-                </div>
-                <div class="detail-item">
-                    <span class="detail-label">班级:</span> {class_name}
-                </div>
-                <div class="detail-item">
-                    <span class="detail-label">发布时间:</span> {publish_time}
-                </div>
-            </div>
-            
-            <div class="due-date">
-                📅 截止日期: {due_date}
-            </div>
-            
-            <div class="description">
-                <p><strong>作业描述:</strong></p>
-                <p>{description}</p>
-            </div>
-            
-            <div class="button-container">
-                <a href="http://172.16.244.156:10099/login" class="button">立即前往查看</a>
-            </div>
-            
-            <p>请在截止日期前完成作业提交。如有任何问题，请联系管理员或学习委员。</p>
-            
-            <p>祝学习愉快！</p>
-        </div>
-        
-        <div class="footer">
-            <p>&copy; {year} 作业提交系统 | 遥感科学与技术 | 中山大学</p>
-            <p>此邮件由系统自动发送，请勿直接回复。</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-
-# 纯文本邮件模板
-ASSIGNMENT_NOTIFICATION_TEXT = """
-【新作业发布通知】
-
-亲爱的 {student_name} 同学，您好：
-
-您的课程 {course_name} 有一个新作业已发布：
+# 邮件模板: util/email_content/assignment_notification_html.html 和 assignment_notification_txt.txt
 
-- 作业名称: {assignment_name}
-- 班级: {class_name}
-- 发布时间: {publish_time}
-- 截止日期: {due_date}
-
-作业描述:
-{description}
-
-请在截止日期前登录系统完成作业提交。
-立即前往提交: http://172.16.244.156:10099/login
-
-如有任何问题，请联系您的任课教师。
+def build_assignment_notification(email, student_name, course_name, assignment_name,
+                                  class_name, due_date, description):
+    """
+    生成作业发布通知邮件
 
-祝学习愉快！
+    Args:
+        参数同 send_assignment_notification_email
 
----
-© {year} 作业提交系统 | 遥感科学与技术 | 中山大学
-此邮件由系统自动发送，请勿直接回复。
-"""
+    Returns:
+        MIMEMultipart: 邮件对象
+    """
+    msg = MIMEMultipart('alternative')
+    msg['From'] = formataddr(("Star Vortex", SMTP_USERNAME))
+    msg['To'] = email
+    msg['Subject'] = f'【新作业通知】{course_name} - {assignment_name}'
+    
+    # 当前时间
+    now = datetime.now().strftime('%Y-%m-%d %H:%M')
+    current_year = datetime.now().year
+    
+    # 生成HTML邮件内容
+    html_content = email_render.render(
+        'assignment_notification_html.html',
+        student_name=student_name,
+        course_name=course_name,
+        assignment_name=assignment_name,
+        class_name=class_name,
+        publish_time=now,
+        due_date=due_date,
+        description=description or "暂无详细描述",
+        year=current_year
+    )
+    
+    # 生成纯文本内容
+    text_content = email_render.render(
+        'assignment_notification_txt.txt',
+        student_name=student_name,
+        course_name=course_name,
+        assignment_name=assignment_name,
+        class_name=class_name,
+        publish_time=now,
+        due_date=due_date,
+        description=description or "暂无详细描述",
+        year=current_year
+    )
+    
+    # 添加两种格式的内容
+    part1 = MIMEText(text_content, 'plain', 'utf-8')
+    part2 = MIMEText(html_content, 'html', 'utf-8')
+    
+    # 先添加纯文本格式，再添加HTML格式
+    # （邮件客户端会优先显示后添加的HTML格式，不支持HTML的客户端则显示纯文本）
+    msg.attach(part1)
+    msg.attach(part2)
+    return msg
 
 def send_assignment_notification_email(email, student_name, course_name, assignment_name, 
                                        class_name, due_date, description):
@@ -220,67 +97,43 @@ def send_assignment_notification_email(email, student_name, course_name, assignm
         description (str): 作业描述
         
     Returns:
-        bool: 是否发送成功
+        bool: 是否成功加入发件箱
     """
     try:
-        # 创建邮件
-        msg = MIMEMultipart('alternative')
-        msg['From'] = formataddr(("Star Vortex", SMTP_USERNAME))
-        msg['To'] = email
-        msg['Subject'] = f'【新作业通知】{course_name} - {assignment_name}'
-        
-        # 当前时间
-        now = datetime.now().strftime('%Y-%m-%d %H:%M')
-        current_year = datetime.now().year
-        
-        # 生成HTML邮件内容
-        html_content = ASSIGNMENT_NOTIFICATION_HTML.format(
-            student_name=student_name,
-            course_name=course_name,
-            assignment_name=assignment_name,
-            class_name=class_name,
-            publish_time=now,
-            due_date=due_date,
-            description=description or "暂无详细描述",
-            year=current_year
-        )
+        msg = build_assignment_notification(email, student_name, course_name, assignment_name,
+                                            class_name, due_date, description)
         
-        # 生成纯文本内容
-        text_content = ASSIGNMENT_NOTIFICATION_TEXT.format(
-            student_name=student_name,
-            course_name=course_name,
-            assignment_name=assignment_name,
-            class_name=class_name,
-            publish_time=now,
-            due_date=due_date,
-            description=description or "暂无详细描述",
-            year=current_year
-        )
-        
-        # 添加两种格式的内容
-        part1 = MIMEText(text_content, 'plain', 'utf-8')
-        part2 = MIMEText(html_content, 'html', 'utf-8')
-        
-        # 先添加纯文本格式，再添加HTML格式
-        # （邮件客户端会优先显示后添加的HTML格式，不支持HTML的客户端则显示纯文本）
-        msg.attach(part1)
-        msg.attach(part2)
+        # 写入发件箱，由发送线程投递
+        mail_outbox.enqueue(msg, [email], 'assignment_notification',
+                            dedup_key=f"assignment:{course_name}:{assignment_name}:{due_date}:{email}")
         
-        # 发送邮件
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_USERNAME, [email], msg.as_string())
-        
-        logging.info(f'作业发布通知邮件已发送至 {email} (学生: {student_name}, 课程: {course_name}, 作业: {assignment_name})')
+        logging.info(f'作业发布通知邮件已加入发件箱: {email} (学生: {student_name}, 课程: {course_name}, 作业: {assignment_name})')
         return True
     except Exception as e:
         logging.error(f'发送作业发布通知邮件失败: {e}')
         return False
 
+def _notification_tasks(users, class_name, course_name, assignment_name, due_date, description, dedup_prefix):
+    """生成班级中每个学生的通知邮件任务"""
+    tasks = []
+    for username, user_data in users.items():
+        if user_data.get('is_admin', False) or user_data.get('class_name') != class_name:
+            continue
+        email = user_data.get('email')
+        tasks.append({
+            'group': class_name,
+            'recipient': email,
+            'name': username,
+            'dedup_key': f"{dedup_prefix}:{username}",
+            'build': lambda email=email, username=username: build_assignment_notification(
+                email, username, course_name, assignment_name, class_name, due_date, description
+            )
+        })
+    return tasks
+
 def notify_class_of_new_assignment(class_name, course_name, assignment_name, due_date, description=None):
     """
-    向班级中的所有学生发送作业发布通知
+    向班级中的所有学生发送作业发布通知（写入发件箱，阻塞直到发送完成）
     
     Args:
         class_name (str): 班级名称
@@ -292,58 +145,26 @@ def notify_class_of_new_assignment(class_name, course_name, assignment_name, due
     Returns:
         tuple: (success_count, failed_count, total_students)
     """
-    # 加载所有用户
-    users = load_users()
-    
-    # 筛选该班级的学生
-    class_students = []
-    for username, user_data in users.items():
-        if not user_data.get('is_admin', False) and user_data.get('class_name') == class_name:
-            class_students.append((username, user_data))
-    
-    logging.info(f"班级 '{class_name}' 有 {len(class_students)} 名学生")
+    tasks = _notification_tasks(load_users(), class_name, course_name, assignment_name, due_date, description,
+                                f"assignment:{course_name}:{assignment_name}:{due_date}:{class_name}")
+    logging.info(f"班级 '{class_name}' 有 {len(tasks)} 名学生")
     
-    # 发送通知统计
-    success_count = 0
-    failed_count = 0
-    
-    # 为每个学生发送通知
-    for username, user_data in class_students:
-        email = user_data.get('email')
-        
-        # 检查邮箱
-        if not email:
-            logging.warning(f"学生 {username} 没有邮箱，无法发送通知")
-            failed_count += 1
-            continue
-        
-        # 发送通知
-        success = send_assignment_notification_email(
-            email=email,
-            student_name=username,
-            course_name=course_name,
-            assignment_name=assignment_name,
-            class_name=class_name,
-            due_date=due_date,
-            description=description
-        )
-        
-        if success:
-            success_count += 1
-        else:
-            failed_count += 1
-    
-    return success_count, failed_count, len(class_students)
+    run_id = mail_fanout.start_run(f"{course_name} - {assignment_name}", {class_name: len(tasks)})
+    counts = mail_fanout.send_all(run_id, tasks, 'assignment_notification', wait=True)['groups'][class_name]
+    return counts['success'], counts['failed'], counts['total']
 
 def send_assignment_notifications(assignment_data):
     """
     发送作业发布通知主函数，适用于新创建的作业
     
+    所有班级的通知在返回前写入持久化发件箱，由发送线程并发、限速发送，
+    进度可通过 mail_fanout.get_run 查询。
+    
     Args:
         assignment_data (dict): 作业数据，包含课程名、作业名、班级等信息
         
     Returns:
-        bool: 是否成功启动通知线程
+        str: 发送任务ID，写入失败时返回None
     """
     try:
         # 提取作业信息
@@ -355,44 +176,29 @@ def send_assignment_notifications(assignment_data):
         # 格式化截止日期
         due_date = datetime.fromisoformat(assignment_data.get('dueDate')).strftime('%Y-%m-%d %H:%M')
         
-        # 创建单独的线程发送邮件，避免阻塞主线程
-        def send_notifications_thread():
-            stats = {}
-            logging.info(f"开始为作业 '{course_name} - {assignment_name}' 发送通知到 {len(class_names)} 个班级")
-            
-            for class_name in class_names:
-                success, failed, total = notify_class_of_new_assignment(
-                    class_name=class_name,
-                    course_name=course_name,
-                    assignment_name=assignment_name,
-                    due_date=due_date,
-                    description=description
-                )
-                
-                stats[class_name] = {
-                    'success': success,
-                    'failed': failed,
-                    'total': total
-                }
-                
-                logging.info(f"班级 '{class_name}' 通知发送完成: 成功 {success}/{total}, 失败 {failed}/{total}")
-            
-            total_success = sum(s['success'] for s in stats.values())
-            total_failed = sum(s['failed'] for s in stats.values())
-            total_students = sum(s['total'] for s in stats.values())
-            
-            logging.info(f"作业 '{course_name} - {assignment_name}' 通知发送完成: 成功 {total_success}/{total_students}, 失败 {total_failed}/{total_students}")
+        # 生成所有班级的邮件任务
+        users = load_users()
+        tasks_by_class = {
+            class_name: _notification_tasks(
+                users, class_name, course_name, assignment_name, due_date, description,
+                f"assignment:{assignment_data.get('id')}:{class_name}"
+            )
+            for class_name in class_names
+        }
+        run_id = mail_fanout.start_run(
+            f"{course_name} - {assignment_name}",
+            {class_name: len(tasks) for class_name, tasks in tasks_by_class.items()}
+        )
         
-        # 启动通知线程
-        notification_thread = threading.Thread(target=send_notifications_thread)
-        notification_thread.daemon = True
-        notification_thread.start()
+        logging.info(f"开始为作业 '{course_name} - {assignment_name}' 发送通知到 {len(class_names)} 个班级")
+        tasks = [task for class_tasks in tasks_by_class.values() for task in class_tasks]
+        mail_fanout.send_all(run_id, tasks, 'assignment_notification')
         
-        logging.info(f"作业通知线程已启动: 作业 '{course_name} - {assignment_name}'")
-        return True
+        logging.info(f"作业通知已加入发件箱: 作业 '{course_name} - {assignment_name}', 发送任务 {run_id}")
+        return run_id
     
     except Exception as e:
-        logging.error(f"启动作业通知线程失败: {e}")
+        logging.error(f"提交作业通知任务失败: {e}")
         import traceback
         logging.error(traceback.format_exc())
-        return False
\ No newline at end of file
+        return None
@@ -0,0 +1,127 @@
+"""
+作业传输系统 - 作业查询模块
+
+各处理函数原来每次都加载整个作业列表，再用 next(...) 线性查找课程和作业名称匹配的作业。
+本模块按数据版本（见 utils.get_data_version）为作业列表建立一次哈希索引，供所有模块共用：
+- 按作业ID
+- 按 (课程, 作业名称)
+- 按 (班级, 课程)，以及其中的作业名称
+- 按课程（用于包括没有指定班级的作业）
+
+作业列表或课程配置被修改（包括其他进程修改）后，下一次查询时重建索引。
+查询返回作业数据的副本，调用方可以放心修改；需要修改并保存作业列表时仍使用 load_assignments()。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import copy
+import logging
+import threading
+
+from util.utils import load_assignments, get_data_version
+
+
+class AssignmentRepository:
+    """
+    作业列表的索引（同一课程和名称有多个作业时与原来的线性查找一致，取列表中第一个）
+
+    Args:
+        assignments (list): 作业列表
+        version: 作业列表对应的数据版本
+    """
+
+    def __init__(self, assignments, version):
+        self.version = version
+        self._assignments = assignments
+        self._by_id = {}
+        self._by_course_name = {}
+        self._by_class_course = {}
+        self._by_course = {}
+        for assignment in assignments:
+            self._by_id.setdefault(assignment.get('id'), assignment)
+            self._by_course.setdefault(assignment['course'], []).append(assignment)
+            self._by_course_name.setdefault((assignment['course'], assignment['name']), assignment)
+            for class_name in assignment.get('classNames', []):
+                self._by_class_course.setdefault((class_name, assignment['course']), {}).setdefault(
+                    assignment['name'], assignment)
+
+    def get(self, assignment_id):
+        """按ID查找作业，不存在时返回None"""
+        return copy.deepcopy(self._by_id.get(assignment_id))
+
+    def find(self, course, name):
+        """按课程和作业名称查找作业，不存在时返回None"""
+        return copy.deepcopy(self._by_course_name.get((course, name)))
+
+    def find_in_class(self, class_name, course, name):
+        """查找布置给指定班级的作业，不存在时返回None"""
+        return copy.deepcopy(self._by_class_course.get((class_name, course), {}).get(name))
+
+    def for_class(self, class_name, course, include_unassigned=False):
+        """
+        获取布置给指定班级的某门课程的所有作业（保持作业列表中的顺序）
+
+        include_unassigned 为True时还包括该课程没有指定班级的作业（适用于所有班级）
+        """
+        if include_unassigned:
+            return copy.deepcopy([a for a in self._by_course.get(course, [])
+                                  if not a.get('classNames') or class_name in a['classNames']])
+        return copy.deepcopy(list(self._by_class_course.get((class_name, course), {}).values()))
+
+    def __len__(self):
+        return len(self._assignments)
+
+
+_repository = None
+_lock = threading.Lock()
+
+
+def get_repository():
+    """
+    获取当前数据版本的作业索引，数据版本变化时重建
+
+    Returns:
+        AssignmentRepository: 作业索引
+    """
+    global _repository
+
+    # 先取版本再加载数据：加载期间数据被修改时，下一次查询会因版本不同而重建
+    version = get_data_version()
+    repository = _repository
+    if repository is not None and repository.version == version:
+        return repository
+
+    with _lock:
+        if _repository is None or _repository.version != version:
+            _repository = AssignmentRepository(load_assignments(), version)
+            logging.info(f"已建立作业索引，共 {len(_repository)} 个作业")
+        return _repository
+
+
+def get_assignment(assignment_id):
+    """按ID查找作业，不存在时返回None"""
+    return get_repository().get(assignment_id)
+
+
+def find_assignment(course, name, class_name=None):
+    """
+    按课程和作业名称查找作业
+
+    Args:
+        course (str): 课程名称
+        name (str): 作业名称
+        class_name (str, optional): 指定时只查找布置给该班级的作业
+
+    Returns:
+        dict: 作业数据副本，不存在时返回None
+    """
+    if class_name is None:
+        return get_repository().find(course, name)
+    return get_repository().find_in_class(class_name, course, name)
+
+
+def class_assignments(class_name, course, include_unassigned=False):
+    """获取布置给指定班级的某门课程的所有作业（include_unassigned 见 AssignmentRepository.for_class）"""
+    return get_repository().for_class(class_name, course, include_unassigned)
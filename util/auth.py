@@ -25,7 +25,10 @@ from flask import Blueprint, render_template, request, redirect, url_for, jsonif
 from flask_login import login_user, logout_user, login_required, current_user
 from functools import wraps
 
-from util.models import User, validate_user, load_users, save_users
+from util.models import (
+    User, validate_user,
+    get_user, save_user, find_user_by_email, find_user_by_student_id
+)
 from util.utils import verification_codes, send_verification_email, generate_verification_code, reset_codes, send_reset_password_email, get_all_classes
 from util.config import ADMIN_USERNAME, ADMIN_PASSWORD_HASH
 # 导入新增的管理员认证模块
@@ -138,11 +141,8 @@ def register():
     name = stored_info['name']
     student_id = stored_info['student_id']
 
-    # 加载现有用户
-    users = load_users()
-
     # 检查用户是否已存在
-    if name in users:
+    if get_user(name) is not None:
         return jsonify({'status': 'error', 'message': '用户名已存在'})
 
     # 创建新用户
@@ -154,11 +154,8 @@ def register():
         'class_name': class_name  # 保存班级信息
     }
 
-    # 以姓名为用户名
-    users[name] = new_user
-
-    # 保存用户
-    save_users(users)
+    # 以姓名为用户名，保存用户
+    save_user(name, new_user)
 
     # 清除验证码
     del verification_codes[email]
@@ -182,9 +179,8 @@ def send_verify_code():
     
     # 如果不是测试邮箱，则检查是否已被注册、是否符合邮箱格式
     if email not in test_emails:
-        # 检查用户是否已存在
-        users = load_users()
-        if any(user.get('email') == email or user.get('student_id') == student_id for user in users.values()):
+        # 检查用户是否已存在（按邮箱和学号索引查找）
+        if find_user_by_email(email)[0] is not None or find_user_by_student_id(student_id)[0] is not None:
             return jsonify({'status': 'error', 'message': '邮箱或学号已被注册'})
     
         if not (email.endswith('@mail2.sysu.edu.cn') or email.endswith('@mail.sysu.edu.cn')):
@@ -264,14 +260,9 @@ def send_reset_code():
         return jsonify({'status': 'error', 'message': '邮箱地址不能为空'})
     
     # 检查邮箱是否存在
-    users = load_users()
-    user_found = False
-    for username, user_info in users.items():
-        if user_info.get('email') == email:
-            user_found = True
-            break
+    username, _ = find_user_by_email(email)
     
-    if not user_found:
+    if username is None:
         return jsonify({'status': 'error', 'message': '该邮箱未注册'})
     
     # 生成8位随机验证码（数字和大写字母组合）
@@ -348,21 +339,14 @@ def reset_password():
         return jsonify({'status': 'error', 'message': '验证码错误'})
     
     # 查找对应邮箱的用户
-    users = load_users()
-    user_updated = False
-    
-    for username, user_info in users.items():
-        if user_info.get('email') == email:
-            # 更新用户密码
-            users[username]['password'] = generate_password_hash(password)
-            user_updated = True
-            break
+    username, user_info = find_user_by_email(email)
     
-    if not user_updated:
+    if username is None:
         return jsonify({'status': 'error', 'message': '用户不存在'})
     
-    # 保存更新后的用户信息
-    save_users(users)
+    # 更新用户密码并保存
+    user_info['password'] = generate_password_hash(password)
+    save_user(username, user_info)
     
     # 删除验证码
     del reset_codes[email]
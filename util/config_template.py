@@ -70,6 +70,47 @@ USERS_FILE = 'users.json'
 COURSE_CONFIG_FILE = 'course_config.json'
 ASSIGNMENTS_FILE = 'assignments.json'
 
+# 数据存储后端配置
+# 'json': 直接读写上面的JSON文件（默认）
+# 'sqlite': 使用SQLite数据库，首次启动时自动从JSON文件迁移数据
+STORAGE_BACKEND = 'json'
+DATABASE_FILE = 'data/starvortex.db'
+
+# 打包下载时并行压缩的线程数（默认按CPU核心数，最多8个）
+# ARCHIVE_WORKERS = 4
+
+# 后台任务（通知邮件、截止日期检查等）的工作线程数和最多排队任务数
+# JOB_WORKERS = 4
+# JOB_QUEUE_SIZE = 1000
+
+# 邮件发送连接池中最多同时使用的SMTP连接数
+# SMTP_POOL_SIZE = 4
+
+# 批量通知邮件每秒最多发送的数量（SMTP中继的频率限制）和并发发送的线程数
+# MAIL_RATE_LIMIT = 5
+# MAIL_FANOUT_WORKERS = 4
+
+# 持久化邮件发件箱数据库（未发送的邮件在重启后继续发送）
+# OUTBOX_DATABASE = 'data/mail_outbox.db'
+
+# 截止提醒的默认时间（截止前多少小时），可在作业的高级设置中单独配置
+# REMINDER_OFFSETS = [72, 24, 2]
+
+# 定时任务数据库（任务存储、执行历史，多进程部署时用于选出运行定时任务的进程）
+# SCHEDULER_DATABASE = 'data/scheduler.db'
+
+# 提交索引数据库（上传目录中的作业目录、学生文件夹和文件）
+# SUBMISSION_INDEX_DATABASE = 'data/submission_index.db'
+
+# 提交事件日志和每日提交统计数据库
+# SUBMISSION_EVENTS_DATABASE = 'data/submission_events.db'
+
+# 通知已读记录数据库
+# NOTIFICATION_READS_DATABASE = 'data/notification_reads.db'
+
+# 服务器推送事件（新通知、提交数变化、上传完成）数据库
+# LIVE_EVENTS_DATABASE = 'data/live_events.db'
+
 def allowed_file(filename):
     """检查文件扩展名是否允许上传"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
\ No newline at end of file
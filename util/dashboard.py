@@ -0,0 +1,203 @@
+"""
+作业传输系统 - 学生作业看板模块
+
+为 /all_assignments 预先计算每个班级的作业列表和提交情况，请求时只需合并当前学生的状态：
+- 班级作业视图: 班级所有课程的作业信息（截止时间、说明等），作业列表或课程配置变化后重建
+- 班级提交情况: 每个作业的提交人数，以及每个学生文件夹已提交的作业集合，
+  上传、删除提交时增量更新，提交索引被其他进程或管理员操作修改后重建
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from util.config import UPLOAD_FOLDER
+from util.utils import load_course_config, get_data_version
+from util.assignment_repo import find_assignment
+from util import submission_index
+
+# 班级作业视图: {班级: (数据版本, 作业列表)}
+_class_views = {}
+
+# 班级提交情况: {班级: _ClassSubmissions}
+_class_submissions = {}
+
+_lock = threading.Lock()
+
+
+class _ClassSubmissions:
+    """班级的提交情况"""
+
+    def __init__(self, data_version, generation):
+        self.data_version = data_version
+        self.generation = generation
+        # {作业目录: 提交人数}
+        self.counts = {}
+        # {学生文件夹名: 已提交的作业目录集合}
+        self.submitted = {}
+
+
+def _assignment_key(class_name, course, assignment_name):
+    """作业目录相对于上传目录的路径（新结构: 班级/课程/作业）"""
+    return f"{class_name}/{course}/{assignment_name}"
+
+
+def _build_view(class_name):
+    """生成班级作业视图，班级不存在时返回None"""
+    config = load_course_config()
+    class_info = next((c for c in config.get('classes', []) if c['name'] == class_name), None)
+    if class_info is None:
+        return None
+
+    entries = []
+    for course_info in class_info.get('courses', []):
+        course_name = course_info['name']
+        for assignment_name in course_info.get('assignments', []):
+            detail = find_assignment(course_name, assignment_name)
+            if detail:
+                due_date = detail['dueDate']
+                due_ts = datetime.fromisoformat(due_date).timestamp()
+            else:
+                # 没有作业详情时截止日期为请求时的一周后
+                due_date = due_ts = None
+            entries.append({
+                'id': (detail or {}).get('id', f"{course_name}_{assignment_name}"),
+                'course': course_name,
+                'name': assignment_name,
+                'dueDate': due_date,
+                'dueTimestamp': due_ts,
+                'description': (detail or {}).get('description', ''),
+                'key': _assignment_key(class_name, course_name, assignment_name)
+            })
+    return entries
+
+
+def _build_submissions(entries, data_version, generation):
+    """从提交索引生成班级的提交情况"""
+    submissions = _ClassSubmissions(data_version, generation)
+    for entry in entries:
+        folders = [name for name in submission_index.get_folder_names(os.path.join(UPLOAD_FOLDER, *entry['key'].split('/')))
+                   if not name.endswith('.zip')]
+        submissions.counts[entry['key']] = len(folders)
+        for name in folders:
+            submissions.submitted.setdefault(name, set()).add(entry['key'])
+    return submissions
+
+
+def _get_class_state(class_name):
+    """获取班级作业视图和提交情况，数据版本或提交索引变化时重建"""
+    data_version = get_data_version()
+    generation = submission_index.get_generation()
+
+    with _lock:
+        cached = _class_views.get(class_name)
+        if cached is None or cached[0] != data_version:
+            cached = (data_version, _build_view(class_name))
+            _class_views[class_name] = cached
+            logging.info(f"已生成班级作业视图: {class_name}")
+        entries = cached[1]
+        if entries is None:
+            return None, None
+
+        submissions = _class_submissions.get(class_name)
+        if (submissions is None or submissions.data_version != data_version or
+                submissions.generation != generation):
+            submissions = _build_submissions(entries, data_version, generation)
+            _class_submissions[class_name] = submissions
+        return entries, submissions
+
+
+def _apply(path, change):
+    """
+    将上传或删除增量应用到班级提交情况
+
+    只有在提交索引恰好因本次操作变化一次时才增量更新，否则（期间索引还有其他变化）
+    保持原状，由下一次读取时重建。
+    """
+    parts = os.path.relpath(os.path.normpath(path), os.path.normpath(UPLOAD_FOLDER)).replace(os.sep, '/').split('/')
+    if len(parts) != 4 or parts[0] == '..' or parts[3].endswith('.zip'):
+        return
+    class_name, folder = parts[0], parts[3]
+    key = '/'.join(parts[:3])
+    generation = submission_index.get_generation()
+
+    with _lock:
+        submissions = _class_submissions.get(class_name)
+        if submissions is None or submissions.generation != generation - 1:
+            return
+        submissions.generation = generation
+        if key not in submissions.counts:
+            return
+        change(submissions, key, folder)
+
+
+def record_upload(student_folder):
+    """
+    学生上传文件后更新提交情况（在提交索引更新之后调用）
+
+    Args:
+        student_folder (str): 学生文件夹路径（上传目录/班级/课程/作业/学号_用户名）
+    """
+    def add(submissions, key, folder):
+        keys = submissions.submitted.setdefault(folder, set())
+        if key not in keys:
+            keys.add(key)
+            submissions.counts[key] += 1
+
+    _apply(student_folder, add)
+
+
+def record_removal(student_folder):
+    """
+    学生删除提交后更新提交情况（在提交索引更新之后调用）
+
+    Args:
+        student_folder (str): 已删除的学生文件夹路径
+    """
+    def remove(submissions, key, folder):
+        keys = submissions.submitted.get(folder)
+        if keys and key in keys:
+            keys.discard(key)
+            submissions.counts[key] -= 1
+
+    _apply(student_folder, remove)
+
+
+def get_student_assignments(class_name, student_id, username):
+    """
+    获取学生所在班级的所有作业及其提交状态
+
+    Args:
+        class_name (str): 班级名称
+        student_id (str): 学号
+        username (str): 用户名
+
+    Returns:
+        list: 作业列表，班级不存在时返回None
+    """
+    entries, submissions = _get_class_state(class_name)
+    if entries is None:
+        return None
+
+    now = datetime.now()
+    submitted = submissions.submitted.get(f"{student_id}_{username}", set())
+    result = []
+    for entry in entries:
+        due_date = entry['dueDate'] or (now + timedelta(days=7)).isoformat()
+        due_ts = entry['dueTimestamp']
+        result.append({
+            'id': entry['id'],
+            'course': entry['course'],
+            'name': entry['name'],
+            'dueDate': due_date,
+            'description': entry['description'],
+            'isExpired': due_ts is not None and due_ts < now.timestamp(),
+            'hasSubmitted': entry['key'] in submitted,
+            'submissionCount': submissions.counts.get(entry['key'], 0)
+        })
+    return result
@@ -1,13 +1,15 @@
 """
 作业传输系统 - 截止日期提醒模块
 
-此模块提供作业截止日期提醒功能，在作业截止前一天自动发送邮件提醒尚未提交作业的学生。
+此模块提供作业截止日期提醒功能，在作业截止前的多个时间点（默认截止前72、24、2小时，
+可在作业高级设置中单独配置）自动发送邮件提醒尚未提交作业的学生。
 主要功能包括：
-- 检查即将到期的作业
+- 维护所有作业待触发提醒时刻的优先队列，调度器只在最近的提醒时刻触发，
+  每次只处理到期的作业
 - 识别未提交作业的学生
 - 发送HTML格式的提醒邮件
 
-该模块设计为由主应用程序通过定时任务调用，每天检查一次所有作业。
+每天的定时检查只作为补发：处理因服务重启等原因错过的提醒阶段。
 
 作者: [您的名字]
 版本: 1.0
@@ -15,28 +17,44 @@
 """
 
 import os
-import json
+import heapq
+import bisect
 import logging
-import smtplib
 import threading
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 
-from util.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, UPLOAD_FOLDER
+from util.config import SMTP_USERNAME
 from util.models import load_users
-from util.utils import load_course_config, load_assignments
+from util.utils import load_course_config, load_assignments, get_assignment_classes
+from util.assignment_repo import get_assignment
+from util import file_cache, file_store, job_queue, job_store, mail_outbox, email_render, submission_index
+
+try:
+    from util.config import REMINDER_OFFSETS
+except ImportError:
+    REMINDER_OFFSETS = [72, 24, 2]
 
 # 已发送提醒记录文件
 REMINDER_RECORD_FILE = 'data/reminder_records.json'
 
+# 提醒时刻错过后仍然补发的时间（秒），例如服务在提醒时刻前后重启
+REMINDER_MISFIRE_GRACE = 3600
+
+# 旧版本只在截止前一天提醒，其记录（reminded_students）视为 24 小时阶段
+LEGACY_STAGE = '24h'
+
+# 待触发的提醒时刻（最小堆）: [(提醒时间, 作业ID, 提前小时数)]
+_reminder_heap = []
+_reminder_lock = threading.Lock()
+
 def load_reminder_records():
     """加载已发送提醒记录"""
     if os.path.exists(REMINDER_RECORD_FILE):
         try:
-            with open(REMINDER_RECORD_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return file_cache.load_json(REMINDER_RECORD_FILE)
         except Exception as e:
             logging.error(f"加载提醒记录失败: {e}")
     
@@ -45,345 +63,434 @@ def load_reminder_records():
 def save_reminder_records(record):
     """保存提醒记录"""
     try:
-        # 确保目录存在
-        os.makedirs(os.path.dirname(REMINDER_RECORD_FILE), exist_ok=True)
-        with open(REMINDER_RECORD_FILE, 'w', encoding='utf-8') as f:
-            json.dump(record, f, ensure_ascii=False, indent=2)
+        file_store.write_json(REMINDER_RECORD_FILE, record)
     except Exception as e:
         logging.error(f"保存提醒记录失败: {e}")
 
-def has_already_reminded(course, assignment, student_id, assignment_id):
+def stage_key(offset):
+    """提醒阶段的记录键，如 72h、24h、0.5h"""
+    return f"{offset:g}h"
+
+def _stage_students(assignment_record, stage):
+    """获取某一提醒阶段已提醒的学号列表"""
+    students = assignment_record.get('stages', {}).get(stage)
+    if students is None and stage == LEGACY_STAGE:
+        students = assignment_record.get('reminded_students', [])
+    return students or []
+
+def has_already_reminded(course, assignment, student_id, assignment_id, stage=LEGACY_STAGE):
     """检查是否已经发送过提醒"""
     records = load_reminder_records()
     
     if assignment_id not in records:
         return False
         
-    assignment_record = records[assignment_id]
-    return student_id in assignment_record.get('reminded_students', [])
+    return student_id in _stage_students(records[assignment_id], stage)
 
-def mark_as_reminded(course, assignment, student_id, assignment_id):
+def mark_as_reminded(course, assignment, student_id, assignment_id, stage=LEGACY_STAGE):
     """标记已经发送提醒"""
-    records = load_reminder_records()
+    mark_all_as_reminded([(assignment_id, course, assignment, student_id, stage)])
+
+def mark_all_as_reminded(reminded):
+    """
+    批量标记已经发送提醒（一次读-改-写）
     
-    if assignment_id not in records:
-        records[assignment_id] = {
-            'course': course,
-            'assignment': assignment,
-            'reminded_students': []
-        }
+    Args:
+        reminded (list): (assignment_id, course, assignment, student_id, stage) 列表
+    """
+    def add_reminded(records):
+        for assignment_id, course, assignment, student_id, stage in reminded:
+            if assignment_id not in records:
+                records[assignment_id] = {
+                    'course': course,
+                    'assignment': assignment,
+                    'stages': {}
+                }
+            
+            stages = records[assignment_id].setdefault('stages', {})
+            if stage not in stages:
+                stages[stage] = list(_stage_students(records[assignment_id], stage))
+            if student_id not in stages[stage]:
+                stages[stage].append(student_id)
     
-    if student_id not in records[assignment_id]['reminded_students']:
-        records[assignment_id]['reminded_students'].append(student_id)
+    try:
+        file_store.update_json(REMINDER_RECORD_FILE, add_reminded)
+    except Exception as e:
+        logging.error(f"保存提醒记录失败: {e}")
+
+def get_submitted_folders(class_name, course, assignment):
+    """
+    获取作业的所有学生提交文件夹名称（从提交索引读取，合并三种目录结构）
     
-    save_reminder_records(records)
+    Returns:
+        list: 排序后的文件夹名称，可用 has_submitted_folder 按前缀查找
+    """
+    folders = set()
+    for path in submission_index.assignment_paths(class_name, course, assignment):
+        folders.update(submission_index.get_folder_names(path))
+    return sorted(folders)
+
+def has_submitted_folder(submitted_folders, student_id, username):
+    """在排序后的文件夹名称中二分查找以 "学号_用户名" 开头的文件夹"""
+    prefix = f"{student_id}_{username}"
+    index = bisect.bisect_left(submitted_folders, prefix)
+    return index < len(submitted_folders) and submitted_folders[index].startswith(prefix)
 
 def has_submitted(student_id, username, class_name, course, assignment):
     """检查学生是否已提交作业"""
-    # 检查多种可能的路径结构
-    possible_paths = [
-        os.path.join(UPLOAD_FOLDER, class_name, course, assignment),  # 新结构: /班级/课程/作业/
-        os.path.join(UPLOAD_FOLDER, course, class_name, assignment),  # 旧结构: /课程/班级/作业/
-        os.path.join(UPLOAD_FOLDER, course, assignment)               # 最旧结构: /课程/作业/
-    ]
-    
-    student_folder_pattern = f"{student_id}_{username}"
-    
-    for path in possible_paths:
-        if not os.path.exists(path):
-            continue
-            
-        # 查找匹配学生ID的文件夹
-        student_folders = [
-            f for f in os.listdir(path) 
-            if os.path.isdir(os.path.join(path, f)) and 
-            f.startswith(student_folder_pattern)
-        ]
-        
-        if student_folders:
-            return True
-    
-    return False
+    return has_submitted_folder(get_submitted_folders(class_name, course, assignment), student_id, username)
 
 def generate_reminder_email(username, student_id, course, assignment, due_date_str):
     """生成截止日期提醒邮件的HTML内容"""
-    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>作业截止日期提醒</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                background-color: #f59e0b;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 5px 5px 0 0;
-            }}
-            .content {{
-                background-color: #f9fafb;
-                padding: 20px;
-                border-radius: 0 0 5px 5px;
-                border: 1px solid #e5e7eb;
-                border-top: none;
-            }}
-            .info-item {{
-                margin-bottom: 10px;
-            }}
-            .info-label {{
-                font-weight: bold;
-                color: #b45309;
-            }}
-            .warning {{
-                background-color: #fef3c7;
-                border-left: 4px solid #f59e0b;
-                padding: 12px 15px;
-                margin: 15px 0;
-                font-weight: bold;
-            }}
-            .button {{
-                display: inline-block;
-                margin-top: 15px;
-                padding: 10px 20px;
-                background-color: #f59e0b;
-                color: white;
-                text-decoration: none;
-                border-radius: 5px;
-                font-weight: bold;
-                text-align: center;
-            }}
-            .footer {{
-                margin-top: 30px;
-                text-align: center;
-                color: #6b7280;
-                font-size: 12px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h2>⏰ 作业截止日期提醒 ⏰</h2>
-        </div>
-        <div class="content">
-            <p>亲爱的 {username} 同学，您好：</p>
-            
-            <div class="warning">
-                您有作业即将截止，请尽快完成并提交！
-            </div>
-            
-            <p>系统检测到您尚未提交以下作业：</p>
-            
-            <div class="info-item">
-                <span class="info-label">学号：</span> {student_id}
-            </div>
-            <div class="info-item">
-                <span class="info-label">课程：</span> {course}
-            </div>
-            <div class="info-item">
-                <span class="info-label">作业：</span> {assignment}
-            </div>
-            <div class="info-item">
-                <span class="info-label">截止日期：</span> {due_date_str}
-            </div>
-            <div class="info-item">
-                <span class="info-label">当前时间：</span> {now}
-            </div>
-            
-            <p>请在截止日期前登录系统完成作业提交。如有任何问题，请联系您的任课教师。</p>
-            
-            <a href="http://172.16.244.156:10099/login" class="button">立即登录系统</a>
-            
-            <p>祝学习愉快！</p>
-        </div>
-        <div class="footer">
-            <p>此邮件由系统自动发送，请勿回复。</p>
-            <p>&copy; 2025 作业提交系统 | 遥感科学与技术 | 中山大学</p>
-        </div>
-    </body>
-    </html>
-    """
+    return email_render.render(
+        'deadline_reminder_html.html',
+        username=username,
+        student_id=student_id,
+        course=course,
+        assignment=assignment,
+        due_date=due_date_str,
+        now=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+def build_reminder_email(email, username, student_id, course, assignment, due_date_str):
+    """生成截止日期提醒邮件"""
+    # 创建邮件
+    msg = MIMEMultipart('alternative')
+    msg['From'] = formataddr(("Star Vortex", SMTP_USERNAME))
+    msg['To'] = email
+    msg['Subject'] = f'【重要提醒】作业即将截止 - {course} - {assignment}'
+    
+    # 生成HTML邮件内容
+    html_content = generate_reminder_email(
+        username, student_id, course, assignment, due_date_str
+    )
+    
+    # 生成纯文本内容
+    text_content = email_render.render(
+        'deadline_reminder_txt.txt',
+        username=username,
+        student_id=student_id,
+        course=course,
+        assignment=assignment,
+        due_date=due_date_str,
+        now=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    )
     
-    return html
+    # 添加两种格式的内容
+    part1 = MIMEText(text_content, 'plain', 'utf-8')
+    part2 = MIMEText(html_content, 'html', 'utf-8')
+    
+    # 先添加纯文本格式，再添加HTML格式
+    msg.attach(part1)
+    msg.attach(part2)
+    return msg
+
+def _reminder_dedup_key(course, assignment, due_date_str, student_id, stage=LEGACY_STAGE):
+    """截止提醒的去重键：同一作业同一截止时间的每个提醒阶段只提醒一次"""
+    return f"deadline:{course}:{assignment}:{due_date_str}:{stage}:{student_id}"
 
 def send_reminder_email(email, username, student_id, course, assignment, due_date_str):
-    """发送截止日期提醒邮件"""
+    """发送截止日期提醒邮件（写入发件箱）"""
     try:
-        # 创建邮件
-        msg = MIMEMultipart('alternative')
-        msg['From'] = formataddr(("Star Vortex", SMTP_USERNAME))
-        msg['To'] = email
-        msg['Subject'] = f'【重要提醒】作业即将截止 - {course} - {assignment}'
-        
-        # 生成HTML邮件内容
-        html_content = generate_reminder_email(
-            username, student_id, course, assignment, due_date_str
-        )
-        
-        # 生成纯文本内容
-        text_content = f"""
-        【作业截止日期提醒】
-        
-        亲爱的 {username} 同学，您好：
-        
-        您有作业即将截止，请尽快完成并提交！
-        
-        系统检测到您尚未提交以下作业：
-        
-        学号：{student_id}
-        课程：{course}
-        作业：{assignment}
-        截止日期：{due_date_str}
-        当前时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        
-        请在截止日期前登录系统完成作业提交。如有任何问题，请联系您的任课教师。
-        
-        登录地址：http://172.16.244.156:10099/login
-        
-        祝学习愉快！
-        
-        此邮件由系统自动发送，请勿回复。
-        © 2025 作业提交系统 | 遥感科学与技术 | 中山大学
-        """
+        msg = build_reminder_email(email, username, student_id, course, assignment, due_date_str)
         
-        # 添加两种格式的内容
-        part1 = MIMEText(text_content, 'plain', 'utf-8')
-        part2 = MIMEText(html_content, 'html', 'utf-8')
+        # 写入发件箱，由发送线程投递
+        mail_outbox.enqueue(msg, [email], 'deadline_reminder',
+                            dedup_key=_reminder_dedup_key(course, assignment, due_date_str, student_id))
         
-        # 先添加纯文本格式，再添加HTML格式
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # 发送邮件
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_USERNAME, [email], msg.as_string())
-        
-        logging.info(f'截止日期提醒邮件已发送至 {email} (学号: {student_id}, 课程: {course}, 作业: {assignment})')
+        logging.info(f'截止日期提醒邮件已加入发件箱: {email} (学号: {student_id}, 课程: {course}, 作业: {assignment})')
         return True
     except Exception as e:
         logging.error(f'发送截止日期提醒邮件失败: {e}')
         return False
 
-def check_upcoming_deadlines():
-    """检查即将到期的作业并发送提醒"""
-    logging.info("开始检查即将到期的作业...")
+def get_reminder_offsets(assignment):
+    """
+    获取作业的提醒时间（截止前多少小时），作业高级设置中未指定时使用系统默认值
     
+    Returns:
+        list: 从大到小排列的小时数
+    """
+    offsets = (assignment.get('advancedSettings') or {}).get('reminderOffsets') or REMINDER_OFFSETS
+    valid = set()
+    for offset in offsets:
+        try:
+            offset = float(offset)
+        except (TypeError, ValueError):
+            continue
+        if offset > 0:
+            valid.add(offset)
+    return sorted(valid, reverse=True)
+
+def reminder_instants(assignment):
+    """
+    计算作业各提醒阶段的触发时间
+    
+    Returns:
+        list: [(提醒时间, 提前小时数)]，截止日期无法解析时返回空列表
+    """
     try:
-        # 加载所有作业
-        assignments = load_assignments()
-        # 加载所有用户
-        users = load_users()
-        # 加载课程配置
-        config = load_course_config()
-        
-        # 获取当前日期
-        now = datetime.now()
-        tomorrow = now + timedelta(days=1)
-        
-        # 筛选出明天截止的作业
-        upcoming_assignments = []
-        for assignment in assignments:
-            try:
-                due_date = datetime.fromisoformat(assignment['dueDate'])
-                # 判断作业是否在明天截止（忽略具体时间）
-                if (due_date.year == tomorrow.year and 
-                    due_date.month == tomorrow.month and 
-                    due_date.day == tomorrow.day):
-                    upcoming_assignments.append(assignment)
-            except Exception as e:
-                logging.error(f"解析作业截止日期出错: {e}, 作业: {assignment['course']} - {assignment['name']}")
+        due_date = datetime.fromisoformat(assignment['dueDate'])
+    except Exception as e:
+        logging.error(f"解析作业截止日期出错: {e}, 作业: {assignment['course']} - {assignment['name']}")
+        return []
+    return [(due_date - timedelta(hours=offset), offset) for offset in get_reminder_offsets(assignment)]
+
+def rebuild_reminder_queue(assignments, now):
+    """
+    根据作业列表重建待触发的提醒时刻队列（作业创建、修改或删除后调用）
+    
+    Args:
+        assignments (list): 所有作业
+        now (datetime): 当前时间
+    
+    Returns:
+        datetime: 最近的提醒时间，没有待触发的提醒时返回 None
+    """
+    heap = []
+    for assignment in assignments:
+        for fire_at, offset in reminder_instants(assignment):
+            if fire_at > now:
+                heap.append((fire_at, assignment['id'], offset))
+    heapq.heapify(heap)
+    
+    with _reminder_lock:
+        _reminder_heap[:] = heap
+    logging.info(f"已重建截止提醒队列，共 {len(heap)} 个待触发的提醒")
+    return heap[0][0] if heap else None
+
+def next_reminder_time():
+    """获取最近一次待触发的提醒时间，没有时返回 None"""
+    with _reminder_lock:
+        return _reminder_heap[0][0] if _reminder_heap else None
+
+def pop_due_reminders(now):
+    """
+    取出所有已到时间的提醒阶段
+    
+    Args:
+        now (datetime): 当前时间
+    
+    Returns:
+        list: [(提醒时间, 作业ID, 提前小时数)]，错过超过 REMINDER_MISFIRE_GRACE 的阶段不再补发
+    """
+    due = []
+    with _reminder_lock:
+        while _reminder_heap and _reminder_heap[0][0] <= now:
+            fire_at, assignment_id, offset = heapq.heappop(_reminder_heap)
+            if (now - fire_at).total_seconds() <= REMINDER_MISFIRE_GRACE:
+                due.append((fire_at, assignment_id, offset))
+            else:
+                logging.warning(f"截止提醒已错过: 作业ID {assignment_id}, 截止前 {offset:g} 小时")
+    return due
+
+def current_stages(assignments, now, window=None):
+    """
+    获取各作业当前所处的提醒阶段（已到提醒时间且作业尚未截止的最近一个阶段）
+    
+    Args:
+        assignments (list): 作业列表
+        now (datetime): 当前时间
+        window (float, optional): 只返回提醒时间在最近 window 秒内的阶段，None 表示不限
+    
+    Returns:
+        list: [(作业, 提前小时数)]
+    """
+    stages = []
+    for assignment in assignments:
+        instants = reminder_instants(assignment)
+        if not instants:
+            continue
+        due_date = instants[0][0] + timedelta(hours=instants[0][1])
+        if due_date <= now:
+            continue
+        passed = [(fire_at, offset) for fire_at, offset in instants if fire_at <= now]
+        if not passed:
+            continue
+        fire_at, offset = passed[-1]
+        if window is None or (now - fire_at).total_seconds() <= window:
+            stages.append((assignment, offset))
+    return stages
+
+def plan_reminders(targets, users, config, records):
+    """
+    计算需要发送的全部截止提醒（不发送邮件、不修改记录）
+    
+    用户列表只遍历一次，按班级分组；每个 (班级, 课程, 作业) 的已提交学生只查询一次，
+    已提醒记录转换为集合后按 O(1) 判断。
+    
+    Args:
+        targets (list): 要处理的提醒阶段 [(作业, 提前小时数)]
+        users (dict): 所有用户
+        config (dict): 课程配置
+        records (dict): 已发送提醒记录
+    
+    Returns:
+        list: 提醒列表，每项为 dict（assignment_id, course, assignment, due_date, stage,
+              class_name, username, student_id, email）
+    """
+    if not targets:
+        return []
+    
+    # 按班级分组学生（只遍历一次用户列表）
+    students_by_class = {}
+    for username, user_data in users.items():
+        if user_data.get('is_admin', False):
+            continue
+        class_name = user_data.get('class_name')
+        if class_name:
+            students_by_class.setdefault(class_name, []).append((username, user_data))
+    
+    submitted_cache = {}
+    reminders = []
+    for assignment, offset in targets:
+        course = assignment['course']
+        assignment_name = assignment['name']
+        assignment_id = assignment['id']
+        due_date_str = datetime.fromisoformat(assignment['dueDate']).strftime('%Y-%m-%d %H:%M')
+        stage = stage_key(offset)
+        reminded = set(_stage_students(records.get(assignment_id, {}), stage))
         
-        logging.info(f"找到 {len(upcoming_assignments)} 个明天截止的作业")
+        applicable_classes = get_assignment_classes(assignment, config)
+        logging.info(f"作业 '{course} - {assignment_name}' 截止前 {stage} 提醒，适用班级: {applicable_classes}")
         
-        # 处理每个即将到期的作业
-        for assignment in upcoming_assignments:
-            course = assignment['course']
-            assignment_name = assignment['name']
-            assignment_id = assignment['id']
-            due_date = datetime.fromisoformat(assignment['dueDate'])
-            due_date_str = due_date.strftime('%Y-%m-%d %H:%M')
-            
-            # 查找适用的班级
-            applicable_classes = assignment.get('classNames', [])
-            
-            # 如果没有指定班级，从配置中查找所有包含该课程与作业的班级
-            if not applicable_classes:
-                for class_info in config.get('classes', []):
-                    class_name = class_info['name']
-                    for course_info in class_info.get('courses', []):
-                        if (course_info['name'] == course and 
-                            assignment_name in course_info.get('assignments', [])):
-                            applicable_classes.append(class_name)
-            
-            logging.info(f"作业 '{course} - {assignment_name}' 适用班级: {applicable_classes}")
+        for class_name in applicable_classes:
+            class_students = students_by_class.get(class_name, [])
+            submitted_key = (class_name, course, assignment_name)
+            if submitted_key not in submitted_cache:
+                submitted_cache[submitted_key] = get_submitted_folders(class_name, course, assignment_name)
+            submitted_folders = submitted_cache[submitted_key]
+            logging.info(f"班级 '{class_name}' 有 {len(class_students)} 名学生，"
+                         f"{len(submitted_folders)} 份提交")
             
-            # 遍历每个班级的所有学生
-            for class_name in applicable_classes:
-                # 筛选出该班级的学生
-                class_students = []
-                for username, user_data in users.items():
-                    if (not user_data.get('is_admin', False) and 
-                        user_data.get('class_name') == class_name):
-                        class_students.append((username, user_data))
+            for username, user_data in class_students:
+                student_id = user_data.get('student_id', '')
+                email = user_data.get('email', '')
                 
-                logging.info(f"班级 '{class_name}' 有 {len(class_students)} 名学生")
+                if not student_id or not email:
+                    logging.warning(f"学生信息不完整: {username}")
+                    continue
+                if student_id in reminded:
+                    continue
+                if has_submitted_folder(submitted_folders, student_id, username):
+                    continue
                 
-                # 检查每个学生是否已提交
-                for username, user_data in class_students:
-                    student_id = user_data.get('student_id', '')
-                    email = user_data.get('email', '')
-                    
-                    if not student_id or not email:
-                        logging.warning(f"学生信息不完整: {username}")
-                        continue
-                    
-                    # 检查是否已提交
-                    if has_submitted(student_id, username, class_name, course, assignment_name):
-                        logging.info(f"学生 {username} (学号: {student_id}) 已提交作业")
-                        continue
-                    
-                    # 检查是否已发送提醒
-                    if has_already_reminded(course, assignment_name, student_id, assignment_id):
-                        logging.info(f"已向学生 {username} (学号: {student_id}) 发送过提醒")
-                        continue
-                    
-                    logging.info(f"准备向学生 {username} (学号: {student_id}) 发送截止提醒")
-                    
-                    # 发送提醒邮件
-                    if send_reminder_email(email, username, student_id, course, assignment_name, due_date_str):
-                        # 标记为已提醒
-                        mark_as_reminded(course, assignment_name, student_id, assignment_id)
-                        logging.info(f"成功向学生 {username} (学号: {student_id}) 发送截止提醒")
-                    else:
-                        logging.error(f"向学生 {username} (学号: {student_id}) 发送截止提醒失败")
+                # 同一学生在多个适用班级中只提醒一次
+                reminded.add(student_id)
+                reminders.append({
+                    'assignment_id': assignment_id,
+                    'course': course,
+                    'assignment': assignment_name,
+                    'due_date': due_date_str,
+                    'stage': stage,
+                    'class_name': class_name,
+                    'username': username,
+                    'student_id': student_id,
+                    'email': email
+                })
+    
+    return reminders
+
+def send_stage_reminders(targets):
+    """
+    向尚未提交的学生发送指定提醒阶段的提醒邮件
+    
+    Args:
+        targets (list): [(作业, 提前小时数)]
+    
+    Returns:
+        int: 新加入发件箱的提醒邮件数
+    """
+    reminders = plan_reminders(targets, load_users(), load_course_config(), load_reminder_records())
+    if not reminders:
+        return 0
+    
+    # 所有提醒邮件在一个事务中写入发件箱
+    items = []
+    for reminder in reminders:
+        items.append({
+            'msg': build_reminder_email(
+                reminder['email'], reminder['username'], reminder['student_id'],
+                reminder['course'], reminder['assignment'], reminder['due_date']
+            ),
+            'to_addrs': [reminder['email']],
+            'category': 'deadline_reminder',
+            'dedup_key': _reminder_dedup_key(
+                reminder['course'], reminder['assignment'], reminder['due_date'],
+                reminder['student_id'], reminder['stage']
+            )
+        })
+    inserted = mail_outbox.enqueue_many(items)
+    
+    # 提醒记录只写一次
+    mark_all_as_reminded([
+        (r['assignment_id'], r['course'], r['assignment'], r['student_id'], r['stage']) for r in reminders
+    ])
+    logging.info(f"截止提醒已加入发件箱: {inserted}/{len(reminders)} 封（其余为重复）")
+    return inserted
+
+def process_due_reminders(due):
+    """
+    处理已到时间的提醒阶段，只处理相关的作业
+    
+    Args:
+        due (list): pop_due_reminders 返回的 [(提醒时间, 作业ID, 提前小时数)]
+    
+    Returns:
+        int: 新加入发件箱的提醒邮件数
+    """
+    targets = []
+    for fire_at, assignment_id, offset in due:
+        assignment = get_assignment(assignment_id)
+        # 作业在入队后被删除或截止日期被修改时跳过，队列会在修改作业时重建
+        if assignment is None or (fire_at, offset) not in reminder_instants(assignment):
+            continue
+        targets.append((assignment, offset))
+    
+    return send_stage_reminders(targets)
+
+def check_upcoming_deadlines(window=None):
+    """
+    检查所有作业当前所处的提醒阶段并发送提醒（手动触发或每日补发检查）
+    
+    Args:
+        window (float, optional): 只处理提醒时间在最近 window 秒内的阶段，None 表示不限
+    
+    Returns:
+        int: 新加入发件箱的提醒邮件数
+    """
+    logging.info("开始检查即将到期的作业...")
+    
+    try:
+        targets = current_stages(load_assignments(), datetime.now(), window)
+        logging.info(f"找到 {len(targets)} 个处于提醒阶段的作业")
+        inserted = send_stage_reminders(targets)
         
         logging.info("检查作业截止日期完成")
-        return True
+        return inserted
     
     except Exception as e:
         logging.error(f"检查截止日期出错: {e}")
-        return False
+        raise
 
-def run_deadline_check():
+def run_deadline_check(window=None):
     """启动截止日期检查（可由定时任务调用）"""
     try:
-        # 创建线程执行检查，避免阻塞主线程
-        reminder_thread = threading.Thread(target=check_upcoming_deadlines)
-        reminder_thread.daemon = True
-        reminder_thread.start()
-        return True
+        # 提交到后台任务队列执行，避免阻塞调度线程；尚未开始的检查不会重复排队
+        return job_queue.submit(job_store.run_recorded, 'deadline_reminder', check_upcoming_deadlines, window,
+                                name='deadline_check', key='deadline_check')
     except Exception as e:
         logging.error(f"启动截止日期检查失败: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def run_due_reminders():
+    """取出已到时间的提醒阶段并提交到后台任务队列处理（由调度器在提醒时间调用）"""
+    try:
+        due = pop_due_reminders(datetime.now())
+        if not due:
+            return False
+        return job_queue.submit(job_store.run_recorded, 'deadline_reminder_stage', process_due_reminders, due,
+                                name='deadline_reminder_stage')
+    except Exception as e:
+        logging.error(f"启动截止提醒失败: {e}")
+        return False
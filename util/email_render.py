@@ -0,0 +1,118 @@
+"""
+作业传输系统 - 邮件模板渲染模块
+
+邮件模板存放在 util/email_content 目录下，使用 str.format 的占位符语法（{name}，
+字面的花括号写作 {{ 和 }}）。本模块负责加载和渲染这些模板：
+- 每个模板只读取和解析一次，解析结果是字面文本片段和占位符的列表，
+  渲染时只需要按顺序拼接各收件人的字段值，批量发送时不再重复解析大段 HTML
+- 模板文件修改后（修改时间或大小变化）自动重新加载，不需要重启服务
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import string
+import logging
+import threading
+
+# 邮件模板目录
+EMAIL_CONTENT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'email_content')
+
+_formatter = string.Formatter()
+
+# 已编译的模板: {文件路径: ((修改时间, 大小), Template)}
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+class Template:
+    """
+    预编译的 str.format 模板
+
+    Args:
+        source (str): 模板文本
+    """
+
+    def __init__(self, source):
+        self.parts = []
+        literal = []
+        for text, field, format_spec, conversion in _formatter.parse(source):
+            literal.append(text)
+            if field is None:
+                continue
+            self.parts.append((''.join(literal), field, conversion, format_spec))
+            literal = []
+        self.tail = ''.join(literal)
+
+    def render(self, **context):
+        """
+        渲染模板
+
+        Args:
+            **context: 占位符的值
+
+        Returns:
+            str: 渲染结果
+
+        Raises:
+            KeyError: 缺少占位符对应的值
+        """
+        out = []
+        for literal, field, conversion, format_spec in self.parts:
+            out.append(literal)
+            if field in context:
+                value = context[field]
+            else:
+                # 支持 {file[name]}、{user.name} 等形式
+                value = _formatter.get_field(field, (), context)[0]
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            out.append(format(value, format_spec) if format_spec else str(value))
+        out.append(self.tail)
+        return ''.join(out)
+
+
+def get_template(name):
+    """
+    获取编译后的模板，模板文件变化时重新加载
+
+    Args:
+        name (str): email_content 目录下的模板文件名
+
+    Returns:
+        Template: 编译后的模板
+    """
+    path = os.path.join(EMAIL_CONTENT_FOLDER, name)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _templates.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _templates_lock:
+        cached = _templates.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            template = Template(f.read())
+        _templates[path] = (signature, template)
+        logging.info(f"已加载邮件模板: {name}")
+        return template
+
+
+def render(name, **context):
+    """
+    渲染邮件模板
+
+    Args:
+        name (str): email_content 目录下的模板文件名
+        **context: 占位符的值
+
+    Returns:
+        str: 渲染结果
+    """
+    return get_template(name).render(**context)
@@ -0,0 +1,237 @@
+"""
+作业传输系统 - 服务器推送事件模块
+
+通过 Server-Sent Events（/events）向打开的学生和管理员页面推送数据变化，
+页面不再需要反复请求通知列表、作业列表和提交统计：
+- notification: 管理员发布了新通知（推送给所有用户）
+- submission_count: 作业的提交数发生变化（推送给该班级的学生和管理员）
+- upload_complete: 文件上传处理完成（推送给上传的用户）
+
+事件写入 SQLite 数据库（只保留最近的 EVENT_RETENTION 条），每个进程由一个分发线程
+读取新事件并放入本进程各连接的队列。多进程部署时任一进程发布的事件都能推送到所有连接；
+没有连接时分发线程不查询数据库。客户端断线重连时通过 Last-Event-ID 补发错过的事件。
+
+数据库路径由 LIVE_EVENTS_DATABASE 指定，默认为 data/live_events.db。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import json
+import time
+import queue
+import logging
+import threading
+from flask import Blueprint, Response, request, stream_with_context
+from flask_login import login_required, current_user
+
+from util.models import load_users
+from util import sqlite_db
+
+try:
+    from util.config import LIVE_EVENTS_DATABASE
+except ImportError:
+    LIVE_EVENTS_DATABASE = 'data/live_events.db'
+
+# 创建蓝图
+event_stream_bp = Blueprint('event_stream', __name__)
+
+# 数据库中保留的事件数（断线时间过长、超出该范围的事件不再补发）
+EVENT_RETENTION = 1000
+
+# 分发线程检查新事件的间隔（秒），本进程发布的事件会立即分发
+POLL_INTERVAL = 1.0
+
+# 没有事件时发送心跳的间隔（秒），避免代理关闭空闲连接
+HEARTBEAT_INTERVAL = 25
+
+# 客户端断线后重连的等待时间（毫秒）
+RETRY_MS = 5000
+
+# 每个连接最多缓存的事件数，客户端处理不过来时断开连接，由客户端重连后补发
+SUBSCRIBER_QUEUE_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    user_id TEXT,
+    class_name TEXT
+);
+"""
+
+_subscribers = set()
+_subscribers_lock = threading.Lock()
+_dispatcher = None
+_wake = threading.Event()
+
+
+def _connect():
+    """获取当前线程的数据库连接"""
+    return sqlite_db.connect(LIVE_EVENTS_DATABASE, SCHEMA)
+
+
+def publish(event, data, user_id=None, class_name=None):
+    """
+    发布事件
+
+    Args:
+        event (str): 事件类型
+        data (dict): 事件数据
+        user_id (str, optional): 只推送给该用户
+        class_name (str, optional): 只推送给该班级的学生和管理员（未指定用户和班级时推送给所有用户）
+    """
+    try:
+        conn = _connect()
+        cursor = conn.execute(
+            'INSERT INTO events (ts, event, data, user_id, class_name) VALUES (?, ?, ?, ?, ?)',
+            (time.time(), event, json.dumps(data, ensure_ascii=False), user_id, class_name)
+        )
+        if cursor.lastrowid % 100 == 0:
+            conn.execute('DELETE FROM events WHERE id <= ?', (cursor.lastrowid - EVENT_RETENTION,))
+    except Exception as e:
+        logging.error(f"发布推送事件失败: {event}, 错误: {e}")
+        return
+    _wake.set()
+
+
+def _latest_id():
+    """当前最新的事件ID"""
+    return _connect().execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+
+def _events_after(last_id, until_id=None):
+    """读取 last_id 之后（到 until_id 为止）的事件"""
+    if until_id is None:
+        return _connect().execute(
+            'SELECT id, event, data, user_id, class_name FROM events WHERE id > ? ORDER BY id', (last_id,)
+        ).fetchall()
+    return _connect().execute(
+        'SELECT id, event, data, user_id, class_name FROM events WHERE id > ? AND id <= ? ORDER BY id',
+        (last_id, until_id)
+    ).fetchall()
+
+
+class _Subscriber:
+    """一个推送连接"""
+
+    def __init__(self, user_id, class_name, is_admin, since):
+        self.user_id = user_id
+        self.class_name = class_name
+        self.is_admin = is_admin
+        # 只接收该ID之后的事件，更早的事件由连接建立时补发
+        self.since = since
+        self.queue = queue.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.closed = False
+
+    def accepts(self, row):
+        """事件是否推送给该连接"""
+        _, _, _, user_id, class_name = row
+        if user_id:
+            return user_id == self.user_id
+        if class_name:
+            return self.is_admin or class_name == self.class_name
+        return True
+
+    def offer(self, row):
+        """放入事件，队列已满时标记连接关闭"""
+        if self.closed or row[0] <= self.since or not self.accepts(row):
+            return
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.closed = True
+            logging.warning(f"推送连接处理过慢，已断开: {self.user_id}")
+
+
+def _dispatch_loop():
+    """分发线程：读取新事件并放入本进程各连接的队列"""
+    last_id = None
+    while True:
+        _wake.wait(POLL_INTERVAL)
+        _wake.clear()
+        with _subscribers_lock:
+            subscribers = list(_subscribers)
+        if not subscribers:
+            last_id = None
+            continue
+        if last_id is None:
+            last_id = min(subscriber.since for subscriber in subscribers)
+        try:
+            for row in _events_after(last_id):
+                last_id = row[0]
+                for subscriber in subscribers:
+                    subscriber.offer(row)
+        except Exception as e:
+            logging.error(f"分发推送事件出错: {e}")
+
+
+def _subscribe(user_id, class_name, is_admin):
+    """注册连接，必要时启动分发线程"""
+    global _dispatcher
+    subscriber = _Subscriber(user_id, class_name, is_admin, _latest_id())
+    with _subscribers_lock:
+        _subscribers.add(subscriber)
+        if _dispatcher is None:
+            _dispatcher = threading.Thread(target=_dispatch_loop, name='event-stream', daemon=True)
+            _dispatcher.start()
+    return subscriber
+
+
+def _unsubscribe(subscriber):
+    with _subscribers_lock:
+        _subscribers.discard(subscriber)
+
+
+def _format(row):
+    """格式化为 SSE 消息"""
+    event_id, event, data, _, _ = row
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def subscriber_count():
+    """本进程当前的推送连接数"""
+    with _subscribers_lock:
+        return len(_subscribers)
+
+
+@event_stream_bp.route('/events', methods=['GET'])
+@login_required
+def events():
+    """推送事件流（text/event-stream）"""
+    user_id = current_user.id
+    is_admin = current_user.is_admin
+    class_name = None if is_admin else load_users().get(user_id, {}).get('class_name')
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    subscriber = _subscribe(user_id, class_name, is_admin)
+
+    def stream():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+
+            # 重连时补发断线期间的事件
+            if last_event_id is not None and last_event_id < subscriber.since:
+                for row in _events_after(last_event_id, subscriber.since):
+                    if subscriber.accepts(row):
+                        yield _format(row)
+
+            while not subscriber.closed:
+                try:
+                    row = subscriber.queue.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield _format(row)
+        finally:
+            _unsubscribe(subscriber)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -17,17 +17,18 @@ import os
 import logging
 import base64
 import uuid
+import hashlib
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from email.utils import formataddr
 
-from util.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD
+from util.config import SMTP_USERNAME
 from util.models import load_users
+from util import mail_outbox
 
 # 创建Blueprint
 feedback_bp = Blueprint('feedback', __name__)
@@ -108,7 +109,7 @@ def send_feedback_email(user_info, content, image_file=None):
         image_file (bytes, optional): 图片文件二进制数据
     
     Returns:
-        bool: 发送是否成功
+        bool: 是否成功加入发件箱
     """
     try:
         # 创建邮件
@@ -244,13 +245,11 @@ def send_feedback_email(user_info, content, image_file=None):
             image.add_header('Content-Disposition', 'inline')
             msg.attach(image)
         
-        # 发送邮件
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_USERNAME, [FEEDBACK_EMAIL], msg.as_string())
+        # 写入发件箱，由发送线程投递
+        feedback_digest = hashlib.sha1(f"{user_info['name']}\0{user_info['timestamp']}\0{content}".encode('utf-8')).hexdigest()
+        mail_outbox.enqueue(msg, [FEEDBACK_EMAIL], 'feedback', dedup_key=f"feedback:{feedback_digest}")
         
-        logging.info(f'用户反馈已发送至 {FEEDBACK_EMAIL} (用户: {user_info["name"]}, 学号: {user_info["student_id"]})')
+        logging.info(f'用户反馈已加入发件箱，收件人 {FEEDBACK_EMAIL} (用户: {user_info["name"]}, 学号: {user_info["student_id"]})')
         return True
     except Exception as e:
         logging.error(f'发送反馈邮件失败: {e}')
@@ -0,0 +1,120 @@
+"""
+作业传输系统 - 文件缓存模块
+
+本模块为频繁读取的 JSON 数据文件（用户、作业、课程配置、管理员、版本信息、
+通知已读记录等）提供进程内缓存：
+- 以文件的修改时间、大小和 inode 作为缓存签名，文件被其他进程或手动修改后自动失效
+- 缓存中保存解析结果的 pickle 快照，每次返回独立副本，调用方可以放心修改
+- 保存函数写入文件后调用 invalidate() 使缓存立即失效
+- 按文件统计命中和未命中次数，可通过 get_stats() 查看
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import json
+import pickle
+import threading
+
+# 缓存条目: {文件路径: (文件签名, 解析结果的pickle快照)}
+_entries = {}
+
+# 命中统计: {文件路径: {'hits': 命中次数, 'misses': 未命中次数}}
+_stats = {}
+
+_lock = threading.Lock()
+
+
+def _signature(path):
+    """获取文件签名（修改时间、大小、inode），文件不存在时抛出 FileNotFoundError"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def signature(path):
+    """
+    获取文件签名，可作为依赖该文件的数据的版本号
+
+    Args:
+        path (str): 文件路径
+
+    Returns:
+        tuple: (修改时间, 大小, inode)，文件不存在时返回None
+    """
+    try:
+        return _signature(os.path.normpath(path))
+    except FileNotFoundError:
+        return None
+
+
+def _count(path, key):
+    counters = _stats.setdefault(path, {'hits': 0, 'misses': 0})
+    counters[key] += 1
+
+
+def load_json(path):
+    """
+    读取 JSON 文件，文件未变化时直接返回缓存结果的副本
+
+    与 json.load(open(path)) 行为一致：文件不存在时抛出 FileNotFoundError，
+    格式错误时抛出 json.JSONDecodeError，调用方保留原有的异常处理。
+
+    Args:
+        path (str): JSON 文件路径
+
+    Returns:
+        解析后的数据（独立副本）
+    """
+    path = os.path.normpath(path)
+    signature = _signature(path)
+
+    with _lock:
+        entry = _entries.get(path)
+        if entry is not None and entry[0] == signature:
+            _count(path, 'hits')
+            snapshot = entry[1]
+        else:
+            _count(path, 'misses')
+            snapshot = None
+
+    if snapshot is not None:
+        return pickle.loads(snapshot)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    # 读取期间文件可能又被修改，签名不一致时不写入缓存
+    if _signature(path) == signature:
+        with _lock:
+            _entries[path] = (signature, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+    return data
+
+
+def invalidate(path=None):
+    """
+    使缓存失效
+
+    Args:
+        path (str, optional): 文件路径，为空时清空全部缓存
+    """
+    with _lock:
+        if path is None:
+            _entries.clear()
+        else:
+            _entries.pop(os.path.normpath(path), None)
+
+
+def get_stats():
+    """
+    获取缓存统计信息
+
+    Returns:
+        dict: {文件路径: {'hits', 'misses', 'cached'}}
+    """
+    with _lock:
+        return {
+            path: {**counters, 'cached': path in _entries}
+            for path, counters in _stats.items()
+        }
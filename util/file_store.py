@@ -0,0 +1,211 @@
+"""
+作业传输系统 - JSON 文件安全写入模块
+
+本模块为 JSON 状态文件（用户、作业、每日上传量、提交记录、提醒记录等）
+提供安全的写入方式：
+- 原子写入：先写入同目录下的临时文件并 fsync，再通过 os.replace 替换原文件，
+  写入过程中崩溃或并发读取都不会看到写了一半的文件
+- 文件锁：同一进程内使用按文件区分的可重入锁，多进程部署时额外使用
+  fcntl 文件锁（<文件名>.lock），保证读-改-写过程互斥
+- 合并写入：update_json() 的并发更新会在持有锁的线程中批量应用，
+  一次读取、一次写入，避免每个请求各写一次文件，也不会丢失更新
+
+修改文件中部分数据的读-改-写都应使用 update_json()。write_json() 只用于整体保存
+（管理员编辑后保存的用户、作业、课程配置、管理员和版本信息），保存的数据就是文件的全部内容。
+提交索引、通知已读记录等频繁按条更新的数据不使用 JSON 文件，而是保存在 SQLite 中（见 sqlite_db）。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import copy
+import stat
+import json
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from util import file_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只使用进程内锁
+    fcntl = None
+
+
+class _FileState:
+    """单个文件的锁和待合并的更新"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.lock_file = None
+        self.pending = []
+        self.pending_lock = threading.Lock()
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def _state(path):
+    path = os.path.abspath(path)
+    with _states_lock:
+        state = _states.get(path)
+        if state is None:
+            state = _states[path] = _FileState()
+        return state
+
+
+@contextmanager
+def file_lock(path):
+    """
+    获取文件的读-改-写锁（同一线程可重入）
+
+    Args:
+        path (str): 被保护的数据文件路径
+    """
+    state = _state(path)
+    with state.lock:
+        if state.depth == 0 and fcntl is not None:
+            lock_path = path + '.lock'
+            lock_dir = os.path.dirname(lock_path)
+            if lock_dir:
+                os.makedirs(lock_dir, exist_ok=True)
+            state.lock_file = open(lock_path, 'a')
+            fcntl.flock(state.lock_file.fileno(), fcntl.LOCK_EX)
+        state.depth += 1
+        try:
+            yield
+        finally:
+            state.depth -= 1
+            if state.depth == 0 and state.lock_file is not None:
+                fcntl.flock(state.lock_file.fileno(), fcntl.LOCK_UN)
+                state.lock_file.close()
+                state.lock_file = None
+
+
+def _fsync_dir(directory):
+    """同步目录项，确保 rename 在掉电后仍然有效（不支持的平台忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path, data, dump_kwargs):
+    """写入临时文件并替换目标文件，调用方需持有文件锁"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # mkstemp 创建的文件权限为 0600，沿用原文件的权限
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _fsync_dir(directory)
+    file_cache.invalidate(path)
+
+
+def write_json(path, data, ensure_ascii=False, indent=2):
+    """
+    原子地写入 JSON 文件（整体替换文件内容，读-改-写请使用 update_json）
+
+    Args:
+        path (str): 文件路径
+        data: 要写入的数据
+        ensure_ascii (bool): 同 json.dump
+        indent (int): 同 json.dump
+    """
+    with file_lock(path):
+        _atomic_write(path, data, {'ensure_ascii': ensure_ascii, 'indent': indent})
+
+
+def update_json(path, mutate, default=dict, ensure_ascii=False, indent=2):
+    """
+    对 JSON 文件执行加锁的读-改-写
+
+    并发调用会被合并：获得锁的线程读取一次文件，依次应用所有等待中的更新，
+    然后只写入一次。抛出异常的更新不会生效（其对数据的修改会被丢弃），异常由该调用抛出。
+
+    Args:
+        path (str): 文件路径
+        mutate (callable): 接收已加载数据并原地修改的函数，其返回值作为本函数的返回值
+        default (callable): 文件不存在时用于创建初始数据的函数
+        ensure_ascii (bool): 同 json.dump
+        indent (int): 同 json.dump
+
+    Returns:
+        mutate 的返回值
+    """
+    state = _state(path)
+    item = {'mutate': mutate, 'done': False, 'result': None, 'error': None}
+    with state.pending_lock:
+        state.pending.append(item)
+
+    with file_lock(path):
+        if not item['done']:
+            with state.pending_lock:
+                batch, state.pending = state.pending, []
+
+            try:
+                try:
+                    data = file_cache.load_json(path)
+                except FileNotFoundError:
+                    data = default()
+
+                # 每个更新在副本上修改，出错时丢弃该副本，修改了一半的数据不会被写入，
+                # 也不影响同一批次的其他更新
+                applied = 0
+                for pending in batch:
+                    candidate = copy.deepcopy(data)
+                    try:
+                        pending['result'] = pending['mutate'](candidate)
+                    except Exception as e:
+                        pending['error'] = e
+                        continue
+                    data = candidate
+                    applied += 1
+
+                if applied:
+                    _atomic_write(path, data, {'ensure_ascii': ensure_ascii, 'indent': indent})
+            except Exception as e:
+                for pending in batch:
+                    pending['error'] = pending['error'] or e
+                raise
+            finally:
+                for pending in batch:
+                    pending['done'] = True
+
+            if len(batch) > 1:
+                logging.debug(f"合并写入 {path}: {len(batch)} 个更新")
+
+    if item['error'] is not None:
+        raise item['error']
+    return item['result']
@@ -0,0 +1,253 @@
+"""
+作业传输系统 - 后台任务队列模块
+
+上传后的提交通知、新作业通知、截止日期检查等后台工作统一提交到本模块的任务队列，
+由固定数量的工作线程执行，不再为每个任务单独创建线程：
+- 工作线程数量和排队任务数量都有上限，截止日期前的上传高峰不会产生大量线程
+- 支持延迟执行；指定 key 的任务会去抖动合并，同一 key 在延迟期内重复提交时
+  只执行最后一次（例如学生连续上传多个文件只发送一封提交通知）
+- 记录排队深度、执行中任务数、成功/失败/拒绝/合并次数等统计信息
+- 进程退出时停止接收新任务，并在限定时间内执行完已排队的任务
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import time
+import heapq
+import atexit
+import logging
+import itertools
+import threading
+
+try:
+    from util.config import JOB_WORKERS
+except ImportError:
+    JOB_WORKERS = 4
+
+try:
+    from util.config import JOB_QUEUE_SIZE
+except ImportError:
+    JOB_QUEUE_SIZE = 1000
+
+# 进程退出时等待排队任务完成的最长时间（秒）
+JOB_DRAIN_TIMEOUT = 30
+
+
+class _Job:
+    """排队中的任务"""
+
+    __slots__ = ('run_at', 'seq', 'name', 'key', 'func', 'args', 'kwargs', 'cancelled')
+
+    def __init__(self, run_at, seq, name, key, func, args, kwargs):
+        self.run_at = run_at
+        self.seq = seq
+        self.name = name
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.run_at, self.seq) < (other.run_at, other.seq)
+
+
+class JobQueue:
+    """
+    固定工作线程数的延迟任务队列
+
+    Args:
+        workers (int): 工作线程数
+        max_pending (int): 最多排队的任务数，超出时拒绝提交
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._heap = []
+        self._keyed = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._accepting = True
+        self._draining = False
+        self._running = 0
+        self._cancelled = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'debounced': 0,
+            'max_pending': 0
+        }
+
+    def _start_workers(self):
+        """按需启动工作线程（调用方需持有锁）"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f'job-worker-{len(self._threads)}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, func, *args, name=None, delay=0, key=None, **kwargs):
+        """
+        提交任务
+
+        Args:
+            func (callable): 要执行的函数
+            *args: 函数的位置参数
+            name (str, optional): 任务名称，用于日志和统计
+            delay (float): 延迟执行的秒数
+            key (hashable, optional): 去抖动键，同一键尚未执行的任务会被本次提交替换，
+                并重新开始计算延迟
+            **kwargs: 函数的关键字参数
+
+        Returns:
+            bool: 是否成功加入队列
+        """
+        name = name or getattr(func, '__name__', 'job')
+        with self._cond:
+            if not self._accepting:
+                logging.warning(f"任务队列已关闭，拒绝任务: {name}")
+                self._stats['rejected'] += 1
+                return False
+
+            previous = self._keyed.get(key) if key is not None else None
+            if previous is not None:
+                # 替换尚未执行的同键任务
+                previous.cancelled = True
+                self._cancelled += 1
+                self._stats['debounced'] += 1
+            elif self.pending >= self.max_pending:
+                logging.warning(f"任务队列已满（{self.max_pending}），拒绝任务: {name}")
+                self._stats['rejected'] += 1
+                return False
+
+            job = _Job(time.monotonic() + delay, next(self._seq), name, key, func, args, kwargs)
+            heapq.heappush(self._heap, job)
+            if key is not None:
+                self._keyed[key] = job
+
+            self._stats['submitted'] += 1
+            self._stats['max_pending'] = max(self._stats['max_pending'], self.pending)
+            self._start_workers()
+            self._cond.notify()
+            return True
+
+    @property
+    def pending(self):
+        """排队中（含延迟中）的任务数"""
+        return len(self._heap) - self._cancelled
+
+    def _next_job(self):
+        """取出下一个到期的任务，队列关闭且为空时返回 None"""
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+
+                if self._heap:
+                    wait = self._heap[0].run_at - time.monotonic()
+                    if wait <= 0 or self._draining:
+                        job = heapq.heappop(self._heap)
+                        if job.key is not None and self._keyed.get(job.key) is job:
+                            del self._keyed[job.key]
+                        self._running += 1
+                        return job
+                    self._cond.wait(wait)
+                elif not self._accepting:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            start = time.monotonic()
+            try:
+                job.func(*job.args, **job.kwargs)
+                result = 'completed'
+            except Exception as e:
+                logging.error(f"后台任务执行失败: {job.name}, 错误: {e}")
+                import traceback
+                logging.error(traceback.format_exc())
+                result = 'failed'
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self._running -= 1
+                self._stats[result] += 1
+                self._cond.notify_all()
+            logging.debug(f"后台任务完成: {job.name}, 耗时 {elapsed:.2f} 秒")
+
+    def get_stats(self):
+        """
+        获取队列统计信息
+
+        Returns:
+            dict: 工作线程数、排队数、执行中任务数及各项计数
+        """
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'capacity': self.max_pending,
+                'pending': self.pending,
+                'running': self._running,
+                'accepting': self._accepting,
+                **self._stats
+            }
+
+    def shutdown(self, timeout=JOB_DRAIN_TIMEOUT):
+        """
+        停止接收新任务，并等待已排队的任务执行完毕（延迟中的任务立即执行）
+
+        Args:
+            timeout (float): 最长等待秒数
+
+        Returns:
+            bool: 是否在限定时间内执行完所有任务
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if not self._threads:
+                self._accepting = False
+                return True
+            self._accepting = False
+            self._draining = True
+            self._cond.notify_all()
+            while self.pending or self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.warning(f"任务队列关闭超时，仍有 {self.pending} 个任务未执行")
+                    return False
+                self._cond.wait(remaining)
+        logging.info("任务队列已关闭，所有任务已执行完毕")
+        return True
+
+
+# 全局任务队列
+_queue = JobQueue()
+
+
+def submit(func, *args, name=None, delay=0, key=None, **kwargs):
+    """提交任务到全局任务队列，参数同 JobQueue.submit"""
+    return _queue.submit(func, *args, name=name, delay=delay, key=key, **kwargs)
+
+
+def get_stats():
+    """获取全局任务队列的统计信息"""
+    return _queue.get_stats()
+
+
+def shutdown(timeout=JOB_DRAIN_TIMEOUT):
+    """关闭全局任务队列，参数同 JobQueue.shutdown"""
+    return _queue.shutdown(timeout)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,302 @@
+"""
+作业传输系统 - 定时任务持久化模块
+
+多进程部署（如 gunicorn 多个 worker）时，每个进程都会创建调度器，
+本模块保证定时任务只由一个进程执行，并在重启后继续：
+- SQLiteJobStore: 基于 SQLite 的 APScheduler 任务存储，任务和下一次执行时间保存在数据库中，
+  重启后错过的执行可以按任务的 misfire 设置补执行（不依赖 SQLAlchemy）
+- 领导者选举: 通过文件锁（<数据库>.lock）选出一个进程运行调度器，
+  该进程退出后锁自动释放，其他进程在下一次尝试时接管
+- 执行历史: 记录每次任务执行的开始时间、耗时、结果和处理的数量
+
+数据库路径由 SCHEDULER_DATABASE 指定，默认为 data/scheduler.db。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import time
+import pickle
+import logging
+import sqlite3
+import threading
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, JobLookupError, ConflictingIdError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from util import sqlite_db
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只运行单个进程，直接成为领导者
+    fcntl = None
+
+try:
+    from util.config import SCHEDULER_DATABASE
+except ImportError:
+    SCHEDULER_DATABASE = 'data/scheduler.db'
+
+# 执行历史最多保留的记录数
+HISTORY_LIMIT = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apscheduler_jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_apscheduler_jobs_next_run_time ON apscheduler_jobs (next_run_time);
+CREATE TABLE IF NOT EXISTS job_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    status TEXT NOT NULL,
+    items INTEGER,
+    error TEXT,
+    pid INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_job_history_job ON job_history (job_id, id);
+"""
+
+
+def _connect():
+    """获取当前线程的数据库连接"""
+    return sqlite_db.connect(SCHEDULER_DATABASE, SCHEMA)
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    基于 SQLite 的 APScheduler 任务存储（表结构与 SQLAlchemyJobStore 相同）
+
+    Args:
+        pickle_protocol (int): 序列化任务状态使用的 pickle 协议
+    """
+
+    def __init__(self, pickle_protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.pickle_protocol = pickle_protocol
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        _connect()
+
+    def lookup_job(self, job_id):
+        row = _connect().execute('SELECT job_state FROM apscheduler_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        timestamp = datetime_to_utc_timestamp(now)
+        return self._get_jobs('WHERE next_run_time <= ?', (timestamp,))
+
+    def get_next_run_time(self):
+        row = _connect().execute(
+            """SELECT next_run_time FROM apscheduler_jobs WHERE next_run_time IS NOT NULL
+               ORDER BY next_run_time LIMIT 1"""
+        ).fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            _connect().execute(
+                'INSERT INTO apscheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)',
+                (job.id, datetime_to_utc_timestamp(job.next_run_time),
+                 pickle.dumps(job.__getstate__(), self.pickle_protocol))
+            )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        cursor = _connect().execute(
+            'UPDATE apscheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?',
+            (datetime_to_utc_timestamp(job.next_run_time),
+             pickle.dumps(job.__getstate__(), self.pickle_protocol), job.id)
+        )
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        cursor = _connect().execute('DELETE FROM apscheduler_jobs WHERE id = ?', (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        _connect().execute('DELETE FROM apscheduler_jobs')
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where='', params=()):
+        jobs = []
+        failed_job_ids = []
+        rows = _connect().execute(
+            f'SELECT id, job_state FROM apscheduler_jobs {where} ORDER BY next_run_time', params
+        ).fetchall()
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except BaseException:
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                failed_job_ids.append(job_id)
+
+        # 删除无法恢复的任务（如任务函数已被删除或改名）
+        if failed_job_ids:
+            _connect().executemany('DELETE FROM apscheduler_jobs WHERE id = ?', [(i,) for i in failed_job_ids])
+        return jobs
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} (path={SCHEDULER_DATABASE})>'
+
+
+# ---------- 领导者选举 ----------
+
+_leader_file = None
+_leader_lock = threading.Lock()
+
+
+def acquire_leadership():
+    """
+    尝试成为运行定时任务的进程（非阻塞）
+
+    Returns:
+        bool: 当前进程是否为领导者
+    """
+    global _leader_file
+    with _leader_lock:
+        if _leader_file is not None:
+            return True
+        if fcntl is None:
+            _leader_file = True
+            return True
+
+        lock_path = SCHEDULER_DATABASE + '.lock'
+        lock_dir = os.path.dirname(lock_path)
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+        lock_file = open(lock_path, 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # 锁文件中记录领导者的进程号，便于排查
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        _leader_file = lock_file
+        logging.info(f"进程 {os.getpid()} 成为定时任务领导者")
+        return True
+
+
+def is_leader():
+    """当前进程是否为领导者"""
+    return _leader_file is not None
+
+
+def release_leadership():
+    """释放领导者锁（调度器关闭时调用）"""
+    global _leader_file
+    with _leader_lock:
+        if _leader_file is not None and _leader_file is not True:
+            _leader_file.close()
+        _leader_file = None
+
+
+# ---------- 执行历史 ----------
+
+def record_run(job_id, started_at, duration, status, items=None, error=None):
+    """
+    记录一次任务执行
+
+    Args:
+        job_id (str): 任务ID
+        started_at (float): 开始时间戳
+        duration (float): 耗时（秒）
+        status (str): success 或 error
+        items (int, optional): 处理的数量（如发送的提醒邮件数）
+        error (str, optional): 错误信息
+    """
+    try:
+        conn = _connect()
+        cursor = conn.execute(
+            """INSERT INTO job_history (job_id, started_at, duration, status, items, error, pid)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (job_id, started_at, duration, status, items, error, os.getpid())
+        )
+        conn.execute('DELETE FROM job_history WHERE id <= ?', (cursor.lastrowid - HISTORY_LIMIT,))
+    except Exception as e:
+        logging.error(f"记录定时任务执行历史失败: {e}")
+
+
+def run_recorded(job_id, func, *args, **kwargs):
+    """
+    执行函数并记录执行历史，函数返回整数时记为处理的数量
+
+    Args:
+        job_id (str): 任务ID
+        func (callable): 要执行的函数
+        *args, **kwargs: 函数参数
+
+    Returns:
+        函数的返回值（异常会记录后重新抛出）
+    """
+    started_at = time.time()
+    start = time.monotonic()
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        record_run(job_id, started_at, time.monotonic() - start, 'error', error=str(e))
+        raise
+
+    items = result if isinstance(result, int) and not isinstance(result, bool) else None
+    record_run(job_id, started_at, time.monotonic() - start, 'success', items)
+    return result
+
+
+def recent_runs(job_id=None, limit=20):
+    """
+    获取最近的执行历史（最新的在前）
+
+    Args:
+        job_id (str, optional): 只返回该任务的记录
+        limit (int): 最多返回的记录数
+
+    Returns:
+        list: 执行记录列表
+    """
+    if job_id is None:
+        rows = _connect().execute(
+            """SELECT job_id, started_at, duration, status, items, error, pid FROM job_history
+               ORDER BY id DESC LIMIT ?""", (limit,)
+        ).fetchall()
+    else:
+        rows = _connect().execute(
+            """SELECT job_id, started_at, duration, status, items, error, pid FROM job_history
+               WHERE job_id = ? ORDER BY id DESC LIMIT ?""", (job_id, limit)
+        ).fetchall()
+
+    return [{
+        'job_id': row[0],
+        'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row[1])),
+        'duration': round(row[2], 3),
+        'status': row[3],
+        'items': row[4],
+        'error': row[5],
+        'pid': row[6]
+    } for row in rows]
@@ -0,0 +1,128 @@
+"""
+作业传输系统 - 批量邮件发送模块
+
+向大量学生发送同一类通知（如新作业通知）时使用本模块：
+- 一次批量发送记录为一个"发送任务"，所有邮件在一个事务中写入持久化发件箱，
+  由发件箱的发送线程并发、限速发送，失败按指数退避重试（见 mail_outbox）
+- 每封邮件带去重键，重复提交同一批通知不会产生重复邮件
+- 按分组（如班级）统计成功、失败和待发送数量，管理员界面可以查询发送进度和结果，
+  进程重启后进度仍然可以查询
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import time
+import uuid
+import logging
+from datetime import datetime
+
+from util import mail_outbox
+
+# 等待发送任务完成时的轮询间隔（秒）
+RUN_POLL_INTERVAL = 1
+
+
+def start_run(title, group_totals):
+    """
+    创建一次发送任务记录
+
+    Args:
+        title (str): 任务标题
+        group_totals (dict): {分组名: 邮件数量}
+
+    Returns:
+        str: 任务ID
+    """
+    run_id = uuid.uuid4().hex[:12]
+    mail_outbox.create_run(run_id, title, datetime.now().isoformat(), group_totals)
+    return run_id
+
+
+def get_run(run_id):
+    """
+    获取发送任务的进度
+
+    Args:
+        run_id (str): 任务ID
+
+    Returns:
+        dict: 任务记录，不存在时返回None
+    """
+    loaded = mail_outbox.load_run(run_id)
+    if loaded is None:
+        return None
+    title, created_at, group_totals, counts, last_sent = loaded
+
+    groups = {}
+    for group, total in group_totals.items():
+        success = counts.get((group, 'sent'), 0)
+        failed = counts.get((group, 'failed'), 0)
+        pending = counts.get((group, 'pending'), 0) + counts.get((group, 'sending'), 0)
+        # 去重键已存在（之前已发送过）的邮件不属于本任务，记为跳过
+        groups[group] = {'total': total, 'success': success, 'failed': failed, 'pending': pending,
+                         'skipped': max(0, total - success - failed - pending)}
+
+    finished = all(counts['pending'] == 0 for counts in groups.values())
+    return {
+        'id': run_id,
+        'title': title,
+        'status': 'finished' if finished else 'running',
+        'created_at': created_at,
+        'finished_at': datetime.fromtimestamp(last_sent).isoformat() if finished and last_sent else None,
+        'groups': groups
+    }
+
+
+def list_runs():
+    """
+    获取最近的发送任务（最新的在前）
+
+    Returns:
+        list: 任务记录列表
+    """
+    return [run for run in (get_run(run_id) for run_id in mail_outbox.recent_run_ids()) if run]
+
+
+def send_all(run_id, tasks, category, wait=False):
+    """
+    将一批邮件写入发件箱
+
+    Args:
+        run_id (str): start_run 返回的任务ID
+        tasks (list): 邮件列表，每项为 dict:
+            group (str): 分组名，需在 start_run 的 group_totals 中
+            recipient (str): 收件人地址，为空时该邮件记为失败
+            build (callable): 无参数函数，返回 email.message.Message
+            dedup_key (str): 去重键
+            name (str, optional): 收件人名称，用于日志
+        category (str): 邮件类别
+        wait (bool): 是否阻塞直到全部发送完成
+
+    Returns:
+        dict: 任务的当前记录
+    """
+    items = []
+    for task in tasks:
+        recipient = task['recipient']
+        if not recipient:
+            logging.warning(f"{task['group']} 的收件人 {task.get('name', '')} 没有邮箱，无法发送通知")
+        items.append({
+            'msg': task['build']() if recipient else None,
+            'to_addrs': [recipient] if recipient else [],
+            'category': category,
+            'dedup_key': task['dedup_key'],
+            'run_id': run_id,
+            'group': task['group'],
+            'error': '没有邮箱'
+        })
+
+    inserted = mail_outbox.enqueue_many(items)
+    logging.info(f"批量发送任务 {run_id} 已加入发件箱: {inserted}/{len(tasks)} 封（其余为重复或无邮箱）")
+
+    result = get_run(run_id)
+    while wait and result['status'] != 'finished':
+        time.sleep(RUN_POLL_INTERVAL)
+        result = get_run(run_id)
+    return result
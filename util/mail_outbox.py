@@ -0,0 +1,364 @@
+"""
+作业传输系统 - 持久化邮件发件箱模块
+
+截止提醒、提交通知、作业通知和用户反馈邮件不再在请求或后台线程中直接发送，
+而是先写入 SQLite 发件箱，由专门的发送线程投递：
+- 邮件写入发件箱即视为已提交，进程重启后未发送的邮件会继续发送
+- 每封邮件可以带一个去重键，同一去重键只会入队一次，
+  重启后重新执行的检查任务不会产生重复邮件
+- 发送线程领取邮件时设置租约，发送成功后才标记为已发送；
+  发送过程中进程崩溃的邮件在租约过期后重新发送（至少投递一次）
+- 连接断开、超时、4xx 临时错误按指数退避重试，多次失败或永久错误标记为失败
+- 发送线程领取邮件时在同一个事务中预约发送时间，所有进程的发送线程共用一个限速，
+  总发送速率不超过 SMTP 中继的限制
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import json
+import time
+import logging
+import smtplib
+import threading
+
+from util.config import SMTP_USERNAME
+from util import mail_transport, sqlite_db
+
+try:
+    from util.config import OUTBOX_DATABASE
+except ImportError:
+    OUTBOX_DATABASE = 'data/mail_outbox.db'
+
+try:
+    from util.config import MAIL_RATE_LIMIT
+except ImportError:
+    MAIL_RATE_LIMIT = 5  # 每秒最多发送的邮件数
+
+try:
+    from util.config import MAIL_FANOUT_WORKERS
+except ImportError:
+    MAIL_FANOUT_WORKERS = mail_transport.SMTP_POOL_SIZE
+
+# 可恢复错误的最大重试次数
+MAIL_MAX_RETRIES = 6
+
+# 第一次重试前等待的秒数，之后每次翻倍
+MAIL_RETRY_BACKOFF = 10
+
+# 领取邮件后的租约时间（秒），超过该时间仍未完成的邮件会被重新发送
+SENDING_LEASE = 120
+
+# 已发送和已失败邮件的保留时间（秒）
+OUTBOX_RETENTION = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key    TEXT UNIQUE,
+    category     TEXT NOT NULL,
+    run_id       TEXT,
+    group_name   TEXT,
+    from_addr    TEXT NOT NULL,
+    to_addrs     TEXT NOT NULL,
+    message      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created_at   REAL NOT NULL,
+    sent_at      REAL,
+    last_error   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt);
+CREATE INDEX IF NOT EXISTS idx_outbox_run ON outbox(run_id);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id         TEXT PRIMARY KEY,
+    title      TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    groups     TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS kv (
+    key   TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+_wake = threading.Event()
+_senders = []
+_senders_lock = threading.Lock()
+
+
+def _connect():
+    """获取当前线程的数据库连接"""
+    return sqlite_db.connect(OUTBOX_DATABASE, SCHEMA)
+
+
+def is_transient(error):
+    """
+    判断发送错误是否可以重试
+
+    Args:
+        error (Exception): 发送时抛出的异常
+
+    Returns:
+        bool: 连接类错误和 4xx 临时错误返回 True
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        # SMTPException 是 OSError 的子类，其余没有响应码的错误（如服务器不支持的扩展、
+        # 没有可用的认证方式）重试也不会成功
+        return False
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+def enqueue_many(items):
+    """
+    在一个事务中将多封邮件写入发件箱
+
+    Args:
+        items (list): 邮件列表，每项为 dict:
+            msg (Message): 邮件对象，为None时直接记为失败（如收件人没有邮箱）
+            to_addrs (list): 收件人地址列表
+            category (str): 邮件类别，如 deadline_reminder
+            dedup_key (str, optional): 去重键，已存在相同去重键的邮件时忽略
+            from_addr (str, optional): 发件人，默认 SMTP_USERNAME
+            run_id (str, optional): 所属批量发送任务
+            group (str, optional): 批量发送任务中的分组
+            error (str, optional): msg 为None时记录的失败原因
+
+    Returns:
+        int: 新加入发件箱的邮件数
+    """
+    now = time.time()
+    rows = []
+    for item in items:
+        msg = item.get('msg')
+        rows.append((
+            item.get('dedup_key'), item['category'], item.get('run_id'), item.get('group'),
+            item.get('from_addr') or SMTP_USERNAME, json.dumps(item['to_addrs']),
+            msg.as_string() if msg is not None else '',
+            'pending' if msg is not None else 'failed',
+            now, now, None if msg is not None else item.get('error', '')
+        ))
+
+    with sqlite_db.transaction(_connect()) as conn:
+        before = conn.total_changes
+        conn.executemany(
+            """INSERT OR IGNORE INTO outbox
+               (dedup_key, category, run_id, group_name, from_addr, to_addrs, message, status,
+                next_attempt, created_at, last_error)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+        inserted = conn.total_changes - before
+
+    if inserted:
+        start_sender()
+        _wake.set()
+    return inserted
+
+
+def enqueue(msg, to_addrs, category, dedup_key=None, from_addr=None):
+    """
+    将一封邮件写入发件箱
+
+    Args:
+        msg (Message): 邮件对象
+        to_addrs (list): 收件人地址列表
+        category (str): 邮件类别
+        dedup_key (str, optional): 去重键
+        from_addr (str, optional): 发件人，默认 SMTP_USERNAME
+
+    Returns:
+        bool: 是否新加入发件箱（去重键已存在时返回False）
+    """
+    return enqueue_many([{
+        'msg': msg, 'to_addrs': to_addrs, 'category': category,
+        'dedup_key': dedup_key, 'from_addr': from_addr
+    }]) > 0
+
+
+def _reserve_slot(conn, now):
+    """
+    预约一个发送时间（在领取邮件的事务中调用，所有进程共用）
+
+    按 GCRA 算法限速：kv 表中的 next_send 为下一封邮件的理论发送时间，
+    空闲后允许连续发送 MAIL_RATE_LIMIT 封，之后每 1/MAIL_RATE_LIMIT 秒发送一封。
+
+    Returns:
+        float: 预约的发送时间
+    """
+    interval = 1.0 / MAIL_RATE_LIMIT
+    burst = max(1, int(MAIL_RATE_LIMIT))
+    row = conn.execute("SELECT value FROM kv WHERE key = 'next_send'").fetchone()
+    tat = max(row[0] if row else 0.0, now)
+    conn.execute("INSERT OR REPLACE INTO kv (key, value) VALUES ('next_send', ?)", (tat + interval,))
+    return max(now, tat - (burst - 1) * interval)
+
+
+def _claim():
+    """领取一封到期的邮件，返回 (id, from_addr, to_addrs, message, attempts, 预约的发送时间) 或None"""
+    now = time.time()
+    with sqlite_db.transaction(_connect()) as conn:
+        row = conn.execute(
+            """SELECT id, from_addr, to_addrs, message, attempts FROM outbox
+               WHERE status IN ('pending', 'sending') AND next_attempt <= ?
+               ORDER BY next_attempt, id LIMIT 1""",
+            (now,)
+        ).fetchone()
+        if row is None:
+            return None
+        send_at = _reserve_slot(conn, now)
+        conn.execute(
+            "UPDATE outbox SET status = 'sending', attempts = attempts + 1, next_attempt = ? WHERE id = ?",
+            (send_at + SENDING_LEASE, row[0])
+        )
+    return row + (send_at,)
+
+
+def _next_due():
+    """距离下一封待发送邮件到期的秒数，没有待发送邮件时返回None"""
+    row = _connect().execute(
+        "SELECT MIN(next_attempt) FROM outbox WHERE status IN ('pending', 'sending')"
+    ).fetchone()
+    return None if row[0] is None else max(0.0, row[0] - time.time())
+
+
+def _deliver(row):
+    """发送一封已领取的邮件并记录结果"""
+    outbox_id, from_addr, to_addrs, message, attempts, send_at = row
+    to_addrs = json.loads(to_addrs)
+    conn = _connect()
+
+    wait = send_at - time.time()
+    if wait > 0:
+        time.sleep(wait)
+    try:
+        mail_transport.send_raw(from_addr, to_addrs, message)
+    except Exception as e:
+        if attempts <= MAIL_MAX_RETRIES and is_transient(e):
+            delay = MAIL_RETRY_BACKOFF * (2 ** (attempts - 1))
+            logging.warning(f"发送邮件至 {', '.join(to_addrs)} 失败，{delay} 秒后重试 ({attempts}/{MAIL_MAX_RETRIES}): {e}")
+            conn.execute(
+                "UPDATE outbox SET status = 'pending', next_attempt = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, str(e), outbox_id)
+            )
+        else:
+            logging.error(f"发送邮件至 {', '.join(to_addrs)} 失败: {e}")
+            conn.execute(
+                "UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                (str(e), outbox_id)
+            )
+        return
+
+    conn.execute(
+        "UPDATE outbox SET status = 'sent', sent_at = ?, message = '', last_error = NULL WHERE id = ?",
+        (time.time(), outbox_id)
+    )
+
+
+def _purge_old():
+    """删除超过保留时间的已发送和已失败邮件"""
+    _connect().execute(
+        "DELETE FROM outbox WHERE status IN ('sent', 'failed') AND created_at < ?",
+        (time.time() - OUTBOX_RETENTION,)
+    )
+
+
+def _sender():
+    """发送线程：循环领取并发送到期的邮件"""
+    last_purge = 0
+    while True:
+        try:
+            row = _claim()
+            if row is not None:
+                _deliver(row)
+                continue
+
+            if time.time() - last_purge > 3600:
+                _purge_old()
+                last_purge = time.time()
+
+            wait = _next_due()
+            _wake.wait(5 if wait is None else min(wait, 5))
+            _wake.clear()
+        except Exception as e:
+            logging.error(f"邮件发送线程出错: {e}")
+            time.sleep(5)
+
+
+def start_sender():
+    """启动发送线程（重复调用不会重复启动），应用启动时调用以继续发送上次未发完的邮件"""
+    with _senders_lock:
+        while len(_senders) < MAIL_FANOUT_WORKERS:
+            thread = threading.Thread(target=_sender, name=f'mail-sender-{len(_senders)}', daemon=True)
+            _senders.append(thread)
+            thread.start()
+
+
+def create_run(run_id, title, created_at, group_totals):
+    """
+    记录一次批量发送任务
+
+    Args:
+        run_id (str): 任务ID
+        title (str): 任务标题
+        created_at (str): 创建时间（ISO格式）
+        group_totals (dict): {分组名: 邮件数量}
+    """
+    _connect().execute(
+        "INSERT OR REPLACE INTO runs (id, title, created_at, groups) VALUES (?, ?, ?, ?)",
+        (run_id, title, created_at, json.dumps(group_totals, ensure_ascii=False))
+    )
+
+
+def load_run(run_id):
+    """
+    读取批量发送任务及其各分组、各状态的邮件数量
+
+    Returns:
+        tuple: (title, created_at, group_totals, {(分组, 状态): 数量}, 最后发送时间)，不存在时返回None
+    """
+    conn = _connect()
+    row = conn.execute("SELECT title, created_at, groups FROM runs WHERE id = ?", (run_id,)).fetchone()
+    if row is None:
+        return None
+    counts = {
+        (group, status): count
+        for group, status, count in conn.execute(
+            "SELECT group_name, status, COUNT(*) FROM outbox WHERE run_id = ? GROUP BY group_name, status",
+            (run_id,)
+        )
+    }
+    last_sent = conn.execute("SELECT MAX(sent_at) FROM outbox WHERE run_id = ?", (run_id,)).fetchone()[0]
+    return row[0], row[1], json.loads(row[2]), counts, last_sent
+
+
+def recent_run_ids(limit=20):
+    """最近的批量发送任务ID（最新的在前）"""
+    return [row[0] for row in _connect().execute(
+        "SELECT id FROM runs ORDER BY created_at DESC LIMIT ?", (limit,)
+    )]
+
+
+def get_stats():
+    """
+    获取发件箱统计信息
+
+    Returns:
+        dict: 各状态的邮件数量
+    """
+    stats = {'pending': 0, 'sending': 0, 'sent': 0, 'failed': 0}
+    for status, count in _connect().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+        stats[status] = count
+    stats['senders'] = len(_senders)
+    return stats
@@ -0,0 +1,183 @@
+"""
+作业传输系统 - 邮件发送连接池模块
+
+各类通知邮件（验证码、提交通知、作业通知、截止提醒、用户反馈）统一通过本模块发送：
+- 维护一组已完成 STARTTLS 和登录的 SMTP 连接，连续发送多封邮件时复用连接，
+  不再为每封邮件单独建立连接、握手和登录
+- 同时使用的连接数有上限，空闲过久或发送邮件数达到上限的连接会被关闭重建
+- 连接被服务器断开或出错时丢弃该连接，并使用新连接重试一次
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import time
+import atexit
+import logging
+import smtplib
+import threading
+
+from util.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD
+
+try:
+    from util.config import SMTP_POOL_SIZE
+except ImportError:
+    SMTP_POOL_SIZE = 4
+
+# 空闲超过该时间的连接不再复用（秒），多数服务器会在几分钟内断开空闲连接
+SMTP_IDLE_TIMEOUT = 60
+
+# 每个连接最多发送的邮件数，部分服务器会限制单个连接的发送数量
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+
+# 连接超时时间（秒）
+SMTP_TIMEOUT = 30
+
+# 可以通过重建连接恢复的错误
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class _Connection:
+    """已登录的 SMTP 连接"""
+
+    def __init__(self):
+        if SMTP_PORT == 465:
+            self.server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            self.server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            self.server.starttls()
+        self.server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def reusable(self):
+        return (self.sent < SMTP_MAX_MESSAGES_PER_CONNECTION
+                and time.monotonic() - self.last_used < SMTP_IDLE_TIMEOUT)
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+_idle = []
+_idle_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(SMTP_POOL_SIZE)
+_stats = {'connections_opened': 0, 'messages_sent': 0, 'reconnects': 0}
+
+
+def _acquire():
+    """取出一个可用的空闲连接，没有时新建连接"""
+    stale = []
+    connection = None
+    with _idle_lock:
+        while _idle:
+            candidate = _idle.pop()
+            if candidate.reusable:
+                connection = candidate
+                break
+            stale.append(candidate)
+
+    for candidate in stale:
+        candidate.close()
+
+    if connection is None:
+        connection = _Connection()
+        with _idle_lock:
+            _stats['connections_opened'] += 1
+    return connection
+
+
+def _release(connection):
+    """将连接放回空闲列表"""
+    connection.last_used = time.monotonic()
+    if not connection.reusable:
+        connection.close()
+        return
+    with _idle_lock:
+        _idle.append(connection)
+
+
+def send_mail(from_addr, to_addrs, msg):
+    """
+    使用连接池发送邮件
+
+    Args:
+        from_addr (str): 发件人地址
+        to_addrs (list): 收件人地址列表
+        msg: email.message.Message 对象
+
+    Raises:
+        smtplib.SMTPException: 发送失败（调用方按原来的方式记录日志）
+    """
+    send_raw(from_addr, to_addrs, msg.as_string())
+
+
+def send_raw(from_addr, to_addrs, message):
+    """
+    使用连接池发送已经序列化的邮件
+
+    Args:
+        from_addr (str): 发件人地址
+        to_addrs (list): 收件人地址列表
+        message (str): 邮件原文
+
+    Raises:
+        smtplib.SMTPException: 发送失败
+    """
+    with _slots:
+        for attempt in range(2):
+            connection = _acquire()
+            try:
+                connection.server.sendmail(from_addr, to_addrs, message)
+            except _RECONNECT_ERRORS as e:
+                # 连接已失效，丢弃后使用新连接重试一次
+                connection.close()
+                if attempt:
+                    raise
+                with _idle_lock:
+                    _stats['reconnects'] += 1
+                logging.info(f"SMTP连接已断开，重新连接: {e}")
+                continue
+            except smtplib.SMTPRecipientsRefused:
+                # 收件人被拒绝不影响连接本身
+                _release(connection)
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            connection.sent += 1
+            _release(connection)
+            with _idle_lock:
+                _stats['messages_sent'] += 1
+            return
+
+
+def get_stats():
+    """
+    获取连接池统计信息
+
+    Returns:
+        dict: 空闲连接数、累计建立的连接数、发送的邮件数、重连次数
+    """
+    with _idle_lock:
+        return {'pool_size': SMTP_POOL_SIZE, 'idle': len(_idle), **_stats}
+
+
+def close_all():
+    """关闭所有空闲连接（进程退出时调用）"""
+    with _idle_lock:
+        connections = list(_idle)
+        _idle.clear()
+    for connection in connections:
+        connection.close()
+
+
+atexit.register(close_all)
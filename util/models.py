@@ -3,7 +3,8 @@
 
 本模块定义系统的数据模型和数据持久化操作，主要功能包括：
 - 定义用户类(User)以支持Flask-Login
-- 用户数据的加载和保存
+- 用户数据的加载和保存（通过 util.storage 中配置的存储后端）
+- 按用户名、学号、邮箱、班级查找用户
 - 用户创建与验证
 - 用户资料更新
 
@@ -17,12 +18,12 @@ User类提供以下功能：
 日期: 2025-04-04
 """
 
-import json
 import logging
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
-from util.config import USERS_FILE, ADMIN_USERNAME, ADMIN_PASSWORD_HASH
+from util.config import ADMIN_USERNAME, ADMIN_PASSWORD_HASH
+from util.storage import get_storage
 
 class User(UserMixin):
     """用户类，扩展了 UserMixin 以支持 Flask-Login 功能"""
@@ -94,9 +95,8 @@ class User(UserMixin):
             return admin
         
         # 普通用户
-        users = load_users()
-        if user_id in users:
-            user_data = users[user_id]
+        user_data = get_user(user_id)
+        if user_data is not None:
             return User(
                 user_id, 
                 user_data.get('is_admin', False),
@@ -111,16 +111,32 @@ class User(UserMixin):
 
 def load_users():
     """加载用户数据"""
-    try:
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    return get_storage().load_users()
 
 def save_users(users):
     """保存用户数据"""
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+    get_storage().save_users(users)
+
+def get_user(username):
+    """按用户名获取单个用户数据，不存在时返回None"""
+    return get_storage().get_user(username)
+
+def save_user(username, user_data):
+    """新增或更新单个用户的数据"""
+    get_storage().save_user(username, user_data)
+
+def find_user_by_email(email):
+    """按邮箱查找用户，返回 (用户名, 用户数据)，未找到时返回 (None, None)"""
+    return next(iter(get_storage().find_users('email', email).items()), (None, None))
+
+def find_user_by_student_id(student_id):
+    """按学号查找用户，返回 (用户名, 用户数据)，未找到时返回 (None, None)"""
+    return next(iter(get_storage().find_users('student_id', student_id).items()), (None, None))
+
+def get_class_students(class_name):
+    """获取班级中的所有学生（不含管理员），返回 {用户名: 用户数据}"""
+    users = get_storage().find_users('class_name', class_name)
+    return {username: user for username, user in users.items() if not user.get('is_admin', False)}
 
 def create_user(username, password, name=None, email=None, student_id=None, is_admin=False):
     """创建新用户"""
@@ -152,9 +168,9 @@ def validate_user(username, password):
         return check_password_hash(ADMIN_PASSWORD_HASH, password)
     
     # 检查普通用户
-    users = load_users()
-    if username in users:
-        return check_password_hash(users[username]['password'], password)
+    user_data = get_user(username)
+    if user_data is not None:
+        return check_password_hash(user_data['password'], password)
     
     return False
 
@@ -25,22 +25,21 @@ popup_end_date: 2025-04-20  # 自动弹出结束日期
 
 import os
 import re
-import json
 import logging
 import uuid
+import threading
 from datetime import datetime
 from flask import Blueprint, jsonify, request, current_app
 from flask_login import login_required, current_user
 
+from util import notification_reads, event_stream
+
 # 创建蓝图
 notification_bp = Blueprint('notification', __name__)
 
 # 通知文件目录
 NOTIFICATIONS_DIR = 'notifications'
 
-# 用户已读记录文件
-USER_READ_RECORDS_FILE = 'data/notification_read_records.json'
-
 # 确保目录存在
 os.makedirs(NOTIFICATIONS_DIR, exist_ok=True)
 os.makedirs('data', exist_ok=True)
@@ -48,9 +47,12 @@ os.makedirs('data', exist_ok=True)
 # 元数据正则表达式
 META_PATTERN = re.compile(r'^---\s*\n(.*?)\n---\s*\n', re.DOTALL)
 
-# 已读记录缓存
-_read_records_cache = None
-_last_read_records_load_time = None
+# 通知目录缓存: {文件名: ((mtime_ns, size), (通知信息, 正文) 或 None)}
+_catalog = {}
+_catalog_lock = threading.Lock()
+# 由缓存生成的按日期排序的通知列表和 {通知ID: (通知信息, 正文)}，缓存变化时重新生成
+_catalog_sorted = None
+_catalog_by_id = {}
 
 def parse_notification_file(file_path):
     """
@@ -62,6 +64,20 @@ def parse_notification_file(file_path):
     Returns:
         dict: 包含通知信息的字典，如果解析失败则返回None
     """
+    parsed = _parse_notification(file_path, os.path.getmtime(file_path))
+    return parsed[0] if parsed else None
+
+def _parse_notification(file_path, mtime):
+    """
+    解析通知文件
+    
+    Args:
+        file_path (str): 通知文件路径
+        mtime (float): 文件修改时间（元数据中没有日期时使用）
+        
+    Returns:
+        tuple: (通知信息, 正文)，如果解析失败则返回None
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -92,7 +108,7 @@ def parse_notification_file(file_path):
             'title': metadata.get('title', '未命名通知'),
             'type': metadata.get('type', 'notice'),  # 默认为通知类型
             'priority': metadata.get('priority', 'medium'),  # 默认为中优先级
-            'date': metadata.get('date', datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()),
+            'date': metadata.get('date', datetime.fromtimestamp(mtime).isoformat()),
             'autoPopup': metadata.get('auto_popup', 'false').lower() == 'true',
             'popupStartDate': metadata.get('popup_start_date', ''),
             'popupEndDate': metadata.get('popup_end_date', ''),
@@ -100,7 +116,7 @@ def parse_notification_file(file_path):
             'file_path': file_path
         }
         
-        return notification
+        return notification, body_text
     except Exception as e:
         logging.error(f"解析通知文件出错: {file_path}, 错误: {e}")
         return None
@@ -136,14 +152,14 @@ def get_preview(content, max_length=100):
         return text[:max_length] + '...'
     return text
 
-def load_notifications():
+def _refresh_catalog():
     """
-    加载所有通知
+    按文件修改时间增量更新通知目录缓存：只解析新增或修改过的文件，移除已删除的文件
     
     Returns:
-        list: 通知列表
+        tuple: (按日期降序排列的通知列表, {通知ID: (通知信息, 正文)})
     """
-    notifications = []
+    global _catalog_sorted, _catalog_by_id
     
     # 确保通知目录存在
     if not os.path.exists(NOTIFICATIONS_DIR):
@@ -151,18 +167,62 @@ def load_notifications():
         # 创建示例通知
         create_sample_notifications()
     
-    # 遍历通知目录加载通知
-    for file_name in os.listdir(NOTIFICATIONS_DIR):
-        if file_name.endswith('.md'):
-            file_path = os.path.join(NOTIFICATIONS_DIR, file_name)
-            notification = parse_notification_file(file_path)
-            if notification:
-                notifications.append(notification)
+    with _catalog_lock:
+        changed = False
+        seen = set()
+        with os.scandir(NOTIFICATIONS_DIR) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                cached = _catalog.get(entry.name)
+                if cached and cached[0] == signature:
+                    continue
+                
+                # 新增或修改过的文件，解析失败的文件也记录下来，文件未变化时不再重复解析
+                _catalog[entry.name] = (signature, _parse_notification(entry.path, stat.st_mtime))
+                changed = True
+        
+        for file_name in set(_catalog) - seen:
+            del _catalog[file_name]
+            changed = True
+        
+        if changed or _catalog_sorted is None:
+            parsed = [item for _, item in _catalog.values() if item]
+            # 按日期降序排序
+            parsed.sort(key=lambda item: item[0]['date'], reverse=True)
+            _catalog_sorted = [notification for notification, _ in parsed]
+            _catalog_by_id = {notification['id']: (notification, body) for notification, body in parsed}
+        
+        return _catalog_sorted, _catalog_by_id
+
+def load_notifications():
+    """
+    加载所有通知（从通知目录缓存中读取，文件未修改时不重新解析）
     
-    # 按日期降序排序
-    notifications.sort(key=lambda x: x['date'], reverse=True)
+    Returns:
+        list: 通知列表（副本，调用方可以修改）
+    """
+    notifications, _ = _refresh_catalog()
+    return [dict(notification) for notification in notifications]
+
+def get_notification(notification_id):
+    """
+    获取单个通知
     
-    return notifications
+    Args:
+        notification_id (str): 通知ID
+        
+    Returns:
+        tuple: (通知信息副本, 正文)，通知不存在时返回 (None, None)
+    """
+    _, by_id = _refresh_catalog()
+    if notification_id not in by_id:
+        return None, None
+    notification, body = by_id[notification_id]
+    return dict(notification), body
 
 def create_sample_notifications():
     """创建示例通知"""
@@ -269,64 +329,6 @@ def create_sample_notifications():
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(metadata) + '\n\n' + sample['content'].strip())
 
-def load_read_records():
-    """
-    加载用户已读记录
-    
-    Returns:
-        dict: 用户已读记录
-    """
-    global _read_records_cache, _last_read_records_load_time
-    
-    # 如果缓存有效，直接使用缓存
-    current_time = datetime.now()
-    if _read_records_cache is not None and _last_read_records_load_time is not None:
-        # 缓存5分钟
-        if (current_time - _last_read_records_load_time).total_seconds() < 300:
-            return _read_records_cache
-    
-    # 加载记录文件
-    if os.path.exists(USER_READ_RECORDS_FILE):
-        try:
-            with open(USER_READ_RECORDS_FILE, 'r', encoding='utf-8') as f:
-                records = json.load(f)
-            
-            # 更新缓存
-            _read_records_cache = records
-            _last_read_records_load_time = current_time
-            
-            return records
-        except Exception as e:
-            logging.error(f"加载用户已读记录失败: {e}")
-    
-    # 如果文件不存在或加载失败，返回空记录
-    _read_records_cache = {}
-    _last_read_records_load_time = current_time
-    return {}
-
-def save_read_records(records):
-    """
-    保存用户已读记录
-    
-    Args:
-        records (dict): 用户已读记录
-    """
-    global _read_records_cache, _last_read_records_load_time
-    
-    try:
-        # 确保目录存在
-        os.makedirs(os.path.dirname(USER_READ_RECORDS_FILE), exist_ok=True)
-        
-        # 保存记录
-        with open(USER_READ_RECORDS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(records, f, ensure_ascii=False, indent=2)
-        
-        # 更新缓存
-        _read_records_cache = records
-        _last_read_records_load_time = datetime.now()
-    except Exception as e:
-        logging.error(f"保存用户已读记录失败: {e}")
-
 def is_notification_read(user_id, notification_id):
     """
     检查用户是否已读通知
@@ -338,14 +340,7 @@ def is_notification_read(user_id, notification_id):
     Returns:
         bool: 是否已读
     """
-    records = load_read_records()
-    
-    # 检查用户是否在记录中
-    if user_id not in records:
-        return False
-    
-    # 检查通知是否已读
-    return notification_id in records[user_id]['read_notifications']
+    return notification_reads.is_read(user_id, notification_id)
 
 def mark_notification_read(user_id, notification_id):
     """
@@ -355,22 +350,10 @@ def mark_notification_read(user_id, notification_id):
         user_id (str): 用户ID
         notification_id (str): 通知ID
     """
-    records = load_read_records()
-    
-    # 确保用户在记录中
-    if user_id not in records:
-        records[user_id] = {
-            'read_notifications': [],
-            'last_access': datetime.now().isoformat()
-        }
-    
-    # 如果通知未读，标记为已读
-    if notification_id not in records[user_id]['read_notifications']:
-        records[user_id]['read_notifications'].append(notification_id)
-        records[user_id]['last_access'] = datetime.now().isoformat()
-        
-        # 保存记录
-        save_read_records(records)
+    try:
+        notification_reads.mark_read(user_id, [notification_id])
+    except Exception as e:
+        logging.error(f"保存用户已读记录失败: {e}")
 
 def mark_all_notifications_read(user_id):
     """
@@ -383,22 +366,10 @@ def mark_all_notifications_read(user_id):
     notifications = load_notifications()
     notification_ids = [notification['id'] for notification in notifications]
     
-    # 加载用户记录
-    records = load_read_records()
-    
-    # 确保用户在记录中
-    if user_id not in records:
-        records[user_id] = {
-            'read_notifications': [],
-            'last_access': datetime.now().isoformat()
-        }
-    
-    # 标记所有通知为已读
-    records[user_id]['read_notifications'] = notification_ids
-    records[user_id]['last_access'] = datetime.now().isoformat()
-    
-    # 保存记录
-    save_read_records(records)
+    try:
+        notification_reads.mark_read(user_id, notification_ids)
+    except Exception as e:
+        logging.error(f"保存用户已读记录失败: {e}")
 
 @notification_bp.route('/get_notifications', methods=['GET'])
 @login_required
@@ -408,12 +379,12 @@ def get_notifications():
         # 加载所有通知
         notifications = load_notifications()
         
-        # 获取用户ID
-        user_id = current_user.id
+        # 用户已读的通知（一次查询）
+        read_ids = notification_reads.read_set(current_user.id)
         
         # 添加已读标记
         for notification in notifications:
-            notification['read'] = is_notification_read(user_id, notification['id'])
+            notification['read'] = notification['id'] in read_ids
             
             # 移除文件路径（不需要发送给前端）
             if 'file_path' in notification:
@@ -429,24 +400,12 @@ def get_notifications():
 def get_notification_content(notification_id):
     """获取通知内容API"""
     try:
-        # 加载所有通知
-        notifications = load_notifications()
-        
-        # 查找指定ID的通知
-        notification = next((n for n in notifications if n['id'] == notification_id), None)
+        # 从通知目录缓存中获取正文（已去除元数据）
+        notification, content = get_notification(notification_id)
         
         if not notification:
             return jsonify({'status': 'error', 'message': '通知不存在'})
         
-        # 读取通知内容
-        with open(notification['file_path'], 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 提取元数据和正文
-        meta_match = META_PATTERN.match(content)
-        if meta_match:
-            content = content[meta_match.end():]
-        
         # 标记通知为已读
         mark_notification_read(current_user.id, notification_id)
         
@@ -515,11 +474,8 @@ def admin_get_notification(notification_id):
         return jsonify({'status': 'error', 'message': '无权限访问'}), 403
     
     try:
-        # 加载所有通知
-        notifications = load_notifications()
-        
         # 查找指定ID的通知
-        notification = next((n for n in notifications if n['id'] == notification_id), None)
+        notification, _ = get_notification(notification_id)
         
         if not notification:
             return jsonify({'status': 'error', 'message': '通知不存在'})
@@ -580,6 +536,14 @@ def admin_create_notification():
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(metadata) + '\n\n' + data['content'])
         
+        # 推送给打开页面的用户
+        event_stream.publish('notification', {
+            'id': notification_id,
+            'title': data['title'],
+            'type': data['type'],
+            'priority': data['priority']
+        })
+        
         return jsonify({
             'status': 'success', 
             'message': '通知创建成功',
@@ -664,8 +628,9 @@ def admin_delete_notification(notification_id):
         if not file_path:
             return jsonify({'status': 'error', 'message': '通知不存在'}), 404
         
-        # 删除文件
+        # 删除文件和已读记录
         os.remove(file_path)
+        notification_reads.remove_notification(os.path.splitext(os.path.basename(file_path))[0])
         
         return jsonify({'status': 'success', 'message': '通知删除成功'})
     except Exception as e:
@@ -684,26 +649,21 @@ def admin_get_read_stats():
         # 加载所有通知
         notifications = load_notifications()
         
-        # 加载用户记录
-        read_records = load_read_records()
+        # 每个通知的阅读人数（标记已读时预先累计）
+        read_counts = notification_reads.read_counts()
         
         # 加载用户信息
         from util.models import load_users
         users = load_users()
         
+        # 计算总用户数（非管理员）
+        total_users = sum(1 for user_data in users.values() if not user_data.get('is_admin', False))
+        
         # 统计每个通知的阅读情况
         stats = []
         for notification in notifications:
             notification_id = notification['id']
-            
-            # 计算阅读人数
-            read_count = 0
-            for user_id, record in read_records.items():
-                if notification_id in record.get('read_notifications', []):
-                    read_count += 1
-            
-            # 计算总用户数（非管理员）
-            total_users = sum(1 for user_data in users.values() if not user_data.get('is_admin', False))
+            read_count = read_counts.get(notification_id, 0)
             
             # 计算阅读比例
             read_rate = f"{(read_count / total_users * 100) if total_users > 0 else 0:.1f}%"
@@ -750,21 +710,9 @@ def init_app(app):
         if not user_id:
             return False
         
-        # 加载通知和用户记录
-        notifications = load_notifications()
-        read_records = load_read_records()
-        
-        # 检查用户记录
-        if user_id not in read_records:
-            return len(notifications) > 0
-        
         # 检查是否有未读通知
-        read_notifications = read_records[user_id].get('read_notifications', [])
-        for notification in notifications:
-            if notification['id'] not in read_notifications:
-                return True
-        
-        return False
+        read_ids = notification_reads.read_set(user_id)
+        return any(notification['id'] not in read_ids for notification in load_notifications())
     
     # 添加Jinja2过滤器，用于在模板中获取未读通知数量
     @app.template_filter('unread_notification_count')
@@ -772,21 +720,8 @@ def init_app(app):
         if not user_id:
             return 0
         
-        # 加载通知和用户记录
-        notifications = load_notifications()
-        read_records = load_read_records()
-        
-        # 检查用户记录
-        if user_id not in read_records:
-            return len(notifications)
-        
         # 计算未读通知数量
-        read_notifications = read_records[user_id].get('read_notifications', [])
-        unread_count = 0
-        for notification in notifications:
-            if notification['id'] not in read_notifications:
-                unread_count += 1
-        
-        return unread_count
+        read_ids = notification_reads.read_set(user_id)
+        return sum(1 for notification in load_notifications() if notification['id'] not in read_ids)
     
     logging.info("通知系统已初始化")
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+作业传输系统 - 通知已读记录模块
+
+替代原来每个用户一个 read_notifications 列表的 JSON 文件（每次标记已读都要重写整个文件，
+判断是否已读需要在列表中线性查找，阅读统计需要对每个通知遍历所有用户）：
+- 已读日志: 只追加的标记已读记录（时间、用户、通知）
+- 已读集合: (通知, 用户) 为主键，重复标记不会产生重复记录，按用户或按通知查找都走索引
+- 阅读人数: 每个通知的已读人数，用户首次标记已读时加一，阅读统计直接读取
+
+首次使用时从 data/notification_read_records.json 导入已有的已读记录。
+数据库路径由 NOTIFICATION_READS_DATABASE 指定，默认为 data/notification_reads.db。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import time
+import logging
+
+from util import file_cache, sqlite_db
+
+try:
+    from util.config import NOTIFICATION_READS_DATABASE
+except ImportError:
+    NOTIFICATION_READS_DATABASE = 'data/notification_reads.db'
+
+# 旧的已读记录文件（首次使用时导入）
+LEGACY_RECORDS_FILE = 'data/notification_read_records.json'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS read_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    user_id TEXT NOT NULL,
+    notification_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reads (
+    notification_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    read_at REAL NOT NULL,
+    PRIMARY KEY (notification_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_reads_user ON reads (user_id, notification_id);
+CREATE TABLE IF NOT EXISTS read_counts (
+    notification_id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _connect():
+    """获取当前线程的数据库连接，首次使用时导入旧的已读记录"""
+    return sqlite_db.connect(NOTIFICATION_READS_DATABASE, SCHEMA, _import_existing)
+
+
+def _add_read(conn, user_id, notification_id, ts):
+    """记录已读并增加阅读人数，已读过时不做任何修改"""
+    cursor = conn.execute(
+        'INSERT OR IGNORE INTO reads (notification_id, user_id, read_at) VALUES (?, ?, ?)',
+        (notification_id, user_id, ts)
+    )
+    if not cursor.rowcount:
+        return False
+    conn.execute(
+        """INSERT INTO read_counts (notification_id, count) VALUES (?, 1)
+           ON CONFLICT (notification_id) DO UPDATE SET count = count + 1""",
+        (notification_id,)
+    )
+    conn.execute('INSERT INTO read_log (ts, user_id, notification_id) VALUES (?, ?, ?)',
+                 (ts, user_id, notification_id))
+    return True
+
+
+def _import_existing(conn):
+    """首次使用时从旧的 JSON 已读记录导入"""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+        return
+
+    records = {}
+    if os.path.exists(LEGACY_RECORDS_FILE):
+        try:
+            records = file_cache.load_json(LEGACY_RECORDS_FILE)
+        except Exception as e:
+            logging.error(f"加载旧的通知已读记录失败: {e}")
+
+    imported = 0
+    now = time.time()
+    with sqlite_db.transaction(conn) as tx:
+        # 其他进程可能已经完成导入
+        if tx.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+            return
+        for user_id, record in records.items():
+            for notification_id in record.get('read_notifications', []):
+                imported += _add_read(tx, user_id, notification_id, now)
+        tx.execute("INSERT INTO meta (key, value) VALUES ('imported', ?)", (str(now),))
+    if imported:
+        logging.info(f"已从 {LEGACY_RECORDS_FILE} 导入 {imported} 条通知已读记录")
+
+
+def is_read(user_id, notification_id):
+    """
+    检查用户是否已读通知
+
+    Args:
+        user_id (str): 用户ID
+        notification_id (str): 通知ID
+
+    Returns:
+        bool: 是否已读
+    """
+    row = _connect().execute(
+        'SELECT 1 FROM reads WHERE notification_id = ? AND user_id = ?', (notification_id, user_id)
+    ).fetchone()
+    return row is not None
+
+
+def read_set(user_id):
+    """
+    获取用户已读的所有通知
+
+    Args:
+        user_id (str): 用户ID
+
+    Returns:
+        set: 已读的通知ID集合
+    """
+    rows = _connect().execute('SELECT notification_id FROM reads WHERE user_id = ?', (user_id,)).fetchall()
+    return {row[0] for row in rows}
+
+
+def mark_read(user_id, notification_ids):
+    """
+    标记通知为已读
+
+    Args:
+        user_id (str): 用户ID
+        notification_ids (iterable): 通知ID列表
+
+    Returns:
+        int: 新标记为已读的通知数
+    """
+    notification_ids = list(notification_ids)
+    if not notification_ids:
+        return 0
+
+    # 已读时不需要开启写事务
+    read_ids = read_set(user_id)
+    unread = [i for i in notification_ids if i not in read_ids]
+    if not unread:
+        return 0
+
+    now = time.time()
+    with sqlite_db.transaction(_connect()) as conn:
+        return sum(_add_read(conn, user_id, notification_id, now) for notification_id in unread)
+
+
+def read_counts():
+    """
+    获取每个通知的阅读人数
+
+    Returns:
+        dict: {通知ID: 阅读人数}
+    """
+    return dict(_connect().execute('SELECT notification_id, count FROM read_counts').fetchall())
+
+
+def remove_notification(notification_id):
+    """
+    删除通知的已读记录和阅读人数（通知被删除时调用，已读日志保留）
+
+    Args:
+        notification_id (str): 通知ID
+    """
+    try:
+        with sqlite_db.transaction(_connect()) as conn:
+            conn.execute('DELETE FROM reads WHERE notification_id = ?', (notification_id,))
+            conn.execute('DELETE FROM read_counts WHERE notification_id = ?', (notification_id,))
+    except Exception as e:
+        logging.error(f"删除通知已读记录失败: {notification_id}, 错误: {e}")
@@ -2,12 +2,16 @@
 作业传输系统 - 定时任务模块 (修复版)
 
 此模块用于设置和管理系统的定时任务，包括：
-- 每日截止日期检查和提醒
+- 按作业的提醒阶段在精确的时间点发送截止提醒（DateTrigger，始终指向最近的提醒时刻）
+- 每日截止日期检查，补发错过的提醒
 - 其他可能的定时维护任务
 
 该模块使用APScheduler库来管理定时任务，可以方便地设置每天固定时间执行的任务。
 此版本修复了重启应用程序时定时器不会重新配置的问题。
 
+任务保存在 SQLite 任务存储中（见 job_store），重启后错过的每日检查会补执行；
+多进程部署时只有获得领导者锁的进程运行调度器，其他进程待命，领导者退出后接管。
+
 作者: [您的名字]
 版本: 1.1
 日期: 2025-04-13
@@ -15,16 +19,37 @@
 
 import logging
 import os
+import threading
 from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 
-from util.deadline_reminder import run_deadline_check
+from util.deadline_reminder import (run_deadline_check, run_due_reminders, rebuild_reminder_queue,
+                                    next_reminder_time, get_reminder_offsets, REMINDER_MISFIRE_GRACE)
+from util.utils import load_assignments
+from util import job_store
+
+# 每日检查补发最近一天内错过的提醒阶段（秒）
+DAILY_CHECK_WINDOW = 24 * 3600
+
+# 检查作业是否被其他进程修改的间隔（秒），修改后重建提醒队列
+REMINDER_SYNC_INTERVAL = 60
+
+# 待命进程尝试接管定时任务的间隔（秒）
+LEADER_RETRY_INTERVAL = 60
 
 # 创建全局调度器实例
 scheduler = None
 
+# 提醒队列对应的作业数据指纹
+_reminder_fingerprint = None
+
+# 待命线程
+_standby_thread = None
+
 def init_scheduler():
     """初始化调度器"""
     global scheduler
@@ -34,8 +59,8 @@ def init_scheduler():
         scheduler.shutdown(wait=False)
         logging.info("已关闭旧的调度器")
     
-    # 创建新的调度器
-    scheduler = BackgroundScheduler()
+    # 创建新的调度器（任务保存在 SQLite 中，重启后保留）
+    scheduler = BackgroundScheduler(jobstores={'default': job_store.SQLiteJobStore()})
     logging.info("已初始化新的调度器")
     
     return scheduler
@@ -48,6 +73,133 @@ def scheduler_listener(event):
     else:
         logging.info(f"任务 '{event.job_id}' 执行成功，返回值: {event.retval}")
 
+def _arm_next_reminder():
+    """将按阶段提醒的任务指向最近的提醒时刻，没有待触发的提醒时移除该任务"""
+    if not scheduler or not scheduler.running:
+        return
+    
+    run_date = next_reminder_time()
+    if run_date is None:
+        if scheduler.get_job('deadline_reminder_stage'):
+            scheduler.remove_job('deadline_reminder_stage')
+        return
+    
+    scheduler.add_job(
+        fire_due_reminders,
+        trigger=DateTrigger(run_date=run_date),
+        id='deadline_reminder_stage',
+        name='截止日期阶段提醒',
+        replace_existing=True,
+        misfire_grace_time=REMINDER_MISFIRE_GRACE
+    )
+    logging.info(f"下一次截止提醒时间: {run_date.strftime('%Y-%m-%d %H:%M:%S')}")
+
+def fire_due_reminders():
+    """处理已到时间的提醒阶段，并指向下一个提醒时刻"""
+    try:
+        return run_due_reminders()
+    finally:
+        _arm_next_reminder()
+
+def _assignments_fingerprint(assignments):
+    """作业中影响提醒时刻的字段（ID、截止日期、提醒时间）"""
+    return tuple((a['id'], a.get('dueDate'), tuple(get_reminder_offsets(a))) for a in assignments)
+
+def refresh_reminder_schedule():
+    """
+    重建提醒时刻队列并重新设置下一次提醒（作业创建、修改或删除后调用）
+    
+    Returns:
+        bool: 是否成功刷新
+    """
+    global _reminder_fingerprint
+    try:
+        assignments = load_assignments()
+        rebuild_reminder_queue(assignments, datetime.now())
+        _reminder_fingerprint = _assignments_fingerprint(assignments)
+        _arm_next_reminder()
+        return True
+    except Exception as e:
+        logging.error(f"刷新截止提醒队列失败: {e}")
+        return False
+
+def sync_reminder_queue():
+    """作业被其他进程修改时重建提醒队列（领导者进程定期执行）"""
+    if _assignments_fingerprint(load_assignments()) != _reminder_fingerprint:
+        logging.info("作业已修改，重建截止提醒队列")
+        refresh_reminder_schedule()
+
+def daily_deadline_check():
+    """每日检查：重建提醒队列，并补发最近一天内错过的提醒阶段"""
+    refresh_reminder_schedule()
+    return run_deadline_check(DAILY_CHECK_WINDOW)
+
+def _set_daily_job(hour, minute):
+    """
+    设置每日检查任务；任务存储中已有相同时间的任务时保留它，
+    以便重启后按保存的下一次执行时间补执行错过的检查
+    """
+    trigger = CronTrigger(hour=hour, minute=minute)
+    existing = scheduler.get_job('deadline_reminder')
+    if existing is not None and str(existing.trigger) == str(trigger):
+        logging.info(f"沿用已保存的截止日期提醒任务，下一次执行: {existing.next_run_time}")
+        return existing
+    
+    return scheduler.add_job(
+        daily_deadline_check,
+        trigger=trigger,
+        id='deadline_reminder',
+        name='截止日期提醒',
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=None  # 检查可以重复执行，错过多久都补执行一次
+    )
+
+def _start_leader(reminder_hour, reminder_minute):
+    """当前进程成为领导者后启动调度器"""
+    global scheduler
+    scheduler = init_scheduler()
+    
+    # 添加监听器
+    scheduler.add_listener(scheduler_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+    
+    # 先暂停启动以读取任务存储中已保存的任务
+    scheduler.start(paused=True)
+    
+    # 设置每天指定时间检查截止日期，补发错过的提醒
+    _set_daily_job(reminder_hour, reminder_minute)
+    logging.info(f"已设置截止日期提醒任务，将在每天 {reminder_hour:02d}:{reminder_minute:02d} 执行")
+    
+    # 其他进程修改作业后同步提醒队列
+    scheduler.add_job(
+        sync_reminder_queue,
+        trigger=IntervalTrigger(seconds=REMINDER_SYNC_INTERVAL),
+        id='reminder_queue_sync',
+        name='同步截止提醒队列',
+        replace_existing=True,
+        coalesce=True
+    )
+    
+    # 这里可以添加其他定时任务
+    
+    scheduler.resume()
+    logging.info("定时任务调度器已启动")
+    
+    # 按作业的提醒阶段设置精确的提醒时刻，并补发重启期间错过的提醒
+    refresh_reminder_schedule()
+    run_deadline_check(DAILY_CHECK_WINDOW)
+
+def _standby(reminder_hour, reminder_minute):
+    """待命：定期尝试获取领导者锁，领导者进程退出后接管定时任务"""
+    stop = threading.Event()
+    while not stop.wait(LEADER_RETRY_INTERVAL):
+        if job_store.acquire_leadership():
+            try:
+                _start_leader(reminder_hour, reminder_minute)
+            except Exception as e:
+                logging.error(f"接管定时任务失败: {e}")
+            return
+
 def setup_scheduler(app, reminder_hour=10, reminder_minute=0):
     """
     设置定时任务调度器
@@ -57,35 +209,20 @@ def setup_scheduler(app, reminder_hour=10, reminder_minute=0):
         reminder_hour (int): 定时提醒小时 (24小时制)
         reminder_minute (int): 定时提醒分钟
     """
+    global _standby_thread
+    
     # 确保目录存在
     os.makedirs('logs', exist_ok=True)
     
-    # 初始化调度器
-    global scheduler
-    scheduler = init_scheduler()
-    
     try:
-        # 添加监听器
-        scheduler.add_listener(scheduler_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
-        
-        # 设置每天指定时间检查截止日期并发送提醒
-        job = scheduler.add_job(
-            run_deadline_check,
-            trigger=CronTrigger(hour=reminder_hour, minute=reminder_minute),
-            id='deadline_reminder',
-            name='截止日期提醒',
-            replace_existing=True,
-            misfire_grace_time=3600  # 允许1小时的错过执行时间
-        )
-        
-        logging.info(f"已设置截止日期提醒任务，将在每天 {reminder_hour:02d}:{reminder_minute:02d} 执行")
-        
-        # 这里可以添加其他定时任务
-        
-        # 启动调度器
-        if not scheduler.running:
-            scheduler.start()
-            logging.info("定时任务调度器已启动")
+        if job_store.acquire_leadership():
+            _start_leader(reminder_hour, reminder_minute)
+        elif _standby_thread is None:
+            logging.info("其他进程正在运行定时任务，本进程待命")
+            _standby_thread = threading.Thread(
+                target=_standby, args=(reminder_hour, reminder_minute), name='scheduler-standby', daemon=True
+            )
+            _standby_thread.start()
         
         # 不要在这里注册teardown函数
     
@@ -112,18 +249,8 @@ def update_reminder_time(hour, minute=0):
         return False
     
     try:
-        # 移除旧的任务
-        scheduler.remove_job('deadline_reminder')
-        
-        # 添加新的任务
-        scheduler.add_job(
-            run_deadline_check,
-            trigger=CronTrigger(hour=hour, minute=minute),
-            id='deadline_reminder',
-            name='截止日期提醒',
-            replace_existing=True,
-            misfire_grace_time=3600  # 允许1小时的错过执行时间
-        )
+        # 替换旧的任务
+        _set_daily_job(hour, minute)
         
         logging.info(f"已更新截止日期提醒时间为 {hour:02d}:{minute:02d}")
         return True
@@ -136,11 +263,14 @@ def get_current_schedule():
     获取当前定时任务的调度信息
     
     Returns:
-        dict: 包含任务信息的字典
+        dict: 包含任务信息和最近执行历史的字典
     """
     global scheduler
     
     if not scheduler or not scheduler.running:
+        if not job_store.is_leader():
+            # 定时任务由其他进程运行，执行历史保存在共享的数据库中
+            return {"status": "standby", "leader": False, "history": job_store.recent_runs()}
         logging.warning("调度器未运行，无法获取任务信息")
         return {"status": "not_running"}
     
@@ -159,16 +289,23 @@ def get_current_schedule():
         if hasattr(trigger, 'fields'):
             for field in trigger.fields:
                 if field.name == 'hour':
-                    hour = field.expressions[0]
+                    hour = int(str(field.expressions[0]))
                 if field.name == 'minute':
-                    minute = field.expressions[0]
+                    minute = int(str(field.expressions[0]))
             schedule_time = f"{hour:02d}:{minute:02d}"
         
+        # 下一次按阶段提醒的时间
+        stage_job = scheduler.get_job('deadline_reminder_stage')
+        next_reminder = stage_job.next_run_time if stage_job else None
+        
         return {
             "status": "running",
+            "leader": True,
             "job_id": job.id,
             "next_run": next_run.strftime('%Y-%m-%d %H:%M:%S') if next_run else "未调度",
-            "schedule_time": schedule_time
+            "schedule_time": schedule_time,
+            "next_reminder": next_reminder.strftime('%Y-%m-%d %H:%M:%S') if next_reminder else "未调度",
+            "history": job_store.recent_runs()
         }
     except Exception as e:
         logging.error(f"获取任务信息失败: {e}")
@@ -0,0 +1,105 @@
+"""
+作业传输系统 - SQLite 数据库连接模块
+
+发件箱、定时任务、提交事件、通知已读记录、推送事件等 SQLite 存储共用的连接管理：
+- 每个线程对每个数据库使用一个连接（自动提交模式，事务显式开启），启用 WAL 日志，
+  读取不会被其他进程的写入阻塞
+- 每个进程对每个数据库只执行一次建表语句和初始化函数（如导入旧数据）
+- transaction() 开启 BEGIN IMMEDIATE 事务，多个线程或进程同时写入时互斥
+- subpath_range() 给出以 / 分隔的路径下层所有路径的范围，用于区分大小写的目录前缀匹配
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# 每个线程的连接: _local.connections = {数据库路径: 连接}
+_local = threading.local()
+
+# 本进程已完成建表和初始化的数据库路径
+_schema_ready = set()
+
+# 初始化函数可能打开其他数据库（如提交事件导入时读取提交索引），使用可重入锁
+_schema_lock = threading.RLock()
+
+
+def connect(path, schema, init=None):
+    """
+    获取当前线程的数据库连接，本进程首次使用该数据库时建表并执行初始化
+
+    Args:
+        path (str): 数据库路径
+        schema (str): 建表语句（应使用 IF NOT EXISTS，每个进程都会执行一次）
+        init (callable, optional): 建表后执行的初始化函数，参数为连接
+
+    Returns:
+        sqlite3.Connection: 数据库连接
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # 初始化函数中再次获取连接（如开启事务）时直接返回该连接
+        connections[path] = conn
+        try:
+            with _schema_lock:
+                if path not in _schema_ready:
+                    conn.executescript(schema)
+                    if init is not None:
+                        init(conn)
+                    _schema_ready.add(path)
+        except Exception:
+            # 初始化失败时不保留连接，下一次获取时重新初始化
+            del connections[path]
+            conn.close()
+            raise
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """
+    BEGIN IMMEDIATE 事务，正常结束时提交，出现异常时回滚
+
+    Args:
+        conn (sqlite3.Connection): connect() 返回的连接
+
+    Yields:
+        sqlite3.Connection: 同一个连接
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def subpath_range(key):
+    """
+    以 / 分隔的路径 key 下层所有路径的范围，用于 `列 >= ? AND 列 < ?` 条件
+
+    '0' 是 '/' 之后的下一个字符，因此以 key + '/' 开头的字符串都落在该范围内。
+    与 LIKE 不同，比较区分大小写（ClassA 不会匹配 classa 下的路径），并且可以使用索引。
+
+    Args:
+        key (str): 路径，如 班级/课程
+
+    Returns:
+        tuple: (下界, 上界)
+    """
+    return key + '/', key + '0'
@@ -20,6 +20,7 @@ from flask_login import login_required, current_user
 
 from util.models import load_users
 from util.utils import load_course_config
+from util import submission_index, submission_events
 
 # 创建蓝图
 stats_api_bp = Blueprint('stats_api', __name__)
@@ -51,10 +52,10 @@ def get_assignment_submission_stats():
         # 收集提交数据
         from util.config import UPLOAD_FOLDER
         assignment_path = os.path.join(UPLOAD_FOLDER, class_name, course, assignment)
-        if not os.path.exists(assignment_path):
+        if not submission_index.assignment_path_exists(assignment_path):
             # 旧结构兼容
             assignment_path = os.path.join(UPLOAD_FOLDER, course, class_name, assignment)
-            if not os.path.exists(assignment_path):
+            if not submission_index.assignment_path_exists(assignment_path):
                 return jsonify({'status':'success','data': generate_empty_stats()}), 200
         
         stats = collect_submission_stats(assignment_path)
@@ -95,12 +96,14 @@ def get_all_classes_stats(course, assignment):
 
             # 统计提交数据
             assignment_path = os.path.join(UPLOAD_FOLDER, cls, course, assignment)
-            if not os.path.exists(assignment_path):
+            if not submission_index.assignment_path_exists(assignment_path):
                 assignment_path = os.path.join(UPLOAD_FOLDER, course, cls, assignment)
-                if not os.path.exists(assignment_path):
+                if not submission_index.assignment_path_exists(assignment_path):
                     continue
 
             stats = collect_submission_stats(assignment_path)
+            if not combined['dailySubmissions']:
+                combined['dailySubmissions'] = [dict(day, count=0) for day in stats['dailySubmissions']]
             # 合并 dailySubmissions
             for i, day in enumerate(stats['dailySubmissions']):
                 combined['dailySubmissions'][i]['count'] += day['count']
@@ -124,38 +127,23 @@ def get_all_classes_stats(course, assignment):
         return jsonify({'status':'error','message':str(e)}), 500
 
 def collect_submission_stats(assignment_path):
-    """收集作业提交统计数据"""
+    """收集作业提交统计数据（读取预先汇总的每日提交数，见 submission_events）"""
     # 初始化统计结果
     stats = generate_empty_stats()
     
-    # 如果路径不存在，返回空数据
-    if not os.path.exists(assignment_path):
-        return stats
-    
-    # 获取所有学生提交文件夹
-    student_folders = [f for f in os.listdir(assignment_path) 
-                    if os.path.isdir(os.path.join(assignment_path, f)) 
-                    and not f.endswith('.zip')]
-    
-    # 获取每个提交的时间
-    submission_times = []
-    for folder in student_folders:
-        folder_path = os.path.join(assignment_path, folder)
-        
-        # 获取文件夹修改时间作为提交时间
-        submission_time = datetime.fromtimestamp(os.path.getmtime(folder_path))
-        submission_times.append(submission_time)
+    # 今天和过去14天的日期
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=14)
+    daily_counts = submission_events.get_daily_counts(
+        assignment_path, first_day.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
+    )
     
     # 总提交数
-    stats['totalSubmissions'] = len(submission_times)
-    
-    # 今天和昨天的日期
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    yesterday = today - timedelta(days=1)
+    stats['totalSubmissions'] = submission_events.get_total(assignment_path)
     
     # 计算今天和昨天的提交数量
-    today_submissions = sum(1 for t in submission_times if t >= today)
-    yesterday_submissions = sum(1 for t in submission_times if t >= yesterday and t < today)
+    today_submissions = daily_counts.get(today.strftime('%Y-%m-%d'), 0)
+    yesterday_submissions = daily_counts.get((today - timedelta(days=1)).strftime('%Y-%m-%d'), 0)
     
     # 计算与昨天相比的增长
     stats['comparedToYesterday'] = today_submissions - yesterday_submissions
@@ -164,13 +152,9 @@ def collect_submission_stats(assignment_path):
     if yesterday_submissions > 0:
         stats['trendPercentage'] = round((stats['comparedToYesterday'] / yesterday_submissions) * 100, 1)
     
-    # 计算过去7天每天的提交数量
+    # 过去15天每天的提交数量
     for i in range(14, -1, -1):
         day_date = today - timedelta(days=i)
-        next_day = day_date + timedelta(days=1)
-        
-        # 统计当天的提交数量
-        day_submissions = sum(1 for t in submission_times if t >= day_date and t < next_day)
         
         # 根据日期确定星期几名称
         day_name = day_date.strftime('%A').lower()
@@ -185,7 +169,7 @@ def collect_submission_stats(assignment_path):
         stats['dailySubmissions'].append({
             'date': day_date.strftime('%Y-%m-%d'),
             'day': day_name,
-            'count': day_submissions
+            'count': daily_counts.get(day_date.strftime('%Y-%m-%d'), 0)
         })
     
     return stats
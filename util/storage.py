@@ -0,0 +1,318 @@
+"""
+作业传输系统 - 数据存储模块
+
+本模块为用户数据、作业列表和课程配置提供可替换的存储后端：
+- JsonStorage: 默认后端，直接读写 users.json / assignments.json / course_config.json，
+  读取结果通过 file_cache 按文件修改时间缓存，写入通过 file_store 原子完成
+- SqliteStorage: SQLite 后端（WAL 模式），按用户名、学号、邮箱、班级建立索引，
+  单个用户的查询不再需要解析整个用户文件
+
+通过配置项 STORAGE_BACKEND 选择后端（'json' 或 'sqlite'），
+SQLite 数据库路径由 DATABASE_FILE 指定。首次使用 SQLite 后端时会自动从
+现有 JSON 文件迁移数据，也可以手动执行迁移：
+
+    python -m util.storage
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import json
+import logging
+import threading
+
+from util import file_cache, file_store, sqlite_db
+from util.config import USERS_FILE, COURSE_CONFIG_FILE, ASSIGNMENTS_FILE
+
+try:
+    from util.config import STORAGE_BACKEND
+except ImportError:
+    STORAGE_BACKEND = 'json'
+
+try:
+    from util.config import DATABASE_FILE
+except ImportError:
+    DATABASE_FILE = 'data/starvortex.db'
+
+# 用户记录中建立索引的字段
+USER_INDEX_FIELDS = ('student_id', 'email', 'class_name')
+
+
+class JsonStorage:
+    """基于 JSON 文件的存储后端"""
+
+    name = 'json'
+
+    # ---------- 用户 ----------
+    def load_users(self):
+        """加载全部用户数据"""
+        try:
+            return file_cache.load_json(USERS_FILE)
+        except FileNotFoundError:
+            return {}
+
+    def save_users(self, users):
+        """保存全部用户数据"""
+        file_store.write_json(USERS_FILE, users)
+
+    def get_user(self, username):
+        """按用户名获取用户数据，不存在时返回None"""
+        return self.load_users().get(username)
+
+    def save_user(self, username, user_data):
+        """新增或更新单个用户（加锁的读-改-写，不会覆盖其他并发修改）"""
+        file_store.update_json(USERS_FILE, lambda users: users.__setitem__(username, user_data))
+
+    def find_users(self, field, value):
+        """按字段查找用户，返回 {用户名: 用户数据}"""
+        return {username: user for username, user in self.load_users().items()
+                if user.get(field) == value}
+
+    # ---------- 作业 ----------
+    def load_assignments(self):
+        """加载作业列表"""
+        try:
+            return file_cache.load_json(ASSIGNMENTS_FILE)
+        except FileNotFoundError:
+            return []
+
+    def save_assignments(self, assignments):
+        """保存作业列表"""
+        file_store.write_json(ASSIGNMENTS_FILE, assignments)
+
+    # ---------- 课程配置 ----------
+    def load_course_config(self):
+        """加载课程配置，不存在时返回None"""
+        try:
+            return file_cache.load_json(COURSE_CONFIG_FILE)
+        except FileNotFoundError:
+            return None
+
+    def save_course_config(self, config):
+        """保存课程配置"""
+        file_store.write_json(COURSE_CONFIG_FILE, config)
+
+    # ---------- 数据版本 ----------
+    def data_version(self):
+        """作业列表和课程配置的版本（文件签名），任一文件被修改后改变"""
+        return (file_cache.signature(ASSIGNMENTS_FILE), file_cache.signature(COURSE_CONFIG_FILE))
+
+
+class SqliteStorage:
+    """基于 SQLite 的存储后端（WAL 模式，每个线程使用独立连接）"""
+
+    name = 'sqlite'
+
+    # 作业表以在列表中的位置为主键（作业ID可能缺失，只建立普通索引）
+    ASSIGNMENTS_SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS assignments (
+        position INTEGER PRIMARY KEY,
+        id       TEXT,
+        course   TEXT,
+        name     TEXT,
+        data     TEXT NOT NULL
+    )""",
+        'CREATE INDEX IF NOT EXISTS idx_assignments_id ON assignments(id)',
+        'CREATE INDEX IF NOT EXISTS idx_assignments_course_name ON assignments(course, name)',
+    )
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        username   TEXT PRIMARY KEY,
+        student_id TEXT,
+        email      TEXT,
+        class_name TEXT,
+        data       TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_users_student_id ON users(student_id);
+    CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+    CREATE INDEX IF NOT EXISTS idx_users_class_name ON users(class_name);
+
+    CREATE TABLE IF NOT EXISTS kv (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """ + ';\n'.join(ASSIGNMENTS_SCHEMA) + ';'
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._connect()
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        return sqlite_db.connect(self.db_file, self.SCHEMA, self._upgrade_schema)
+
+    @classmethod
+    def _upgrade_schema(cls, conn):
+        """
+        将旧版本以作业ID为主键的作业表改为以位置为主键
+
+        旧表中没有ID的作业以位置作为键，会与ID相同的其他作业冲突，导致保存失败。
+        """
+        def has_old_layout():
+            return any(row[1] == 'id' and row[5] for row in conn.execute('PRAGMA table_info(assignments)'))
+
+        if not has_old_layout():
+            return
+        with sqlite_db.transaction(conn):
+            # 其他进程可能已经完成升级
+            if not has_old_layout():
+                return
+            conn.execute('ALTER TABLE assignments RENAME TO assignments_old')
+            conn.execute('DROP INDEX IF EXISTS idx_assignments_id')
+            conn.execute('DROP INDEX IF EXISTS idx_assignments_course_name')
+            for statement in cls.ASSIGNMENTS_SCHEMA:
+                conn.execute(statement)
+            conn.execute("""INSERT INTO assignments (position, id, course, name, data)
+                            SELECT position, id, course, name, data FROM assignments_old""")
+            conn.execute('DROP TABLE assignments_old')
+        logging.info("已升级SQLite作业表结构")
+
+    @staticmethod
+    def _user_row(username, user_data):
+        return (username, *(user_data.get(field) for field in USER_INDEX_FIELDS),
+                json.dumps(user_data, ensure_ascii=False))
+
+    # ---------- 用户 ----------
+    def load_users(self):
+        """加载全部用户数据"""
+        rows = self._connect().execute('SELECT username, data FROM users ORDER BY rowid')
+        return {username: json.loads(data) for username, data in rows}
+
+    def save_users(self, users):
+        """保存全部用户数据，只写入有变化的记录（读取和写入在同一个事务中，与其他进程的保存互斥）"""
+        with sqlite_db.transaction(self._connect()) as conn:
+            existing = dict(conn.execute('SELECT username, data FROM users'))
+            removed = [(username,) for username in existing if username not in users]
+            changed = [self._user_row(username, user_data) for username, user_data in users.items()
+                       if existing.get(username) != json.dumps(user_data, ensure_ascii=False)]
+            conn.executemany('DELETE FROM users WHERE username = ?', removed)
+            conn.executemany('INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)', changed)
+
+    def get_user(self, username):
+        """按用户名获取用户数据，不存在时返回None"""
+        row = self._connect().execute(
+            'SELECT data FROM users WHERE username = ?', (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_user(self, username, user_data):
+        """新增或更新单个用户"""
+        with sqlite_db.transaction(self._connect()) as conn:
+            conn.execute('INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)',
+                         self._user_row(username, user_data))
+
+    def find_users(self, field, value):
+        """按索引字段查找用户，返回 {用户名: 用户数据}"""
+        if field not in USER_INDEX_FIELDS:
+            raise ValueError(f"不支持按字段查找用户: {field}")
+        rows = self._connect().execute(
+            f'SELECT username, data FROM users WHERE {field} = ? ORDER BY rowid', (value,))
+        return {username: json.loads(data) for username, data in rows}
+
+    # ---------- 作业 ----------
+    def load_assignments(self):
+        """加载作业列表（保持原有顺序）"""
+        rows = self._connect().execute('SELECT data FROM assignments ORDER BY position')
+        return [json.loads(data) for (data,) in rows]
+
+    def save_assignments(self, assignments):
+        """保存作业列表"""
+        with sqlite_db.transaction(self._connect()) as conn:
+            conn.execute('DELETE FROM assignments')
+            conn.executemany(
+                'INSERT INTO assignments (position, id, course, name, data) VALUES (?, ?, ?, ?, ?)',
+                [(position, str(a['id']) if a.get('id') is not None else None, a.get('course'), a.get('name'),
+                  json.dumps(a, ensure_ascii=False))
+                 for position, a in enumerate(assignments)]
+            )
+            self._bump_data_version(conn)
+
+    # ---------- 课程配置 ----------
+    def load_course_config(self):
+        """加载课程配置，不存在时返回None"""
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE key = 'course_config'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_course_config(self, config):
+        """保存课程配置"""
+        with sqlite_db.transaction(self._connect()) as conn:
+            conn.execute("INSERT OR REPLACE INTO kv VALUES ('course_config', ?)",
+                         (json.dumps(config, ensure_ascii=False),))
+            self._bump_data_version(conn)
+
+    # ---------- 数据版本 ----------
+    @staticmethod
+    def _bump_data_version(conn):
+        conn.execute("""INSERT INTO kv VALUES ('data_version', '1')
+                        ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""")
+
+    def data_version(self):
+        """作业列表和课程配置的版本，每次保存时递增"""
+        row = self._connect().execute("SELECT value FROM kv WHERE key = 'data_version'").fetchone()
+        return row[0] if row else '0'
+
+    # ---------- 迁移 ----------
+    def is_migrated(self):
+        """检查是否已经从 JSON 文件迁移过数据"""
+        row = self._connect().execute("SELECT value FROM kv WHERE key = 'migrated_from_json'").fetchone()
+        return row is not None
+
+    def migrate_from_json(self, source=None):
+        """
+        从 JSON 文件一次性迁移用户、作业和课程配置
+
+        Args:
+            source (JsonStorage, optional): 数据来源，默认为 JSON 文件后端
+
+        Returns:
+            dict: 各类数据的迁移数量
+        """
+        source = source or JsonStorage()
+        users = source.load_users()
+        assignments = source.load_assignments()
+        config = source.load_course_config()
+
+        self.save_users(users)
+        self.save_assignments(assignments)
+        if config is not None:
+            self.save_course_config(config)
+
+        with sqlite_db.transaction(self._connect()) as conn:
+            conn.execute("INSERT OR REPLACE INTO kv VALUES ('migrated_from_json', datetime('now'))")
+
+        result = {'users': len(users), 'assignments': len(assignments), 'course_config': config is not None}
+        logging.info(f"已从JSON文件迁移数据到SQLite: {result}")
+        return result
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    获取当前配置的存储后端（进程内单例）
+
+    使用 SQLite 后端且尚未迁移时，会先从 JSON 文件迁移现有数据。
+    """
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if STORAGE_BACKEND == 'sqlite':
+                    storage = SqliteStorage(DATABASE_FILE)
+                    if not storage.is_migrated():
+                        storage.migrate_from_json()
+                else:
+                    storage = JsonStorage()
+                logging.info(f"数据存储后端: {storage.name}")
+                _storage = storage
+    return _storage
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    print(SqliteStorage(DATABASE_FILE).migrate_from_json())
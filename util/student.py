@@ -11,6 +11,7 @@
 
 该模块定义了以下路由：
 - /: 学生文件上传页面
+- /upload/init, /upload/<upload_id>/chunk/<index>, /upload/<upload_id>/finalize: 分片上传（可断点续传）
 - /my_submissions: 获取当前用户提交记录
 - /assignment_stats: 获取作业统计信息
 - /submission/<course>/<assignment>: 删除提交记录
@@ -23,23 +24,25 @@
 """
 
 import os
+import shutil
+import hashlib
 import logging
-import threading
-import zipfile
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for
 from flask_login import login_required, current_user
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 from util.config import UPLOAD_FOLDER, allowed_file
-from util.utils import load_course_config, compress_folder, format_file_size, load_assignments
+from util.utils import load_course_config, format_file_size
+from util.assignment_repo import find_assignment
 from util.models import load_users, save_users
 from util.api import get_default_settings
-from util.submission_notification import process_submission_notification
+from util.submission_notification import process_submission_notification, SUBMISSION_NOTIFICATION_DELAY
+from util import submission_index, submission_events, file_cache, file_store, upload_stream, archive_cache, job_queue, event_stream, dashboard
 
-import json
 from datetime import datetime, date
 from werkzeug.security import check_password_hash, generate_password_hash
-from flask import jsonify, request, redirect, url_for, send_from_directory
+from flask import jsonify, request, redirect, url_for, send_from_directory, send_file
 
 
 student_bp = Blueprint('student', __name__)
@@ -113,16 +116,15 @@ def upload_file():
     if request.method == 'POST':
         try:
             # 获取课程和作业名称
-            course = request.form.get('course')
-            assignment_name = request.form.get('assignment_name')
+            # 新版前端通过查询参数传递，这样可以在解析请求体之前确定上传限制
+            course = request.args.get('course') or request.form.get('course')
+            assignment_name = request.args.get('assignment_name') or request.form.get('assignment_name')
             
             # 获取班级名称 - 从用户数据中获取而不是表单
             class_name = user_data.get('class_name', '')
             
             # 添加日志以调试请求内容
             logging.info(f'POST请求: course={course}, class_name={class_name}, assignment={assignment_name}')
-            logging.info(f'表单数据: {dict(request.form)}')
-            logging.info(f'文件: {list(request.files.keys())}')
             
             # 检查课程和作业名称
             if not course or not assignment_name:
@@ -133,9 +135,26 @@ def upload_file():
             if not class_name:
                 logging.warning('用户没有分配班级')
                 return jsonify({'status': 'error', 'message': '您的账号未分配班级，请联系管理员'}), 400
+            
+            # 获取作业设置和上传限制
+            settings = get_upload_settings(course, assignment_name)
+            student_id = users[current_user.id].get('student_id', '')
+            limits = get_upload_limits(settings, student_id)
+            
+            # 接收文件时超过任一限制立即中止
+            if limits['quota_left'] is not None and limits['quota_left'] < limits['max_size_bytes']:
+                upload_stream.set_upload_limit(max(limits['quota_left'], 0), limits['quota_message'])
+            else:
+                upload_stream.set_upload_limit(limits['max_size_bytes'], limits['size_message'])
+            
+            try:
+                has_file = 'file' in request.files
+            except upload_stream.UploadLimitExceeded as e:
+                logging.warning(f'上传中止: {e.description}')
+                return jsonify({'status': 'error', 'message': e.description}), 400
 
             # 检查是否有文件
-            if 'file' not in request.files:
+            if not has_file:
                 logging.warning('No file part in the request')
                 return jsonify({'status': 'error', 'message': '没有选择文件'}), 400
             
@@ -146,80 +165,19 @@ def upload_file():
                 logging.warning('No selected file')
                 return jsonify({'status': 'error', 'message': '没有选择文件'}), 400
             
-            # 获取作业设置
-            assignments = load_assignments()
-            assignment_obj = next((a for a in assignments if a['course'] == course and a['name'] == assignment_name), None)
-            
-            # 使用默认或自定义设置
-            settings = assignment_obj.get('advancedSettings', get_default_settings()) if assignment_obj else get_default_settings()
-            
-            # 检查文件扩展名是否在允许列表中
-            file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-            
-            if settings.get('allowedTypes') and file_extension not in settings.get('allowedTypes', []):
-                allowed_types = ', '.join(settings.get('allowedTypes', []))
-                logging.warning(f'不支持的文件类型: {file_extension}, 允许的类型: {allowed_types}')
-                return jsonify({'status': 'error', 'message': f'不支持的文件类型，允许的类型: {allowed_types}'}), 400
-            
-            # 检查文件大小
-            max_size = settings.get('maxFileSize', 256)
-            unit = settings.get('fileSizeUnit', 'MB')
-            max_size_bytes = max_size * (1024 * 1024 * 1024 if unit == 'GB' else 1024 * 1024)
-            
-            # 获取文件大小（不读取整个文件）
-            file.seek(0, os.SEEK_END)
-            file_size = file.tell()
-            file.seek(0)  # 重置文件指针
-            
-            if file_size > max_size_bytes:
-                size_limit = f"{max_size} {unit}"
-                logging.warning(f'文件超过大小限制: {file_size} > {max_size_bytes} ({size_limit})')
-                return jsonify({'status': 'error', 'message': f'文件超过大小限制 ({size_limit})'}), 400
-            
-            # 检查每日上传限额
-            student_id = users[current_user.id].get('student_id', '')
+            # 获取文件大小（流式接收时已在写入过程中统计）
+            if isinstance(file.stream, upload_stream.HashingFile):
+                file_size = file.stream.size
+            else:
+                file.seek(0, os.SEEK_END)
+                file_size = file.tell()
+                file.seek(0)  # 重置文件指针
             
-            if settings.get('dailyQuota'):
-                daily_quota_bytes = settings.get('dailyQuota', 1) * 1024 * 1024 * 1024  # GB to bytes
-                
-                # 获取今日上传总量
-                today = date.today()
-                today_uploads = get_today_upload_size(student_id, today)
-                
-                # 检查是否超过限额
-                if today_uploads + file_size > daily_quota_bytes:
-                    logging.warning(f'超过每日上传限额: {today_uploads + file_size} > {daily_quota_bytes}')
-                    return jsonify({'status': 'error', 'message': f'超过每日上传限额 ({settings.get("dailyQuota", 1)} GB)'}), 400
-            
-            # 检查文件数量限制 - 检查两种可能的路径结构
-            if settings.get('maxFileCount'):
-                # 尝试两种文件夹结构
-                # 1. 新结构: /班级/课程/作业/
-                folder_paths = [
-                    os.path.join(UPLOAD_FOLDER, class_name, course, assignment_name),  # 新结构
-                    os.path.join(UPLOAD_FOLDER, course, class_name, assignment_name),  # 旧结构
-                    os.path.join(UPLOAD_FOLDER, course, assignment_name)               # 最旧结构
-                ]
-                
-                student_folder_name = f"{student_id}_{current_user.id}"
-                student_folder = None
-                
-                # 查找已存在的学生文件夹
-                for path in folder_paths:
-                    if os.path.exists(path):
-                        potential_folders = [f for f in os.listdir(path) 
-                                           if os.path.isdir(os.path.join(path, f)) 
-                                           and f.startswith(student_folder_name)]
-                        if potential_folders:
-                            student_folder = os.path.join(path, potential_folders[0])
-                            break
-                
-                # 检查文件数量
-                if student_folder and os.path.exists(student_folder):
-                    existing_files = [f for f in os.listdir(student_folder) if os.path.isfile(os.path.join(student_folder, f))]
-                    if len(existing_files) >= settings.get('maxFileCount', 10):
-                        logging.warning(f'文件数量超过限制: {len(existing_files)} >= {settings.get("maxFileCount", 10)}')
-                        return jsonify({'status': 'error', 'message': f'已达到最大文件数量限制 ({settings.get("maxFileCount", 10)} 个文件)'}), 400
+            # 检查文件类型、大小、每日限额和文件数量
+            error_message = check_upload_allowed(settings, limits, file.filename, file_size,
+                                                 class_name, course, assignment_name, student_id, current_user.id)
+            if error_message:
+                return jsonify({'status': 'error', 'message': error_message}), 400
             
             # 强制使用新结构
             is_success, file_path = upload_file_new_structure(file, course, user_info['user_class_name'], assignment_name, student_id, current_user.id)
@@ -228,31 +186,8 @@ def upload_file():
                 logging.warning(f'文件上传失败: {file_path}')
                 return jsonify({'status': 'error', 'message': f'文件上传失败: {file_path}'}), 500
             
-            # 记录今日上传量
-            update_daily_upload_record(student_id, file_size)
-
-            try:
-                import time
-
-                def delayed_notification(user_id, course, assignment_name, student_folder):
-                    time.sleep(5)  # 等待5秒，确保文件上传完成
-                    process_submission_notification(user_id, course, assignment_name, student_folder)
-
-                # 使用新的文件结构路径
-                student_folder = os.path.join(UPLOAD_FOLDER, class_name, course, assignment_name, f"{student_id}_{current_user.id}")
-                
-                # 从外部取出变量作为参数传入线程
-                user_id = current_user.id
-                notification_thread = threading.Thread(
-                    target=delayed_notification,
-                    args=(user_id, course, assignment_name, student_folder)
-                )
-                notification_thread.daemon = True
-                notification_thread.start()
-                logging.info(f'Started delayed notification thread for {user_id}')
-            except Exception as e:
-                logging.error(f'Failed to start notification thread: {str(e)}')
-
+            # 记录今日上传量并发送提交通知
+            after_upload(current_user.id, student_id, class_name, course, assignment_name, file_size)
             
             return jsonify({
                 'status': 'success', 
@@ -274,18 +209,387 @@ def upload_file():
     # GET请求返回页面
     return render_template('upload.html', courses=courses, **user_info)
 
+def get_upload_settings(course, assignment_name):
+    """获取作业的上传设置，作业未设置时使用默认设置"""
+    assignment_obj = find_assignment(course, assignment_name)
+    
+    # 使用默认或自定义设置
+    return assignment_obj.get('advancedSettings', get_default_settings()) if assignment_obj else get_default_settings()
+
+def get_upload_limits(settings, student_id):
+    """
+    计算本次上传的文件大小限制和今日剩余限额
+    
+    Returns:
+        dict: max_size_bytes、size_message、quota_left（未设置限额时为None）、quota_message
+    """
+    # 文件大小限制
+    max_size = settings.get('maxFileSize', 256)
+    unit = settings.get('fileSizeUnit', 'MB')
+    max_size_bytes = max_size * (1024 * 1024 * 1024 if unit == 'GB' else 1024 * 1024)
+    
+    # 每日上传限额
+    quota_left = None
+    if settings.get('dailyQuota'):
+        daily_quota_bytes = settings.get('dailyQuota', 1) * 1024 * 1024 * 1024  # GB to bytes
+        quota_left = daily_quota_bytes - get_today_upload_size(student_id, date.today())
+    
+    return {
+        'max_size_bytes': max_size_bytes,
+        'size_message': f'文件超过大小限制 ({max_size} {unit})',
+        'quota_left': quota_left,
+        'quota_message': f'超过每日上传限额 ({settings.get("dailyQuota", 1)} GB)'
+    }
+
+def check_upload_allowed(settings, limits, filename, file_size, class_name, course, assignment_name, student_id, username):
+    """
+    检查文件类型、文件大小、每日限额和文件数量
+    
+    Returns:
+        str: 不允许上传时返回错误信息，允许时返回None
+    """
+    # 检查文件扩展名是否在允许列表中
+    file_extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    
+    if settings.get('allowedTypes') and file_extension not in settings.get('allowedTypes', []):
+        allowed_types = ', '.join(settings.get('allowedTypes', []))
+        logging.warning(f'不支持的文件类型: {file_extension}, 允许的类型: {allowed_types}')
+        return f'不支持的文件类型，允许的类型: {allowed_types}'
+    
+    # 检查文件大小
+    if file_size > limits['max_size_bytes']:
+        logging.warning(f'文件超过大小限制: {file_size} > {limits["max_size_bytes"]}')
+        return limits['size_message']
+    
+    # 检查每日上传限额
+    if limits['quota_left'] is not None and file_size > limits['quota_left']:
+        logging.warning(f'超过每日上传限额: 剩余 {limits["quota_left"]}, 本次 {file_size}')
+        return limits['quota_message']
+    
+    # 检查文件数量限制 - 检查三种可能的路径结构
+    if settings.get('maxFileCount'):
+        folder_paths = [
+            os.path.join(UPLOAD_FOLDER, class_name, course, assignment_name),  # 新结构
+            os.path.join(UPLOAD_FOLDER, course, class_name, assignment_name),  # 旧结构
+            os.path.join(UPLOAD_FOLDER, course, assignment_name)               # 最旧结构
+        ]
+        
+        student_folder_name = f"{student_id}_{username}"
+        student_folder = None
+        
+        # 从提交索引中查找已存在的学生文件夹
+        for path in folder_paths:
+            student_folder = submission_index.find_student_folder(path, student_folder_name)
+            if student_folder:
+                break
+        
+        # 检查文件数量
+        if student_folder:
+            existing_files = student_folder['files']
+            if len(existing_files) >= settings.get('maxFileCount', 10):
+                logging.warning(f'文件数量超过限制: {len(existing_files)} >= {settings.get("maxFileCount", 10)}')
+                return f'已达到最大文件数量限制 ({settings.get("maxFileCount", 10)} 个文件)'
+    
+    return None
+
+def after_upload(user_id, student_id, class_name, course, assignment_name, file_size):
+    """文件保存后记录今日上传量，并提交延迟的提交通知任务"""
+    # 记录今日上传量
+    update_daily_upload_record(student_id, file_size)
+
+    # 使用新的文件结构路径
+    student_folder = os.path.join(UPLOAD_FOLDER, class_name, course, assignment_name, f"{student_id}_{user_id}")
+
+    # 延迟发送提交通知，同一学生同一作业在延迟期内的多次上传只发送一封邮件
+    job_queue.submit(
+        process_submission_notification, user_id, course, assignment_name, student_folder,
+        name='submission_notification',
+        delay=SUBMISSION_NOTIFICATION_DELAY,
+        key=('submission_notification', user_id, course, assignment_name)
+    )
+
+    # 推送上传完成和新的提交数
+    event_stream.publish('upload_complete', {
+        'course': course, 'assignment': assignment_name, 'size': file_size
+    }, user_id=user_id)
+    publish_submission_count(class_name, course, assignment_name, os.path.dirname(student_folder))
+
+def publish_submission_count(class_name, course, assignment_name, assignment_path):
+    """向班级的学生和管理员推送作业当前的提交数"""
+    event_stream.publish('submission_count', {
+        'class_name': class_name,
+        'course': course,
+        'assignment': assignment_name,
+        'total': submission_events.get_total(assignment_path)
+    }, class_name=class_name)
+
+# ===== 分片上传（可断点续传） =====
+# 分片上传的临时目录（与上传目录位于同一文件系统，合并后直接重命名）
+CHUNKED_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'temp', 'chunked')
+
+# 分片大小
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+
+# 未完成的分片上传保留时间（秒）
+CHUNKED_UPLOAD_EXPIRE = 24 * 3600
+
+def _chunked_upload_paths(upload_id):
+    """返回分片上传会话的目录、会话文件和数据文件路径"""
+    upload_dir = os.path.join(CHUNKED_UPLOAD_FOLDER, upload_id)
+    return upload_dir, os.path.join(upload_dir, 'session.json'), os.path.join(upload_dir, 'data.part')
+
+def _load_chunked_session(upload_id):
+    """加载当前用户的分片上传会话，不存在或不属于当前用户时返回None"""
+    if not upload_id.isalnum():
+        return None
+    _, session_file, _ = _chunked_upload_paths(upload_id)
+    try:
+        session = file_cache.load_json(session_file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if session.get('username') != current_user.id:
+        return None
+    return session
+
+def _remove_chunked_upload(upload_id):
+    """删除分片上传会话及其数据"""
+    upload_dir, session_file, _ = _chunked_upload_paths(upload_id)
+    shutil.rmtree(upload_dir, ignore_errors=True)
+    file_cache.invalidate(session_file)
+
+def _chunked_session_status(session):
+    """分片上传会话返回给客户端的信息"""
+    return {
+        'status': 'success',
+        'upload_id': session['upload_id'],
+        'chunk_size': session['chunk_size'],
+        'total_chunks': session['total_chunks'],
+        'received': sorted(session['received'])
+    }
+
+def cleanup_expired_chunked_uploads():
+    """删除超过保留时间仍未完成的分片上传"""
+    if not os.path.isdir(CHUNKED_UPLOAD_FOLDER):
+        return
+    expire_before = datetime.now().timestamp() - CHUNKED_UPLOAD_EXPIRE
+    with os.scandir(CHUNKED_UPLOAD_FOLDER) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.stat().st_mtime < expire_before:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                logging.info(f'已清理过期的分片上传: {entry.name}')
+
+@student_bp.route('/upload/init', methods=['POST'])
+@login_required
+@student_required
+def init_chunked_upload():
+    """
+    创建或恢复分片上传会话
+    
+    同一用户对同一作业再次上传相同的文件（文件名、大小、修改时间一致）时返回已有会话，
+    客户端只需补传缺少的分片。
+    """
+    try:
+        data = request.get_json() or {}
+        course = data.get('course')
+        assignment_name = data.get('assignment_name')
+        filename = data.get('filename', '')
+        file_size = data.get('size')
+        
+        if not course or not assignment_name:
+            return jsonify({'status': 'error', 'message': '请选择课程和作业名称'}), 400
+        if not filename or not isinstance(file_size, int) or file_size <= 0:
+            return jsonify({'status': 'error', 'message': '没有选择文件'}), 400
+        
+        users = load_users()
+        user_data = users.get(current_user.id, {})
+        class_name = user_data.get('class_name', '')
+        student_id = user_data.get('student_id', '')
+        if not class_name:
+            return jsonify({'status': 'error', 'message': '您的账号未分配班级，请联系管理员'}), 400
+        
+        # 在接收任何数据之前检查文件类型、大小、限额和文件数量
+        settings = get_upload_settings(course, assignment_name)
+        limits = get_upload_limits(settings, student_id)
+        error_message = check_upload_allowed(settings, limits, filename, file_size,
+                                             class_name, course, assignment_name, student_id, current_user.id)
+        if error_message:
+            return jsonify({'status': 'error', 'message': error_message}), 400
+        
+        # 会话ID由用户、作业和文件信息确定，重新选择同一文件即可续传
+        fingerprint = '\0'.join([current_user.id, course, assignment_name, filename,
+                                  str(file_size), str(data.get('last_modified', ''))])
+        upload_id = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+        
+        session = _load_chunked_session(upload_id)
+        if session:
+            logging.info(f'恢复分片上传: {upload_id}, 已接收 {len(session["received"])}/{session["total_chunks"]} 个分片')
+            return jsonify(_chunked_session_status(session))
+        
+        cleanup_expired_chunked_uploads()
+        
+        upload_dir, session_file, data_file = _chunked_upload_paths(upload_id)
+        os.makedirs(upload_dir, exist_ok=True)
+        
+        # 预先创建完整大小的数据文件，各分片直接写入对应位置
+        with open(data_file, 'wb') as f:
+            f.truncate(file_size)
+        
+        session = {
+            'upload_id': upload_id,
+            'username': current_user.id,
+            'course': course,
+            'assignment_name': assignment_name,
+            'filename': filename,
+            'size': file_size,
+            'chunk_size': UPLOAD_CHUNK_SIZE,
+            'total_chunks': (file_size + UPLOAD_CHUNK_SIZE - 1) // UPLOAD_CHUNK_SIZE,
+            'received': [],
+            'created_at': datetime.now().isoformat()
+        }
+        file_store.write_json(session_file, session)
+        logging.info(f'创建分片上传: {upload_id}, 文件: {filename}, 大小: {file_size}, 分片数: {session["total_chunks"]}')
+        
+        return jsonify(_chunked_session_status(session))
+    except Exception as e:
+        logging.error(f'创建分片上传失败: {str(e)}')
+        return jsonify({'status': 'error', 'message': f'创建分片上传失败: {str(e)}'}), 500
+
+@student_bp.route('/upload/<upload_id>', methods=['GET'])
+@login_required
+@student_required
+def get_chunked_upload(upload_id):
+    """查询分片上传会话的已接收分片"""
+    session = _load_chunked_session(upload_id)
+    if not session:
+        return jsonify({'status': 'error', 'message': '上传会话不存在或已过期'}), 404
+    return jsonify(_chunked_session_status(session))
+
+@student_bp.route('/upload/<upload_id>/chunk/<int:index>', methods=['PUT'])
+@login_required
+@student_required
+def put_upload_chunk(upload_id, index):
+    """
+    上传一个分片，请求体为分片的原始数据
+    
+    可选的 X-Chunk-MD5 请求头用于校验分片内容。重复上传同一分片是安全的。
+    """
+    session = _load_chunked_session(upload_id)
+    if not session:
+        return jsonify({'status': 'error', 'message': '上传会话不存在或已过期'}), 404
+    if index < 0 or index >= session['total_chunks']:
+        return jsonify({'status': 'error', 'message': '分片序号无效'}), 400
+    
+    offset = index * session['chunk_size']
+    expected_size = min(session['chunk_size'], session['size'] - offset)
+    
+    # 读取分片数据（最多多读一个字节用于检查长度）
+    chunk = request.stream.read(expected_size + 1)
+    if len(chunk) != expected_size:
+        return jsonify({'status': 'error', 'message': f'分片大小不正确: {len(chunk)} != {expected_size}'}), 400
+    
+    expected_md5 = request.headers.get('X-Chunk-MD5')
+    if expected_md5 and hashlib.md5(chunk).hexdigest() != expected_md5.lower():
+        return jsonify({'status': 'error', 'message': '分片校验失败'}), 400
+    
+    _, session_file, data_file = _chunked_upload_paths(upload_id)
+    try:
+        with open(data_file, 'r+b') as f:
+            f.seek(offset)
+            f.write(chunk)
+        
+        def mark_received(session):
+            if index not in session['received']:
+                session['received'].append(index)
+            return len(session['received'])
+        
+        received = file_store.update_json(session_file, mark_received)
+    except FileNotFoundError:
+        return jsonify({'status': 'error', 'message': '上传会话不存在或已过期'}), 404
+    
+    return jsonify({'status': 'success', 'index': index, 'received': received, 'total_chunks': session['total_chunks']})
+
+@student_bp.route('/upload/<upload_id>/finalize', methods=['POST'])
+@login_required
+@student_required
+def finalize_chunked_upload(upload_id):
+    """所有分片上传完成后合并文件，并按普通上传的流程保存到学生文件夹"""
+    _, session_file, data_file = _chunked_upload_paths(upload_id)
+    
+    try:
+        with file_store.file_lock(session_file):
+            session = _load_chunked_session(upload_id)
+            if not session:
+                return jsonify({'status': 'error', 'message': '上传会话不存在或已过期'}), 404
+            
+            missing = session['total_chunks'] - len(set(session['received']))
+            if missing:
+                return jsonify({'status': 'error', 'message': f'还有 {missing} 个分片未上传',
+                                **_chunked_session_status(session)}), 409
+            
+            users = load_users()
+            user_data = users.get(current_user.id, {})
+            class_name = user_data.get('class_name', '')
+            student_id = user_data.get('student_id', '')
+            course = session['course']
+            assignment_name = session['assignment_name']
+            
+            # 上传期间可能已经提交了其他文件，重新检查限额和文件数量
+            settings = get_upload_settings(course, assignment_name)
+            limits = get_upload_limits(settings, student_id)
+            error_message = check_upload_allowed(settings, limits, session['filename'], session['size'],
+                                                 class_name, course, assignment_name, student_id, current_user.id)
+            if error_message:
+                _remove_chunked_upload(upload_id)
+                return jsonify({'status': 'error', 'message': error_message}), 400
+            
+            hashing_file = upload_stream.HashingFile.from_path(data_file)
+            try:
+                file = FileStorage(stream=hashing_file, filename=session['filename'])
+                is_success, file_path = upload_file_new_structure(file, course, class_name, assignment_name, student_id, current_user.id)
+            finally:
+                # 合并后的数据此时已被移动到学生文件夹或被删除，会话不能再次合并，失败时需要重新上传
+                hashing_file.discard()
+                _remove_chunked_upload(upload_id)
+            
+            if not is_success:
+                logging.warning(f'文件上传失败: {file_path}')
+                return jsonify({'status': 'error', 'message': f'文件上传失败: {file_path}'}), 500
+        
+        after_upload(current_user.id, student_id, class_name, course, assignment_name, session['size'])
+        logging.info(f'分片上传完成: {upload_id} -> {file_path}')
+        
+        return jsonify({
+            'status': 'success', 
+            'message': '文件上传成功', 
+            'filename': os.path.basename(file_path)
+        }), 200
+    except Exception as e:
+        logging.error(f'合并分片上传失败: {str(e)}')
+        return jsonify({'status': 'error', 'message': f'文件上传失败: {str(e)}'}), 500
+
+@student_bp.route('/upload/<upload_id>', methods=['DELETE'])
+@login_required
+@student_required
+def cancel_chunked_upload(upload_id):
+    """取消分片上传并删除已接收的数据"""
+    if not _load_chunked_session(upload_id):
+        return jsonify({'status': 'error', 'message': '上传会话不存在或已过期'}), 404
+    _remove_chunked_upload(upload_id)
+    return jsonify({'status': 'success', 'message': '上传已取消'})
+
 # 添加用于跟踪每日上传量的函数
+# 每日上传量记录文件
+DAILY_UPLOADS_FILE = 'data/daily_uploads.json'
+
 def get_today_upload_size(student_id, date):
     """获取学生当天的上传总量"""
-    upload_record_file = 'data/daily_uploads.json'
     date_str = date.strftime('%Y-%m-%d')
     
     try:
         # 加载记录
-        if os.path.exists(upload_record_file):
-            with open(upload_record_file, 'r', encoding='utf-8') as f:
-                records = json.load(f)
-        else:
+        try:
+            records = file_cache.load_json(DAILY_UPLOADS_FILE)
+        except FileNotFoundError:
             records = {}
         
         # 获取学生记录
@@ -297,17 +601,9 @@ def get_today_upload_size(student_id, date):
 
 def update_daily_upload_record(student_id, file_size):
     """更新学生当天的上传记录"""
-    upload_record_file = 'data/daily_uploads.json'
     date_str = date.today().strftime('%Y-%m-%d')
     
-    try:
-        # 加载记录
-        if os.path.exists(upload_record_file):
-            with open(upload_record_file, 'r', encoding='utf-8') as f:
-                records = json.load(f)
-        else:
-            records = {}
-        
+    def add_upload(records):
         # 更新学生记录
         if student_id not in records:
             records[student_id] = {}
@@ -316,10 +612,10 @@ def update_daily_upload_record(student_id, file_size):
             records[student_id][date_str] = 0
         
         records[student_id][date_str] += file_size
-        
-        # 保存记录
-        with open(upload_record_file, 'w', encoding='utf-8') as f:
-            json.dump(records, f)
+    
+    try:
+        # 加锁的读-改-写，并发上传时不会丢失累加
+        file_store.update_json(DAILY_UPLOADS_FILE, add_upload, ensure_ascii=True, indent=None)
     except Exception as e:
         logging.error(f'Error updating upload record: {str(e)}')
 
@@ -346,20 +642,10 @@ def get_my_submissions():
     logging.info(f"正在查找用户 {current_user.id} (学号: {student_id}, 班级: {class_name}) 的提交记录")
     logging.info(f"上传目录路径: {UPLOAD_FOLDER}")
     
-    # 定义所有可能的路径结构模式
-    path_patterns = [
-        # 模式1: 新结构 - /upload/班级/课程/作业/
-        lambda course, class_name: 
-            os.path.join(UPLOAD_FOLDER, class_name, course),
-        
-        # 模式2: 旧结构 - /upload/课程/班级/作业/
-        lambda course, class_name: 
-            os.path.join(UPLOAD_FOLDER, course, class_name),
-        
-        # 模式3: 最旧结构 - /upload/课程/作业/
-        lambda course, class_name: 
-            os.path.join(UPLOAD_FOLDER, course)
-    ]
+    # 从提交索引中获取所有作业目录，按上级目录分组
+    assignment_dirs = {}
+    for parts in submission_index.get_assignment_dirs():
+        assignment_dirs.setdefault(parts[:-1], []).append(parts[-1])
     
     # 遍历所有可能的课程（从课程配置或上传目录中获取）
     courses_to_check = []
@@ -368,82 +654,63 @@ def get_my_submissions():
     if course_filter:
         courses_to_check.append(course_filter)
     else:
-        # 从上传目录中查找所有可能的课程
-        try:
-            # 首先检查新结构 - /upload/班级/*/
-            class_dir = os.path.join(UPLOAD_FOLDER, class_name)
-            if os.path.exists(class_dir) and os.path.isdir(class_dir):
-                for item in os.listdir(class_dir):
-                    if os.path.isdir(os.path.join(class_dir, item)):
-                        courses_to_check.append(item)
-            
-            # 然后检查旧结构和直接课程目录
-            for item in os.listdir(UPLOAD_FOLDER):
-                if os.path.isdir(os.path.join(UPLOAD_FOLDER, item)) and item != class_name:
-                    courses_to_check.append(item)
-        except Exception as e:
-            logging.error(f"查找课程目录时出错: {e}")
+        # 从索引中查找所有可能的课程
+        for parts in assignment_dirs:
+            # 新结构 - /upload/班级/*/
+            if parts[0] == class_name and len(parts) > 1:
+                courses_to_check.append(parts[1])
+            # 旧结构和直接课程目录
+            elif parts[0] != class_name:
+                courses_to_check.append(parts[0])
     
     # 确保课程列表无重复
     courses_to_check = list(set(courses_to_check))
     logging.info(f"将检查以下课程: {courses_to_check}")
     
+    student_folder_pattern = f"{student_id}_{current_user.id}"
+    
     # 遍历所有课程
     for course in courses_to_check:
         # 检查所有可能的路径模式
-        for get_path in path_patterns:
-            course_path = get_path(course, class_name)
-            logging.debug(f"检查路径: {course_path}")
-            
-            if not os.path.exists(course_path) or not os.path.isdir(course_path):
-                continue
-            
-            # 模式1和2: 路径已经包含课程层级，直接查找作业
-            for assignment_name in os.listdir(course_path):
-                assignment_path = os.path.join(course_path, assignment_name)
-                if not os.path.isdir(assignment_path):
-                    continue
+        path_patterns = [
+            (class_name, course),  # 模式1: 新结构 - /upload/班级/课程/作业/
+            (course, class_name),  # 模式2: 旧结构 - /upload/课程/班级/作业/
+            (course,)              # 模式3: 最旧结构 - /upload/课程/作业/
+        ]
+        for course_parts in path_patterns:
+            for assignment_name in assignment_dirs.get(course_parts, []):
+                assignment_path = os.path.join(UPLOAD_FOLDER, *course_parts, assignment_name)
                 
                 # 查找与当前用户匹配的文件夹
-                student_folder_pattern = f"{student_id}_{current_user.id}"
-                student_folders = [f for f in os.listdir(assignment_path) 
-                                if os.path.isdir(os.path.join(assignment_path, f)) 
-                                and f.startswith(student_folder_pattern)]
+                student_folder = submission_index.find_student_folder(assignment_path, student_folder_pattern)
                 
-                if student_folders:
-                    student_folder = student_folders[0]
-                    student_folder_path = os.path.join(assignment_path, student_folder)
-                    
-                    logging.info(f"找到提交: 课程={course}, 作业={assignment_name}, 路径={student_folder_path}")
+                if student_folder:
+                    logging.info(f"找到提交: 课程={course}, 作业={assignment_name}, 路径={os.path.join(assignment_path, student_folder['folder'])}")
                     
                     # 获取该文件夹中的文件
                     files = []
                     latest_time = None
                     
-                    for file in os.listdir(student_folder_path):
-                        file_path = os.path.join(student_folder_path, file)
-                        if os.path.isfile(file_path):
-                            file_size = os.path.getsize(file_path)
-                            file_time = os.path.getmtime(file_path)
-                            file_datetime = datetime.fromtimestamp(file_time)
-                            
-                            if latest_time is None or file_time > latest_time:
-                                latest_time = file_time
-                            
-                            files.append({
-                                'name': file,
-                                'size': format_file_size(file_size),
-                                'uploadTime': file_datetime.isoformat(),
-                                'path': f"/download/{course}/{assignment_name}/{file}"
-                            })
+                    for file_info in student_folder['files']:
+                        file = file_info['name']
+                        file_time = file_info['mtime']
+                        file_datetime = datetime.fromtimestamp(file_time)
+                        
+                        if latest_time is None or file_time > latest_time:
+                            latest_time = file_time
+                        
+                        files.append({
+                            'name': file,
+                            'size': format_file_size(file_info['size']),
+                            'uploadTime': file_datetime.isoformat(),
+                            'path': f"/download/{course}/{assignment_name}/{file}"
+                        })
                     
                     if not files:
                         continue
                     
                     # 获取作业详情
-                    from util.utils import load_assignments
-                    assignments = load_assignments()
-                    assignment_obj = next((a for a in assignments if a['course'] == course and a['name'] == assignment_name), None)
+                    assignment_obj = find_assignment(course, assignment_name)
                     
                     due_date = None
                     if assignment_obj:
@@ -495,9 +762,7 @@ def get_assignment_stats():
         class_name = "默认班级"
     
     # 获取作业详情
-    from util.utils import load_assignments
-    assignments = load_assignments()
-    assignment_obj = next((a for a in assignments if a['course'] == course and a['name'] == assignment_name), None)
+    assignment_obj = find_assignment(course, assignment_name)
     
     if not assignment_obj:
         return jsonify({'status': 'error', 'message': '作业不存在'}), 404
@@ -526,13 +791,9 @@ def get_assignment_stats():
     for assignment_path in possible_paths:
         logging.debug(f"检查路径: {assignment_path}")
         
-        if not os.path.exists(assignment_path):
-            continue
-            
-        # 获取学生文件夹
-        student_folders = [f for f in os.listdir(assignment_path) 
-                         if os.path.isdir(os.path.join(assignment_path, f)) 
-                         and not f.endswith('.zip')]
+        # 从提交索引获取学生文件夹
+        student_folders = [f['folder'] for f in submission_index.get_student_folders(assignment_path)
+                         if not f['folder'].endswith('.zip')]
         
         submission_count += len(student_folders)
         
@@ -584,27 +845,29 @@ def delete_submission(course, assignment):
     student_folder_pattern = f"{student_id}_{current_user.id}"
     
     for assignment_path in possible_paths:
-        if not os.path.exists(assignment_path):
-            continue
-            
-        student_folders = [f for f in os.listdir(assignment_path) 
-                         if os.path.isdir(os.path.join(assignment_path, f)) 
-                         and f.startswith(student_folder_pattern)]
+        folder_info = submission_index.find_student_folder(assignment_path, student_folder_pattern)
         
-        if student_folders:
-            student_folder = student_folders[0]
+        if folder_info:
+            student_folder = folder_info['folder']
             student_folder_path = os.path.join(assignment_path, student_folder)
             
             try:
                 # 删除文件夹
                 import shutil
-                shutil.rmtree(student_folder_path)
+                if os.path.exists(student_folder_path):
+                    shutil.rmtree(student_folder_path)
+                submission_index.remove_path(student_folder_path)
+                dashboard.record_removal(student_folder_path)
+                submission_events.record_removal(student_folder_path)
+                archive_cache.invalidate(student_folder_path)
                 
                 # 删除zip文件（如果存在）
                 zip_file = os.path.join(assignment_path, f"{student_folder}.zip")
                 if os.path.exists(zip_file):
                     os.remove(zip_file)
                 
+                publish_submission_count(class_name, course, assignment, assignment_path)
+                
                 return jsonify({'status': 'success', 'message': '提交已删除'})
             except Exception as e:
                 logging.error(f'Error deleting submission: {str(e)}')
@@ -704,24 +967,22 @@ def download_file(course, assignment, filename):
     assignment_path = os.path.join(UPLOAD_FOLDER, class_name, course, assignment)
     
     # 如果新结构路径不存在，尝试使用旧结构
-    if not os.path.exists(assignment_path):
+    if not submission_index.assignment_path_exists(assignment_path):
         # 旧结构: /upload/课程/班级/作业/
         assignment_path = os.path.join(UPLOAD_FOLDER, course, class_name, assignment)
         
         # 如果旧结构也不存在，再尝试最旧的结构
-        if not os.path.exists(assignment_path):
+        if not submission_index.assignment_path_exists(assignment_path):
             # 最旧结构: /upload/课程/作业/
             assignment_path = os.path.join(UPLOAD_FOLDER, course, assignment)
     
     # 查找该用户的文件夹
-    student_folders = [f for f in os.listdir(assignment_path) 
-                     if os.path.isdir(os.path.join(assignment_path, f)) 
-                     and f.startswith(student_folder_pattern)]
+    folder_info = submission_index.find_student_folder(assignment_path, student_folder_pattern)
     
-    if not student_folders:
+    if not folder_info:
         return "文件不存在", 404
     
-    student_folder = student_folders[0]
+    student_folder = folder_info['folder']
     file_path = os.path.join(assignment_path, student_folder, filename)
     
     if not os.path.exists(file_path):
@@ -755,37 +1016,22 @@ def download_all_files(course, assignment):
     student_folder_pattern = f"{student_id}_{current_user.id}"
     
     for assignment_path in possible_paths:
-        if not os.path.exists(assignment_path):
-            continue
-            
-        student_folders = [f for f in os.listdir(assignment_path) 
-                         if os.path.isdir(os.path.join(assignment_path, f)) 
-                         and f.startswith(student_folder_pattern)]
+        folder_info = submission_index.find_student_folder(assignment_path, student_folder_pattern)
         
-        if student_folders:
-            student_folder = student_folders[0]
+        if folder_info:
+            student_folder = folder_info['folder']
             student_folder_path = os.path.join(assignment_path, student_folder)
             
-            # 创建临时目录用于准备下载
-            temp_dir = os.path.join(UPLOAD_FOLDER, 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
-            
             # 创建zip文件名
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
             zip_filename = f"{course}_{assignment}_{student_id}_{timestamp}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
             
-            # 创建zip文件
+            # 获取缓存的压缩包（文件夹内容未变化时直接复用）
             try:
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, _, files in os.walk(student_folder_path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            arcname = os.path.relpath(file_path, student_folder_path)
-                            zipf.write(file_path, arcname=arcname)
+                zip_path = archive_cache.get_student_archive(student_folder_path)
                 
                 # 提供zip文件下载
-                return send_from_directory(temp_dir, zip_filename, as_attachment=True)
+                return send_file(zip_path, as_attachment=True, download_name=zip_filename)
             except Exception as e:
                 logging.error(f'Error creating zip file: {str(e)}')
                 return f"创建压缩文件失败: {str(e)}", 500
@@ -835,22 +1081,14 @@ def upload_file_new_structure(file, course, class_name, assignment_name, student
             file_path = os.path.join(student_folder, new_filename)
             counter += 1
         
-        # 保存文件
-        file.save(file_path)
+        # 保存文件（流式上传时直接移动已写好的临时文件）
+        digests = upload_stream.save_upload(file, file_path)
+        submission_index.record_upload(file_path, digests)
+        dashboard.record_upload(student_folder)
+        submission_events.record_upload(file_path)
         logging.info(f"文件已上传到新结构路径: {file_path}")
         
-        # 创建ZIP文件
-        zip_filename = f"{student_folder_name}.zip"
-        zip_filepath = os.path.join(assignment_folder, zip_filename)
-        
-        # 启动线程压缩文件夹
-        t = threading.Thread(
-            target=compress_folder,
-            args=(student_folder, zip_filepath)
-        )
-        t.daemon = True
-        t.start()
-        
+        # 压缩包在下载时按需生成（见 archive_cache），上传时不再重新压缩整个文件夹
         return True, file_path
     except Exception as e:
         logging.error(f"文件上传错误: {str(e)}")
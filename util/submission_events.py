@@ -0,0 +1,247 @@
+"""
+作业传输系统 - 提交事件与每日统计模块
+
+提交统计图表不再遍历学生文件夹、以文件夹修改时间（删除文件或重命名时会变化）
+作为提交时间，而是读取本模块维护的数据：
+- 事件日志: 只追加的上传/删除事件记录（时间、作业目录、学生文件夹、文件名）
+- 当前提交: 每个学生文件夹的首次提交时间
+- 每日计数: 按作业目录和日期预先汇总的提交数，学生首次上传时加一，
+  提交被删除时从其首次提交的日期减一
+
+统计接口只需按日期读取计数，耗时与统计的天数成正比，与提交数量无关。
+作业目录使用相对于上传目录的路径（如 班级/课程/作业），与提交索引一致。
+首次使用时从提交索引导入已有的提交（以文件夹中最早的文件时间作为提交时间）。
+
+数据库路径由 SUBMISSION_EVENTS_DATABASE 指定，默认为 data/submission_events.db。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import time
+import logging
+from datetime import datetime
+
+from util import submission_index, sqlite_db
+from util.config import UPLOAD_FOLDER
+
+try:
+    from util.config import SUBMISSION_EVENTS_DATABASE
+except ImportError:
+    SUBMISSION_EVENTS_DATABASE = 'data/submission_events.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    assignment_key TEXT NOT NULL,
+    folder TEXT,
+    filename TEXT
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    assignment_key TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (assignment_key, folder)
+);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    assignment_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (assignment_key, day)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _connect():
+    """获取当前线程的数据库连接，首次使用时从提交索引导入已有的提交"""
+    return sqlite_db.connect(SUBMISSION_EVENTS_DATABASE, SCHEMA, _import_existing)
+
+
+def _day(ts):
+    """时间戳对应的本地日期"""
+    return datetime.fromtimestamp(ts).strftime('%Y-%m-%d')
+
+
+def _relative_key(path):
+    """目录相对于上传目录的路径（以 / 分隔），不在上传目录下时返回None"""
+    rel = os.path.relpath(os.path.normpath(path), os.path.normpath(UPLOAD_FOLDER))
+    if rel == '.' or rel.startswith('..'):
+        return None
+    return rel.replace(os.sep, '/')
+
+
+def _add_submission(conn, assignment_key, folder, ts):
+    """记录新的提交并增加当天计数，提交已存在时不做任何修改"""
+    day = _day(ts)
+    cursor = conn.execute(
+        'INSERT OR IGNORE INTO submissions (assignment_key, folder, submitted_at, day) VALUES (?, ?, ?, ?)',
+        (assignment_key, folder, ts, day)
+    )
+    if cursor.rowcount:
+        conn.execute(
+            """INSERT INTO daily_counts (assignment_key, day, count) VALUES (?, ?, 1)
+               ON CONFLICT (assignment_key, day) DO UPDATE SET count = count + 1""",
+            (assignment_key, day)
+        )
+
+
+def _import_existing(conn):
+    """首次使用时从提交索引导入已有的提交"""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+        return
+
+    dirs = {'/'.join(parts) for parts in submission_index.get_assignment_dirs()}
+    imported = 0
+    with sqlite_db.transaction(conn) as tx:
+        # 其他进程可能已经完成导入
+        if tx.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone():
+            return
+        for assignment_key in dirs:
+            path = os.path.join(UPLOAD_FOLDER, *assignment_key.split('/'))
+            for folder in submission_index.get_student_folders(path):
+                name = folder['folder']
+                # 跳过压缩包和作为上层目录记录的作业目录（如 班级/课程 下的作业文件夹）
+                if name.endswith('.zip') or f"{assignment_key}/{name}" in dirs:
+                    continue
+                times = [f['mtime'] for f in folder['files']] or [folder['mtime']]
+                _add_submission(tx, assignment_key, name, min(times))
+                imported += 1
+        tx.execute("INSERT INTO meta (key, value) VALUES ('imported', ?)", (str(time.time()),))
+    logging.info(f"已从提交索引导入 {imported} 份提交到提交统计")
+
+
+def record_upload(file_path, ts=None):
+    """
+    记录文件上传事件，学生首次上传该作业时计入当天的提交数
+
+    Args:
+        file_path (str): 已保存的文件路径（位于 作业目录/学生文件夹/ 下）
+        ts (float, optional): 上传时间，默认为当前时间
+    """
+    student_folder = os.path.dirname(file_path)
+    assignment_key = _relative_key(os.path.dirname(student_folder))
+    if not assignment_key:
+        return
+    ts = ts or time.time()
+    folder = os.path.basename(student_folder)
+
+    try:
+        with sqlite_db.transaction(_connect()) as conn:
+            conn.execute(
+                "INSERT INTO events (ts, kind, assignment_key, folder, filename) VALUES (?, 'upload', ?, ?, ?)",
+                (ts, assignment_key, folder, os.path.basename(file_path))
+            )
+            _add_submission(conn, assignment_key, folder, ts)
+    except Exception as e:
+        logging.error(f"记录提交事件失败: {file_path}, 错误: {e}")
+
+
+def record_removal(path, ts=None):
+    """
+    记录删除事件，从提交首次上传的日期中减去被删除的提交
+
+    Args:
+        path (str): 已删除的学生文件夹，或作业、班级、课程等上层目录
+        ts (float, optional): 删除时间，默认为当前时间
+    """
+    prefix = _relative_key(path)
+    if not prefix:
+        return
+    ts = ts or time.time()
+    parent, _, name = prefix.rpartition('/')
+
+    try:
+        with sqlite_db.transaction(_connect()) as conn:
+            # 被删除的是学生文件夹，或作业及更上层的目录
+            removed = conn.execute(
+                """SELECT assignment_key, folder, day FROM submissions
+                   WHERE (assignment_key = ? AND folder = ?)
+                      OR assignment_key = ? OR (assignment_key >= ? AND assignment_key < ?)""",
+                (parent, name, prefix, *sqlite_db.subpath_range(prefix))
+            ).fetchall()
+
+            for assignment_key, folder, day in removed:
+                conn.execute('DELETE FROM submissions WHERE assignment_key = ? AND folder = ?',
+                             (assignment_key, folder))
+                conn.execute('UPDATE daily_counts SET count = count - 1 WHERE assignment_key = ? AND day = ?',
+                             (assignment_key, day))
+                conn.execute('DELETE FROM daily_counts WHERE assignment_key = ? AND day = ? AND count <= 0',
+                             (assignment_key, day))
+                conn.execute(
+                    "INSERT INTO events (ts, kind, assignment_key, folder) VALUES (?, 'delete', ?, ?)",
+                    (ts, assignment_key, folder)
+                )
+    except Exception as e:
+        logging.error(f"记录删除事件失败: {path}, 错误: {e}")
+
+
+def get_daily_counts(assignment_path, start_day, end_day):
+    """
+    获取作业在日期范围内每天的提交数
+
+    Args:
+        assignment_path (str): 作业目录路径
+        start_day (str): 开始日期（YYYY-MM-DD，包含）
+        end_day (str): 结束日期（YYYY-MM-DD，包含）
+
+    Returns:
+        dict: {日期: 提交数}，没有提交的日期不包含在内
+    """
+    assignment_key = _relative_key(assignment_path)
+    if not assignment_key:
+        return {}
+    rows = _connect().execute(
+        'SELECT day, count FROM daily_counts WHERE assignment_key = ? AND day BETWEEN ? AND ?',
+        (assignment_key, start_day, end_day)
+    ).fetchall()
+    return dict(rows)
+
+
+def get_total(assignment_path):
+    """
+    获取作业当前的提交总数
+
+    Args:
+        assignment_path (str): 作业目录路径
+
+    Returns:
+        int: 提交总数
+    """
+    assignment_key = _relative_key(assignment_path)
+    if not assignment_key:
+        return 0
+    row = _connect().execute(
+        'SELECT COALESCE(SUM(count), 0) FROM daily_counts WHERE assignment_key = ?', (assignment_key,)
+    ).fetchone()
+    return row[0]
+
+
+def recent_events(limit=50):
+    """
+    获取最近的提交事件（最新的在前）
+
+    Args:
+        limit (int): 最多返回的事件数
+
+    Returns:
+        list: 事件列表
+    """
+    rows = _connect().execute(
+        'SELECT ts, kind, assignment_key, folder, filename FROM events ORDER BY id DESC LIMIT ?', (limit,)
+    ).fetchall()
+    return [{
+        'time': datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'),
+        'kind': kind,
+        'assignment': assignment_key,
+        'folder': folder,
+        'filename': filename
+    } for ts, kind, assignment_key, folder, filename in rows]
@@ -0,0 +1,509 @@
+"""
+作业传输系统 - 提交索引模块
+
+本模块维护上传目录的持久化索引，避免每次查询提交记录时都遍历上传目录。
+索引记录以下信息：
+- 作业目录（兼容三种目录结构：班级/课程/作业、课程/班级/作业、课程/作业）
+- 作业目录下的学生文件夹及其修改时间
+- 学生文件夹中的文件名、文件大小和修改时间，以及上传时计算的 MD5/SHA-256
+
+索引保存在 SQLite 数据库中，每个作业目录、学生文件夹和文件各占一行。
+上传、删除等操作只在 BEGIN IMMEDIATE 事务中更新变化的行，多个进程同时修改时不会丢失更新；
+查询接口直接读取数据库，其他进程的修改立即可见。
+
+首次使用时导入旧的 data/submission_index.json（保留上传时记录的校验和），
+没有旧索引时通过一次目录扫描建立。
+数据库路径由 SUBMISSION_INDEX_DATABASE 指定，默认为 data/submission_index.db。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import json
+import logging
+
+from util import sqlite_db
+from util.config import UPLOAD_FOLDER
+
+try:
+    from util.config import SUBMISSION_INDEX_DATABASE
+except ImportError:
+    SUBMISSION_INDEX_DATABASE = 'data/submission_index.db'
+
+# 旧的 JSON 索引文件（首次使用时导入）
+LEGACY_INDEX_FILE = 'data/submission_index.json'
+
+# 索引格式版本，结构变化时递增以触发重建
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    dir_key TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS folders (
+    dir_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (dir_key, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    dir_key TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    md5 TEXT,
+    sha256 TEXT,
+    PRIMARY KEY (dir_key, folder, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _connect():
+    """获取当前线程的数据库连接，首次使用时建立索引"""
+    return sqlite_db.connect(SUBMISSION_INDEX_DATABASE, SCHEMA, _init_index)
+
+
+def _relative_parts(path):
+    """
+    将上传目录下的路径转换为相对路径片段
+
+    Args:
+        path (str): 位于上传目录下的路径
+
+    Returns:
+        tuple: 相对路径片段，路径不在上传目录下时返回None
+    """
+    rel = os.path.relpath(os.path.normpath(path), os.path.normpath(UPLOAD_FOLDER))
+    if rel == '.' or rel.startswith('..'):
+        return None
+    return tuple(rel.replace(os.sep, '/').split('/'))
+
+
+def _scan_folder(folder_path):
+    """扫描学生文件夹，返回其修改时间和文件信息"""
+    files = {}
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    return {'mtime': os.path.getmtime(folder_path), 'files': files}
+
+
+def _scan_container(container_path):
+    """扫描作业目录，返回其下所有子文件夹的信息"""
+    folders = {}
+    with os.scandir(container_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                try:
+                    folders[entry.name] = _scan_folder(entry.path)
+                except OSError as e:
+                    logging.warning(f"扫描提交文件夹失败: {entry.path}, 错误: {e}")
+    return folders
+
+
+def _subdirs(path):
+    """列出目录下的子目录路径"""
+    with os.scandir(path) as entries:
+        return [entry.path for entry in entries if entry.is_dir()]
+
+
+def _scan_upload_folder():
+    """
+    扫描上传目录
+
+    作业目录位于上传目录下的第2层（最旧结构: 课程/作业）或第3层
+    （新结构: 班级/课程/作业，旧结构: 课程/班级/作业），
+    因此对这两层的所有目录都记录其子文件夹。
+
+    Returns:
+        dict: {作业目录: {文件夹名: {'mtime': 修改时间, 'files': {文件名: 文件信息}}}}
+    """
+    assignments = {}
+    if os.path.isdir(UPLOAD_FOLDER):
+        for level1 in _subdirs(UPLOAD_FOLDER):
+            # 跳过下载压缩包和上传临时文件所在的目录
+            if os.path.basename(level1) == 'temp':
+                continue
+            for level2 in _subdirs(level1):
+                assignments['/'.join(_relative_parts(level2))] = _scan_container(level2)
+                for level3 in _subdirs(level2):
+                    assignments['/'.join(_relative_parts(level3))] = _scan_container(level3)
+    return assignments
+
+
+def _load_legacy_index():
+    """读取旧的 JSON 索引文件，文件不存在或格式不匹配时返回None"""
+    try:
+        with open(LEGACY_INDEX_FILE, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.error(f"加载旧的提交索引失败: {e}")
+        return None
+
+    if (index.get('version') != INDEX_VERSION or
+            index.get('upload_folder') != os.path.normpath(UPLOAD_FOLDER)):
+        return None
+    return index.get('assignments', {})
+
+
+def _is_current(conn):
+    """数据库中的索引是否与当前的索引格式和上传目录一致"""
+    meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('version', 'upload_folder')").fetchall())
+    return (meta.get('version') == str(INDEX_VERSION) and
+            meta.get('upload_folder') == os.path.normpath(UPLOAD_FOLDER))
+
+
+def _bump_generation(conn):
+    """增加索引的变更计数（在修改索引的事务中调用）"""
+    conn.execute(
+        """INSERT INTO meta (key, value) VALUES ('generation', 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1"""
+    )
+
+
+def _replace_all(conn, assignments, keep_digests=True):
+    """
+    在事务中用新的目录信息替换整个索引
+
+    Args:
+        conn (sqlite3.Connection): 已开启事务的连接
+        assignments (dict): _scan_upload_folder() 返回的目录信息
+        keep_digests (bool): 文件大小和修改时间未变化时是否保留原来记录的校验和
+    """
+    digests = {}
+    if keep_digests:
+        for dir_key, folder, name, size, mtime, md5, sha256 in conn.execute(
+                'SELECT dir_key, folder, name, size, mtime, md5, sha256 FROM files WHERE md5 IS NOT NULL'):
+            digests[(dir_key, folder, name)] = (size, mtime, md5, sha256)
+
+    folder_rows = []
+    file_rows = []
+    for dir_key, folders in assignments.items():
+        for folder_name, entry in folders.items():
+            folder_rows.append((dir_key, folder_name, entry['mtime']))
+            for name, info in entry['files'].items():
+                md5, sha256 = info.get('md5'), info.get('sha256')
+                old = digests.get((dir_key, folder_name, name))
+                if not md5 and old and old[:2] == (info['size'], info['mtime']):
+                    md5, sha256 = old[2], old[3]
+                file_rows.append((dir_key, folder_name, name, info['size'], info['mtime'], md5, sha256))
+
+    conn.execute('DELETE FROM files')
+    conn.execute('DELETE FROM folders')
+    conn.execute('DELETE FROM dirs')
+    conn.executemany('INSERT INTO dirs (dir_key) VALUES (?)', [(key,) for key in assignments])
+    conn.executemany('INSERT INTO folders (dir_key, name, mtime) VALUES (?, ?, ?)', folder_rows)
+    conn.executemany(
+        'INSERT INTO files (dir_key, folder, name, size, mtime, md5, sha256) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        file_rows
+    )
+    conn.executemany(
+        'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+        [('version', str(INDEX_VERSION)), ('upload_folder', os.path.normpath(UPLOAD_FOLDER))]
+    )
+    _bump_generation(conn)
+
+
+def _init_index(conn):
+    """首次使用，或索引格式、上传目录变化时建立索引"""
+    if _is_current(conn):
+        return
+
+    assignments = _load_legacy_index()
+    source = LEGACY_INDEX_FILE
+    if assignments is None:
+        assignments = _scan_upload_folder()
+        source = UPLOAD_FOLDER
+
+    with sqlite_db.transaction(conn) as tx:
+        # 其他进程可能已经建立了索引
+        if _is_current(tx):
+            return
+        _replace_all(tx, assignments, keep_digests=False)
+    logging.info(f"已从 {source} 建立提交索引，共 {len(assignments)} 个目录")
+
+
+def rebuild_index():
+    """
+    重新扫描上传目录并重建提交索引（上传目录被外部修改后使用）
+
+    文件大小和修改时间未变化的文件保留上传时记录的校验和。
+
+    Returns:
+        int: 索引中的目录数
+    """
+    assignments = _scan_upload_folder()
+    with sqlite_db.transaction(_connect()) as conn:
+        _replace_all(conn, assignments)
+
+    logging.info(f"提交索引已重建，共 {len(assignments)} 个目录")
+    return len(assignments)
+
+
+def get_generation():
+    """
+    获取索引的变更计数（包括其他进程的修改）
+
+    Returns:
+        int: 变更计数，与上次获取的值不同说明索引发生过变化
+    """
+    row = _connect().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def assignment_paths(class_name, course, assignment):
+    """
+    作业可能所在的目录
+
+    Args:
+        class_name (str): 班级名称
+        course (str): 课程名称
+        assignment (str): 作业名称
+
+    Returns:
+        list: 新结构、旧结构、最旧结构下的作业目录路径
+    """
+    return [
+        os.path.join(UPLOAD_FOLDER, class_name, course, assignment),  # 新结构: /班级/课程/作业/
+        os.path.join(UPLOAD_FOLDER, course, class_name, assignment),  # 旧结构: /课程/班级/作业/
+        os.path.join(UPLOAD_FOLDER, course, assignment)               # 最旧结构: /课程/作业/
+    ]
+
+
+def assignment_path_exists(assignment_path):
+    """
+    检查作业目录是否存在于索引中
+
+    Args:
+        assignment_path (str): 作业目录路径
+
+    Returns:
+        bool: 是否存在
+    """
+    parts = _relative_parts(assignment_path)
+    if not parts:
+        return False
+    row = _connect().execute('SELECT 1 FROM dirs WHERE dir_key = ?', ('/'.join(parts),)).fetchone()
+    return row is not None
+
+
+def _collect_folders(rows):
+    """将文件夹和文件的查询结果合并为返回给调用方的字典列表"""
+    folders = []
+    for folder_name, folder_mtime, name, size, mtime in rows:
+        if not folders or folders[-1]['folder'] != folder_name:
+            folders.append({'folder': folder_name, 'mtime': folder_mtime, 'files': []})
+        if name is not None:
+            folders[-1]['files'].append({'name': name, 'size': size, 'mtime': mtime})
+    return folders
+
+
+def get_student_folders(assignment_path):
+    """
+    获取作业目录下所有学生文件夹的信息
+
+    Args:
+        assignment_path (str): 作业目录路径
+
+    Returns:
+        list: 学生文件夹信息列表，每项包含 folder、mtime 和 files
+    """
+    parts = _relative_parts(assignment_path)
+    if not parts:
+        return []
+
+    rows = _connect().execute(
+        """SELECT fo.name, fo.mtime, fi.name, fi.size, fi.mtime FROM folders fo
+           LEFT JOIN files fi ON fi.dir_key = fo.dir_key AND fi.folder = fo.name
+           WHERE fo.dir_key = ? ORDER BY fo.name, fi.name""",
+        ('/'.join(parts),)
+    ).fetchall()
+    return _collect_folders(rows)
+
+
+def get_folder_names(assignment_path):
+    """
+    获取作业目录下所有学生文件夹的名称（不包含文件信息）
+
+    Args:
+        assignment_path (str): 作业目录路径
+
+    Returns:
+        list: 排序后的文件夹名称列表
+    """
+    parts = _relative_parts(assignment_path)
+    if not parts:
+        return []
+
+    rows = _connect().execute(
+        'SELECT name FROM folders WHERE dir_key = ? ORDER BY name', ('/'.join(parts),)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def find_student_folder(assignment_path, folder_prefix):
+    """
+    在作业目录中查找以指定前缀开头的学生文件夹
+
+    Args:
+        assignment_path (str): 作业目录路径
+        folder_prefix (str): 文件夹名前缀，通常为 "学号_用户名"
+
+    Returns:
+        dict: 学生文件夹信息，未找到时返回None
+    """
+    parts = _relative_parts(assignment_path)
+    if not parts:
+        return None
+
+    # 以前缀开头的名称按排序紧跟在前缀之后，第一个名称不以前缀开头时说明不存在
+    rows = _connect().execute(
+        """SELECT fo.name, fo.mtime, fi.name, fi.size, fi.mtime FROM folders fo
+           LEFT JOIN files fi ON fi.dir_key = fo.dir_key AND fi.folder = fo.name
+           WHERE fo.dir_key = ?1 AND fo.name = (
+               SELECT name FROM folders WHERE dir_key = ?1 AND name >= ?2 ORDER BY name LIMIT 1)
+           ORDER BY fi.name""",
+        ('/'.join(parts), folder_prefix)
+    ).fetchall()
+    folders = _collect_folders(rows)
+    if folders and folders[0]['folder'].startswith(folder_prefix):
+        return folders[0]
+    return None
+
+
+def get_assignment_dirs():
+    """
+    获取索引中的所有作业目录
+
+    Returns:
+        list: 相对于上传目录的路径片段元组列表
+    """
+    rows = _connect().execute('SELECT dir_key FROM dirs').fetchall()
+    return [tuple(row[0].split('/')) for row in rows]
+
+
+def record_upload(file_path, digests=None):
+    """
+    上传文件后增量更新索引
+
+    Args:
+        file_path (str): 已保存的文件路径（位于 作业目录/学生文件夹/ 下）
+        digests (dict, optional): 上传时计算的 md5/sha256，一并记录到索引中
+    """
+    student_folder = os.path.dirname(file_path)
+    parts = _relative_parts(student_folder)
+    if not parts or len(parts) < 3:
+        logging.warning(f"文件不在有效的作业目录中，未更新索引: {file_path}")
+        return
+
+    try:
+        stat = os.stat(file_path)
+        folder_mtime = os.path.getmtime(student_folder)
+    except OSError as e:
+        logging.error(f"更新提交索引失败: {file_path}, 错误: {e}")
+        return
+
+    dir_key = '/'.join(parts[:-1])
+    digests = digests or {}
+    try:
+        with sqlite_db.transaction(_connect()) as conn:
+            # 确保上层目录也记录了该作业目录（与重建索引时的层级保持一致）
+            if len(parts) == 4:
+                conn.execute('INSERT OR IGNORE INTO dirs (dir_key) VALUES (?)', ('/'.join(parts[:2]),))
+                conn.execute('INSERT OR IGNORE INTO folders (dir_key, name, mtime) VALUES (?, ?, ?)',
+                             ('/'.join(parts[:2]), parts[2], folder_mtime))
+
+            conn.execute('INSERT OR IGNORE INTO dirs (dir_key) VALUES (?)', (dir_key,))
+            conn.execute(
+                """INSERT INTO folders (dir_key, name, mtime) VALUES (?, ?, ?)
+                   ON CONFLICT (dir_key, name) DO UPDATE SET mtime = excluded.mtime""",
+                (dir_key, parts[-1], folder_mtime)
+            )
+            conn.execute(
+                """INSERT OR REPLACE INTO files (dir_key, folder, name, size, mtime, md5, sha256)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (dir_key, parts[-1], os.path.basename(file_path), stat.st_size, stat.st_mtime,
+                 digests.get('md5'), digests.get('sha256'))
+            )
+            _bump_generation(conn)
+    except Exception as e:
+        logging.error(f"更新提交索引失败: {file_path}, 错误: {e}")
+
+
+def get_file_digest(file_path):
+    """
+    获取上传时记录的文件校验和
+
+    只有当文件的大小和修改时间与索引记录一致时才返回，文件被修改过则返回None。
+
+    Args:
+        file_path (str): 学生文件夹中的文件路径
+
+    Returns:
+        dict: 包含 md5 和 sha256 的字典，没有可用记录时返回None
+    """
+    parts = _relative_parts(file_path)
+    if not parts or len(parts) < 4:
+        return None
+
+    row = _connect().execute(
+        'SELECT size, mtime, md5, sha256 FROM files WHERE dir_key = ? AND folder = ? AND name = ?',
+        ('/'.join(parts[:-2]), parts[-2], parts[-1])
+    ).fetchone()
+    if not row or not row[2]:
+        return None
+    size, mtime, md5, sha256 = row
+
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if stat.st_size != size or stat.st_mtime != mtime:
+        return None
+    return {'md5': md5, 'sha256': sha256}
+
+
+def remove_path(path):
+    """
+    删除目录后增量更新索引
+
+    可以是学生文件夹、作业目录或更上层的班级/课程目录。
+
+    Args:
+        path (str): 已删除的目录路径
+    """
+    parts = _relative_parts(path)
+    if not parts:
+        return
+
+    key = '/'.join(parts)
+    parent, _, name = key.rpartition('/')
+    try:
+        with sqlite_db.transaction(_connect()) as conn:
+            changed = 0
+            # 目录本身或其下层的作业目录
+            for table in ('dirs', 'folders', 'files'):
+                changed += conn.execute(
+                    f"DELETE FROM {table} WHERE dir_key = ? OR (dir_key >= ? AND dir_key < ?)",
+                    (key, *sqlite_db.subpath_range(key))
+                ).rowcount
+            # 作业目录下的学生文件夹
+            if parent:
+                changed += conn.execute('DELETE FROM folders WHERE dir_key = ? AND name = ?',
+                                        (parent, name)).rowcount
+                conn.execute('DELETE FROM files WHERE dir_key = ? AND folder = ?', (parent, name))
+            if changed:
+                _bump_generation(conn)
+    except Exception as e:
+        logging.error(f"更新提交索引失败: {path}, 错误: {e}")
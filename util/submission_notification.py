@@ -14,15 +14,15 @@ import os
 import json
 import hashlib
 import logging
-import smtplib
 import time
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 
-from util.config import SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD
+from util.config import SMTP_USERNAME
 from util.models import load_users
+from util import file_store, submission_index, mail_outbox, email_render
 
 # 存储提交记录的文件
 SUBMISSIONS_RECORD_FILE = 'data/submissions_record.json'
@@ -30,6 +30,9 @@ SUBMISSIONS_RECORD_FILE = 'data/submissions_record.json'
 # 提交冷却时间(秒) - 在此时间内多次上传只会发送一封邮件
 SUBMISSION_COOLDOWN = 120  # 两分钟
 
+# 上传后延迟发送提交通知的时间(秒) - 延迟期内的再次上传会重新计时，等待所有文件上传完成
+SUBMISSION_NOTIFICATION_DELAY = 15
+
 def calculate_md5(file_path):
     """
     计算文件的MD5校验和
@@ -64,7 +67,9 @@ def calculate_folder_md5(folder_path):
         for file in sorted(files):  # 排序以确保一致性
             file_path = os.path.join(root, file)
             if os.path.isfile(file_path):
-                file_md5 = calculate_md5(file_path)
+                # 优先使用上传时记录的校验和，避免重新读取文件
+                digest = submission_index.get_file_digest(file_path)
+                file_md5 = digest['md5'] if digest else calculate_md5(file_path)
                 files_md5.append(f"{file}:{file_md5}")
     
     # 将所有文件的MD5组合起来，再计算一个总的MD5值
@@ -96,8 +101,7 @@ def save_submissions_record(record):
         record (dict): 提交记录字典
     """
     try:
-        with open(SUBMISSIONS_RECORD_FILE, 'w', encoding='utf-8') as f:
-            json.dump(record, f, ensure_ascii=False, indent=2)
+        file_store.write_json(SUBMISSIONS_RECORD_FILE, record)
     except Exception as e:
         logging.error(f"保存提交记录失败: {e}")
 
@@ -120,43 +124,42 @@ def check_submission_changed(student_id, username, course, assignment, folder_pa
     if not current_md5:
         return False
     
-    # 加载历史记录
-    records = load_submissions_record()
-    
-    # 查找该学生、该作业的记录
-    student_key = f"{student_id}_{username}"
-    if student_key not in records:
-        records[student_key] = {}
-    
-    assignment_key = f"{course}_{assignment}"
-    if assignment_key not in records[student_key]:
-        records[student_key][assignment_key] = {
-            "md5": "", 
-            "notified": False,
-            "last_upload_time": 0,
-            "notification_cooldown": 0
-        }
-    
-    # 更新上传时间
-    current_time = time.time()
-    records[student_key][assignment_key]["last_upload_time"] = current_time
-    
-    # 检查MD5是否变化
-    previous_md5 = records[student_key][assignment_key]["md5"]
-    has_changed = previous_md5 != current_md5
-    
-    if has_changed:
-        # 更新记录
-        records[student_key][assignment_key]["md5"] = current_md5
+    def update_record(records):
+        # 查找该学生、该作业的记录
+        student_key = f"{student_id}_{username}"
+        if student_key not in records:
+            records[student_key] = {}
+        
+        assignment_key = f"{course}_{assignment}"
+        if assignment_key not in records[student_key]:
+            records[student_key][assignment_key] = {
+                "md5": "", 
+                "notified": False,
+                "last_upload_time": 0,
+                "notification_cooldown": 0
+            }
+        
+        # 更新上传时间
+        current_time = time.time()
+        records[student_key][assignment_key]["last_upload_time"] = current_time
+        
+        # 检查MD5是否变化
+        previous_md5 = records[student_key][assignment_key]["md5"]
+        has_changed = previous_md5 != current_md5
+        
+        if has_changed:
+            # 更新记录
+            records[student_key][assignment_key]["md5"] = current_md5
+            
+            # 只在冷却期过后才重置通知状态
+            last_notification = records[student_key][assignment_key].get("notification_cooldown", 0)
+            if current_time - last_notification > SUBMISSION_COOLDOWN:
+                records[student_key][assignment_key]["notified"] = False
         
-        # 只在冷却期过后才重置通知状态
-        last_notification = records[student_key][assignment_key].get("notification_cooldown", 0)
-        if current_time - last_notification > SUBMISSION_COOLDOWN:
-            records[student_key][assignment_key]["notified"] = False
-    
-    save_submissions_record(records)
+        return has_changed
     
-    return has_changed
+    # 加锁更新历史记录，避免与其他通知线程互相覆盖
+    return file_store.update_json(SUBMISSIONS_RECORD_FILE, update_record)
 
 def should_send_notification(student_id, username, course, assignment):
     """
@@ -207,22 +210,21 @@ def mark_as_notified(student_id, username, course, assignment):
         course (str): 课程名
         assignment (str): 作业名
     """
-    # 加载记录
-    records = load_submissions_record()
-    
-    # 查找该学生、该作业的记录
-    student_key = f"{student_id}_{username}"
-    if student_key not in records:
-        return
-    
-    assignment_key = f"{course}_{assignment}"
-    if assignment_key not in records[student_key]:
-        return
+    def update_record(records):
+        # 查找该学生、该作业的记录
+        student_key = f"{student_id}_{username}"
+        if student_key not in records:
+            return
+        
+        assignment_key = f"{course}_{assignment}"
+        if assignment_key not in records[student_key]:
+            return
+        
+        # 标记为已通知，并记录通知时间
+        records[student_key][assignment_key]["notified"] = True
+        records[student_key][assignment_key]["notification_cooldown"] = time.time()
     
-    # 标记为已通知，并记录通知时间
-    records[student_key][assignment_key]["notified"] = True
-    records[student_key][assignment_key]["notification_cooldown"] = time.time()
-    save_submissions_record(records)
+    file_store.update_json(SUBMISSIONS_RECORD_FILE, update_record)
 
 def get_submission_files_info(folder_path):
     """
@@ -284,127 +286,24 @@ def generate_submission_email(username, student_id, course, assignment, due_date
     Returns:
         str: 邮件HTML内容
     """
-    # 生成文件列表HTML
-    files_html = ""
-    for idx, file in enumerate(files_info, 1):
-        files_html += f"""
-        <tr>
-            <td style="padding: 8px; border-bottom: 1px solid #eee;">{idx}</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee;">{file['name']}</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee;">{file['size']}</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee;">{file['time']}</td>
-        </tr>
-        """
-    
-    # 当前时间
-    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    # 邮件HTML模板
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>作业提交确认</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                background-color: #4f46e5;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 5px 5px 0 0;
-            }}
-            .content {{
-                background-color: #f9fafb;
-                padding: 20px;
-                border-radius: 0 0 5px 5px;
-                border: 1px solid #e5e7eb;
-                border-top: none;
-            }}
-            .info-item {{
-                margin-bottom: 10px;
-            }}
-            .info-label {{
-                font-weight: bold;
-                color: #4f46e5;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin: 20px 0;
-            }}
-            th {{
-                background-color: #f3f4f6;
-                padding: 10px;
-                text-align: left;
-            }}
-            .footer {{
-                margin-top: 30px;
-                text-align: center;
-                color: #6b7280;
-                font-size: 12px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h2>作业提交确认</h2>
-        </div>
-        <div class="content">
-            <p>亲爱的 {username} 同学，您好：</p>
-            <p>系统已经收到您的作业提交。以下是提交详情：</p>
-            
-            <div class="info-item">
-                <span class="info-label">学号：</span> {student_id}
-            </div>
-            <div class="info-item">
-                <span class="info-label">课程：</span> {course}
-            </div>
-            <div class="info-item">
-                <span class="info-label">作业：</span> {assignment}
-            </div>
-            <div class="info-item">
-                <span class="info-label">截止日期：</span> {due_date_str}
-            </div>
-            <div class="info-item">
-                <span class="info-label">提交时间：</span> {now}
-            </div>
-            
-            <h3>提交的文件清单（共 {len(files_info)} 个文件）</h3>
-            <table>
-                <thead>
-                    <tr>
-                        <th>序号</th>
-                        <th>文件名</th>
-                        <th>大小</th>
-                        <th>上传时间</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {files_html}
-                </tbody>
-            </table>
-            
-            <p>您可以随时登录系统查看提交状态。如有任何问题，请联系学习委员。</p>
-            <p>祝学习愉快！</p>
-        </div>
-        <div class="footer">
-            <p>此邮件由系统自动发送，请勿回复。</p>
-            <p>&copy; 2025 作业提交系统 | 遥感科学与技术 | 中山大学</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html
+    # 文件列表的每一行使用同一个预编译模板
+    row_template = email_render.get_template('submission_file_row.html')
+    files_rows = ''.join(
+        row_template.render(idx=idx, name=file['name'], size=file['size'], time=file['time'])
+        for idx, file in enumerate(files_info, 1)
+    )
+    
+    return email_render.render(
+        'submission_html.html',
+        username=username,
+        student_id=student_id,
+        course=course,
+        assignment=assignment,
+        due_date=due_date_str,
+        now=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        file_count=len(files_info),
+        files_rows=files_rows
+    )
 
 def send_submission_notification(email, username, student_id, course, assignment, due_date_str, files_info):
     """
@@ -420,7 +319,7 @@ def send_submission_notification(email, username, student_id, course, assignment
         files_info (list): 文件信息列表
         
     Returns:
-        bool: 是否发送成功
+        bool: 是否成功加入发件箱
     """
     try:
         # 创建邮件
@@ -435,32 +334,18 @@ def send_submission_notification(email, username, student_id, course, assignment
         )
         
         # 生成纯文本内容
-        text_content = f"""
-        亲爱的 {username} 同学，您好：
-        
-        系统已经收到您的作业提交。以下是提交详情：
-        
-        学号：{student_id}
-        课程：{course}
-        作业：{assignment}
-        截止日期：{due_date_str}
-        提交时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        
-        提交的文件清单（共 {len(files_info)} 个文件）：
-        """
-        
-        for idx, file in enumerate(files_info, 1):
-            text_content += f"\n{idx}. {file['name']} ({file['size']}) - {file['time']}"
-        
-        text_content += """
-        
-        您可以随时登录系统查看提交状态。如有任何问题，请联系您的任课教师。
-        
-        祝学习愉快！
-        
-        此邮件由系统自动发送，请勿回复。
-        © 2025 作业提交系统 | 遥感科学与技术 | 中山大学
-        """
+        text_content = email_render.render(
+            'submission_txt.txt',
+            username=username,
+            student_id=student_id,
+            course=course,
+            assignment=assignment,
+            due_date=due_date_str,
+            now=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            file_count=len(files_info),
+            files_list='\n'.join(f"{idx}. {file['name']} ({file['size']}) - {file['time']}"
+                                  for idx, file in enumerate(files_info, 1))
+        )
         
         # 添加两种格式的内容
         part1 = MIMEText(text_content, 'plain', 'utf-8')
@@ -471,13 +356,12 @@ def send_submission_notification(email, username, student_id, course, assignment
         msg.attach(part1)
         msg.attach(part2)
         
-        # 发送邮件
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_USERNAME, [email], msg.as_string())
+        # 写入发件箱，由发送线程投递；同一份提交内容只通知一次
+        files_digest = hashlib.sha1(json.dumps(files_info, sort_keys=True).encode('utf-8')).hexdigest()
+        mail_outbox.enqueue(msg, [email], 'submission_notification',
+                            dedup_key=f"submission:{student_id}:{course}:{assignment}:{files_digest}")
         
-        logging.info(f'提交通知邮件已发送至 {email} (学号: {student_id}, 课程: {course}, 作业: {assignment})')
+        logging.info(f'提交通知邮件已加入发件箱: {email} (学号: {student_id}, 课程: {course}, 作业: {assignment})')
         return True
     except Exception as e:
         logging.error(f'发送提交通知邮件失败: {e}')
@@ -493,7 +377,7 @@ def process_submission_notification(username, course, assignment, student_folder
         assignment (str): 作业名
         student_folder (str): 学生文件夹路径
     """
-    from util.utils import load_assignments
+    from util.assignment_repo import find_assignment
     
     try:
         # 加载用户信息
@@ -514,18 +398,13 @@ def process_submission_notification(username, course, assignment, student_folder
         has_changed = check_submission_changed(student_id, username, course, assignment, student_folder)
         logging.info(f"提交检查: 用户={username}, 课程={course}, 作业={assignment}, 有变化={has_changed}")
         
-        # 延迟处理，等待所有文件上传完成
-        # 这样可以确保在短时间内上传多个文件时，只发送一封邮件
-        time.sleep(10)  # 等待10秒，确保文件上传完成
-        
-        # 再次检查是否应该发送通知，避免同时启动多个通知线程
+        # 检查是否应该发送通知（冷却时间内不重复发送）
         if not should_send_notification(student_id, username, course, assignment) or not has_changed:
             logging.info(f"不需要发送通知: {username} (学号: {student_id}, 课程: {course}, 作业: {assignment})")
             return
         
         # 获取作业详情
-        assignments = load_assignments()
-        assignment_obj = next((a for a in assignments if a['course'] == course and a['name'] == assignment), None)
+        assignment_obj = find_assignment(course, assignment)
         
         # 获取截止日期
         due_date_str = "未设置"
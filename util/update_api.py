@@ -16,6 +16,8 @@ import hashlib
 from flask import Blueprint, jsonify, send_from_directory, current_app, request
 import datetime
 
+from util import file_cache, file_store
+
 update_api_bp = Blueprint('update_api', __name__)
 
 # 更新包存储目录
@@ -58,14 +60,19 @@ def ensure_updates_dir():
         with open(version_file, 'w', encoding='utf-8') as f:
             json.dump(default_version, f, ensure_ascii=False, indent=2)
 
-# 获取版本信息
+# 获取版本信息（每个请求都会读取，按文件修改时间缓存）
 def get_version_info():
     version_file = os.path.join(UPDATES_DIR, 'version_info.json')
     
-    if os.path.exists(version_file):
-        with open(version_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    try:
+        return file_cache.load_json(version_file)
+    except FileNotFoundError:
+        return {}
+
+# 保存版本信息
+def save_version_info(version_info):
+    version_file = os.path.join(UPDATES_DIR, 'version_info.json')
+    file_store.write_json(version_file, version_info)
 
 # 计算文件MD5
 def calculate_md5(file_path):
@@ -94,9 +101,7 @@ def initialize_updates():
     
     # 如果有更新，保存版本信息
     if updated:
-        version_file = os.path.join(UPDATES_DIR, 'version_info.json')
-        with open(version_file, 'w', encoding='utf-8') as f:
-            json.dump(version_info, f, ensure_ascii=False, indent=2)
+        save_version_info(version_info)
 
 @update_api_bp.route('/check_update', methods=['GET'])
 def check_update():
@@ -181,9 +186,7 @@ def upload_version():
     })
     
     # 保存版本信息
-    version_file = os.path.join(UPDATES_DIR, 'version_info.json')
-    with open(version_file, 'w', encoding='utf-8') as f:
-        json.dump(version_info, f, ensure_ascii=False, indent=2)
+    save_version_info(version_info)
     
     return jsonify({
         'status': 'success',
@@ -0,0 +1,180 @@
+"""
+作业传输系统 - 流式上传模块
+
+本模块让上传文件在解析请求体时直接写入上传目录下的临时文件：
+- 边接收边计算文件大小、MD5 和 SHA-256，保存后不需要再次读取文件计算校验和
+- 超过文件大小限制或每日上传限额时立即中止，不再继续写入磁盘
+- 临时文件与最终存放位置位于同一文件系统，保存时直接重命名，不需要复制
+
+使用方式：在访问 request.files 之前调用 set_upload_limit() 设置本次请求的上限，
+上传文件的 stream 即为 HashingFile，可通过 commit() 移动到最终位置。
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+
+from flask import Request, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from util.config import UPLOAD_FOLDER
+
+# 上传临时文件目录（与上传目录位于同一文件系统）
+UPLOAD_TEMP_FOLDER = os.path.join(UPLOAD_FOLDER, 'temp', 'incoming')
+
+# 保存本次请求上传限制的 environ 键
+UPLOAD_LIMIT_KEY = 'starvortex.upload_limit'
+
+
+class UploadLimitExceeded(RequestEntityTooLarge):
+    """上传过程中超过大小限制或每日限额"""
+
+
+class HashingFile:
+    """
+    写入时计算大小和校验和的临时文件
+
+    提供 Werkzeug 解析上传文件所需的 write/read/seek 接口。
+    """
+
+    def __init__(self, limit=None, limit_message=None, path=None):
+        if path is None:
+            os.makedirs(UPLOAD_TEMP_FOLDER, exist_ok=True)
+            fd, self.temp_path = tempfile.mkstemp(dir=UPLOAD_TEMP_FOLDER, suffix='.part')
+            self._file = os.fdopen(fd, 'w+b')
+        else:
+            self.temp_path = path
+            self._file = open(path, 'r+b')
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+        self.limit = limit
+        self.limit_message = limit_message
+
+    @classmethod
+    def from_path(cls, path, buffer_size=1024 * 1024):
+        """
+        包装一个已经写好的临时文件（如合并完成的分片上传），读取一遍计算校验和
+
+        Args:
+            path (str): 上传目录下的临时文件路径，提交后会被移动
+        """
+        hashing_file = cls(path=path)
+        for chunk in iter(lambda: hashing_file._file.read(buffer_size), b''):
+            hashing_file.size += len(chunk)
+            hashing_file._md5.update(chunk)
+            hashing_file._sha256.update(chunk)
+        hashing_file._file.seek(0)
+        return hashing_file
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            self.discard()
+            raise UploadLimitExceeded(self.limit_message)
+        self._md5.update(data)
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        return self._file.flush()
+
+    def close(self):
+        self.discard()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    @property
+    def digests(self):
+        """文件的 MD5 和 SHA-256（十六进制）"""
+        return {'md5': self._md5.hexdigest(), 'sha256': self._sha256.hexdigest()}
+
+    def commit(self, file_path):
+        """
+        将临时文件移动到最终位置
+
+        Args:
+            file_path (str): 目标文件路径
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.chmod(self.temp_path, 0o644)
+        os.replace(self.temp_path, file_path)
+        self.temp_path = None
+
+    def discard(self):
+        """关闭并删除临时文件（已提交时不做任何操作）"""
+        if not self._file.closed:
+            self._file.close()
+        if self.temp_path:
+            try:
+                os.remove(self.temp_path)
+            except OSError as e:
+                logging.warning(f"删除上传临时文件失败: {self.temp_path}, 错误: {e}")
+            self.temp_path = None
+
+    def __del__(self):
+        # 请求结束时未提交的临时文件（如校验失败）随对象一起清理
+        try:
+            self.discard()
+        except Exception:
+            pass
+
+
+class StreamingRequest(Request):
+    """上传文件直接写入 HashingFile 的请求类"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        limit, message = self.environ.get(UPLOAD_LIMIT_KEY, (None, None))
+        return HashingFile(limit, message)
+
+
+def set_upload_limit(limit_bytes, message):
+    """
+    设置当前请求上传文件的字节数上限，需在访问 request.files 之前调用
+
+    Args:
+        limit_bytes (int): 允许的最大字节数
+        message (str): 超出限制时返回的提示信息
+    """
+    request.environ[UPLOAD_LIMIT_KEY] = (limit_bytes, message)
+
+
+def save_upload(file, file_path):
+    """
+    保存上传文件
+
+    Args:
+        file: werkzeug FileStorage 对象
+        file_path (str): 目标文件路径
+
+    Returns:
+        dict: 文件的 size/md5/sha256，非流式上传时返回None
+    """
+    stream = file.stream
+    if isinstance(stream, HashingFile):
+        stream.commit(file_path)
+        return {'size': stream.size, **stream.digests}
+
+    file.save(file_path)
+    return None
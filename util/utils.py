@@ -6,7 +6,7 @@
 - 验证码生成和管理
 - 文件压缩与处理
 - 文件大小格式化
-- 课程配置和作业数据的加载与保存
+- 课程配置和作业数据的加载与保存（通过 util.storage 中配置的存储后端）
 
 module包含以下主要组件：
 - 验证码临时存储字典
@@ -20,10 +20,8 @@ module包含以下主要组件：
 """
 
 import os
-import json
 import logging
 import zipfile
-import smtplib
 import random
 import datetime
 from email.mime.text import MIMEText
@@ -31,9 +29,11 @@ from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr
 
 from util.config import (
-    SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD,
-    COURSE_CONFIG_FILE, ASSIGNMENTS_FILE, VERIFICATION_CODE_LENGTH
+    SMTP_USERNAME,
+    VERIFICATION_CODE_LENGTH
 )
+from util.storage import get_storage
+from util import mail_transport, email_render
 
 # 验证码存储 (内存字典，重启后会清空)
 verification_codes = {}
@@ -59,16 +59,10 @@ def send_verification_email(email, code):
         msg['Subject'] = '作业提交系统 - 注册验证码'
 
         # 纯文本邮件内容（兼容不支持HTML的邮件客户端）
-        with open(r'util/email_content/verification_txt.txt', 'r', encoding='utf-8') as f:
-            text_content = f.read()
-        # 替换验证码占位符
-        text_content = text_content.format(code=code)
+        text_content = email_render.render('verification_txt.txt', code=code)
         
         # HTML邮件内容
-        with open(r'util/email_content/verification_html.html', 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        # 替换验证码占位符
-        html_content = html_content.format(code=code, year=datetime.datetime.now().year)
+        html_content = email_render.render('verification_html.html', code=code, year=datetime.datetime.now().year)
         
         # 添加两种格式的内容
         part1 = MIMEText(text_content, 'plain', 'utf-8')
@@ -80,10 +74,7 @@ def send_verification_email(email, code):
         msg.attach(part2)
 
         # 发送邮件
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_USERNAME, [email], msg.as_string())
+        mail_transport.send_mail(SMTP_USERNAME, [email], msg)
         
         logging.info(f'Verification email sent to {email}')
         return True
@@ -110,15 +101,10 @@ def send_reset_password_email(email, code):
         msg['Subject'] = '作业提交系统 - 密码重置验证码'
 
         # 纯文本邮件内容（兼容不支持HTML的邮件客户端）
-        with open(r'util/email_content/reset_password_txt.txt', 'r', encoding='utf-8') as f:
-            text_content = f.read()
-        text_content = text_content.format(code=code)
+        text_content = email_render.render('reset_password_txt.txt', code=code)
         
         # HTML邮件内容
-        with open(r'util/email_content/reset_password_html.html', 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        # 替换验证码占位符
-        html_content = html_content.format(code=code, year=datetime.datetime.now().year)
+        html_content = email_render.render('reset_password_html.html', code=code, year=datetime.datetime.now().year)
         
         # 添加两种格式的内容
         part1 = MIMEText(text_content, 'plain', 'utf-8')
@@ -130,10 +116,7 @@ def send_reset_password_email(email, code):
         msg.attach(part2)
 
         # 发送邮件
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_USERNAME, [email], msg.as_string())
+        mail_transport.send_mail(SMTP_USERNAME, [email], msg)
         
         logging.info(f'Reset password email sent to {email}')
         return True
@@ -190,39 +173,37 @@ def format_file_size(size_bytes):
 
 def load_course_config():
     """加载课程配置"""
-    try:
-        with open(COURSE_CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+    config = get_storage().load_course_config()
+    if config is not None:
+        # 检查是否使用旧格式
+        if 'courses' in config and 'classes' not in config:
+            # 转换为新格式的临时结构，避免其他代码错误
+            logging.warning("检测到旧版课程配置格式，建议运行数据迁移脚本")
+            # 创建一个默认班级，包含所有课程
+            default_class = {
+                "name": "默认班级",
+                "description": "系统自动创建的默认班级",
+                "courses": []
+            }
             
-            # 检查是否使用旧格式
-            if 'courses' in config and 'classes' not in config:
-                # 转换为新格式的临时结构，避免其他代码错误
-                logging.warning("检测到旧版课程配置格式，建议运行数据迁移脚本")
-                # 创建一个默认班级，包含所有课程
-                default_class = {
-                    "name": "默认班级",
-                    "description": "系统自动创建的默认班级",
-                    "courses": []
-                }
-                
-                # 将旧结构中的课程添加到默认班级
-                for course in config.get('courses', []):
-                    course_copy = course.copy()
-                    # 移除classes字段，因为新结构中课程不包含班级
-                    if 'classes' in course_copy:
-                        del course_copy['classes']
-                    default_class['courses'].append(course_copy)
-                
-                # 创建新格式配置
-                new_config = {"classes": [default_class]}
-                return new_config
+            # 将旧结构中的课程添加到默认班级
+            for course in config.get('courses', []):
+                course_copy = course.copy()
+                # 移除classes字段，因为新结构中课程不包含班级
+                if 'classes' in course_copy:
+                    del course_copy['classes']
+                default_class['courses'].append(course_copy)
+            
+            # 创建新格式配置
+            new_config = {"classes": [default_class]}
+            return new_config
+        
+        # 确保classes字段存在
+        if 'classes' not in config:
+            config['classes'] = []
             
-            # 确保classes字段存在
-            if 'classes' not in config:
-                config['classes'] = []
-                
-            return config
-    except FileNotFoundError:
+        return config
+    else:
         # 默认配置 - 使用新结构
         default_config = {
             "classes": [
@@ -257,22 +238,24 @@ def load_course_config():
             ]
         }
         # 创建默认配置文件
-        with open(COURSE_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(default_config, f, ensure_ascii=False, indent=2)
+        save_course_config(default_config)
         return default_config
 
+def save_course_config(config):
+    """保存课程配置"""
+    get_storage().save_course_config(config)
+
 def load_assignments():
     """加载作业列表"""
-    try:
-        with open(ASSIGNMENTS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+    return get_storage().load_assignments()
 
 def save_assignments(assignments):
     """保存作业列表"""
-    with open(ASSIGNMENTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(assignments, f, ensure_ascii=False, indent=2)
+    get_storage().save_assignments(assignments)
+
+def get_data_version():
+    """获取作业列表和课程配置的版本，依赖这些数据的缓存据此判断是否需要重建"""
+    return get_storage().data_version()
 
 def get_all_classes():
     """获取所有班级列表"""
@@ -286,4 +269,24 @@ def get_all_courses():
     for class_info in config.get('classes', []):
         for course in class_info.get('courses', []):
             courses.append(course['name'])
-    return list(set(courses))  # 去重
\ No newline at end of file
+    return list(set(courses))  # 去重
+
+def get_assignment_classes(assignment, config):
+    """
+    获取作业适用的班级，作业未指定班级时从课程配置中查找所有包含该课程与作业的班级
+    
+    Args:
+        assignment (dict): 作业数据
+        config (dict): 课程配置
+    
+    Returns:
+        list: 班级名称列表
+    """
+    class_names = list(assignment.get('classNames', []))
+    if not class_names:
+        for class_info in config.get('classes', []):
+            for course_info in class_info.get('courses', []):
+                if (course_info['name'] == assignment['course'] and
+                        assignment['name'] in course_info.get('assignments', [])):
+                    class_names.append(class_info['name'])
+    return class_names
\ No newline at end of file
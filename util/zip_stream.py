@@ -0,0 +1,343 @@
+"""
+作业传输系统 - 流式 ZIP 打包模块
+
+本模块边读取文件边生成 ZIP 数据，可以直接写入 HTTP 响应，也可以写入文件：
+- 不在磁盘上生成临时压缩包，下载开始后立即返回第一个字节
+- 文件按 1MB 分块，在线程池中并行压缩（zlib 压缩时释放 GIL，可以利用多个CPU核心），
+  各块以 Z_FULL_FLUSH 结尾，按顺序拼接后即为完整的 deflate 数据
+- 按文件类型和数据熵选择压缩级别：已经压缩过的类型（zip/rar/mp4/jpg/pdf 等）
+  和接近随机的数据直接存储，压缩收益有限的数据使用最快级别，文本等数据使用默认级别
+- 文件大小和写入位置超过 4GB 时自动使用 ZIP64 格式
+
+作者: Frank
+版本: 1.0
+日期: 2026-10-17
+"""
+
+import os
+import time
+import zlib
+import struct
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from flask import Response
+
+try:
+    from util.config import ARCHIVE_WORKERS
+except ImportError:
+    ARCHIVE_WORKERS = min(8, os.cpu_count() or 2)
+
+# 本身已经压缩过的文件类型，再次压缩几乎没有收益
+STORED_EXTENSIONS = {
+    'zip', 'rar', '7z', 'gz', 'tgz', 'bz2', 'xz',
+    'mp4', 'mov', 'avi', 'mkv', 'webm', 'flv', 'wmv', 'mp3', 'aac', 'm4a', 'flac', 'ogg',
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'heic',
+    'pdf', 'docx', 'xlsx', 'pptx'
+}
+
+# 压缩分块大小
+BLOCK_SIZE = 1024 * 1024
+
+# 估计数据熵时采样的字节数
+ENTROPY_SAMPLE_SIZE = 64 * 1024
+
+# 压缩方式
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# 超过该值的大小或偏移需要使用 ZIP64 字段
+ZIP64_LIMIT = 0xFFFFFFFF
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """获取共享的压缩线程池"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ARCHIVE_WORKERS, thread_name_prefix='zip')
+    return _executor
+
+
+def compress_type_for(filename):
+    """
+    根据文件类型选择压缩方式
+
+    Args:
+        filename (str): 文件名
+
+    Returns:
+        int: ZIP_STORED 或 ZIP_DEFLATED
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return ZIP_STORED if extension in STORED_EXTENSIONS else ZIP_DEFLATED
+
+
+def choose_level(filename, sample):
+    """
+    根据文件类型和数据熵选择压缩级别
+
+    Args:
+        filename (str): 文件名
+        sample (bytes): 文件开头的数据
+
+    Returns:
+        int: zlib 压缩级别，0 表示直接存储
+    """
+    if not sample or compress_type_for(filename) == ZIP_STORED:
+        return 0
+
+    sample = sample[:ENTROPY_SAMPLE_SIZE]
+    ratio = len(zlib.compress(sample, 1)) / len(sample)
+    if ratio > 0.9:
+        return 0   # 接近随机的数据（加密、已压缩），直接存储
+    if ratio > 0.6:
+        return 1   # 压缩收益有限，使用最快级别
+    return 6       # 文本等高度可压缩的数据
+
+
+def _compress_block(data, level, last):
+    """压缩一个数据块，非最后一块以 Z_FULL_FLUSH 结尾，以便与后续块直接拼接"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+
+
+def _dos_datetime(mtime):
+    """将修改时间转换为 ZIP 使用的 DOS 日期和时间"""
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (0 << 9) | (1 << 5) | 1
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class _Entry:
+    """正在写入的压缩包条目"""
+
+    def __init__(self, arcname, mtime, size, level):
+        self.name = arcname.replace(os.sep, '/').encode('utf-8')
+        self.flags = 0x08 | (0x800 if not arcname.isascii() else 0)  # 数据描述符 | UTF-8 文件名
+        self.method = ZIP_DEFLATED if level else ZIP_STORED
+        self.dos_time, self.dos_date = _dos_datetime(mtime)
+        self.zip64 = size >= ZIP64_LIMIT
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.offset = 0
+
+
+class _ZipWriter:
+    """生成 ZIP 文件各部分的字节数据"""
+
+    def __init__(self):
+        self.offset = 0
+        self.entries = []
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def local_header(self, entry):
+        entry.offset = self.offset
+        version = 45 if entry.zip64 else 20
+        if entry.zip64:
+            extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0)
+            sizes = (ZIP64_LIMIT, ZIP64_LIMIT)
+        else:
+            extra = b''
+            sizes = (0, 0)
+        header = struct.pack('<IHHHHHIIIHH', 0x04034b50, version, entry.flags, entry.method,
+                             entry.dos_time, entry.dos_date, 0, *sizes, len(entry.name), len(extra))
+        return self._emit(header + entry.name + extra)
+
+    def data(self, entry, data):
+        entry.compressed_size += len(data)
+        return self._emit(data)
+
+    def data_descriptor(self, entry):
+        self.entries.append(entry)
+        if entry.zip64:
+            descriptor = struct.pack('<IIQQ', 0x08074b50, entry.crc, entry.compressed_size, entry.size)
+        else:
+            descriptor = struct.pack('<IIII', 0x08074b50, entry.crc, entry.compressed_size, entry.size)
+        return self._emit(descriptor)
+
+    def central_directory(self):
+        start = self.offset
+        records = []
+        for entry in self.entries:
+            # 超出32位范围的字段放入 ZIP64 扩展字段
+            zip64_fields = []
+            size = entry.size
+            compressed_size = entry.compressed_size
+            offset = entry.offset
+            if size >= ZIP64_LIMIT:
+                zip64_fields.append(size)
+                size = ZIP64_LIMIT
+            if compressed_size >= ZIP64_LIMIT:
+                zip64_fields.append(compressed_size)
+                compressed_size = ZIP64_LIMIT
+            if offset >= ZIP64_LIMIT:
+                zip64_fields.append(offset)
+                offset = ZIP64_LIMIT
+            extra = b''
+            if zip64_fields:
+                extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields)
+            version = 45 if (entry.zip64 or zip64_fields) else 20
+            records.append(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, entry.flags,
+                entry.method, entry.dos_time, entry.dos_date, entry.crc, compressed_size, size,
+                len(entry.name), len(extra), 0, 0, 0, 0o100644 << 16, offset
+            ) + entry.name + extra)
+        directory = self._emit(b''.join(records))
+
+        count = len(self.entries)
+        size = self.offset - start
+        end = b''
+        if count >= 0xFFFF or size >= ZIP64_LIMIT or start >= ZIP64_LIMIT:
+            zip64_end_offset = self.offset
+            end += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, (3 << 8) | 45, 45, 0, 0,
+                               count, count, size, start)
+            end += struct.pack('<IIQI', 0x07064b50, 0, zip64_end_offset, 1)
+            count, size, start = min(count, 0xFFFF), min(size, ZIP64_LIMIT), min(start, ZIP64_LIMIT)
+        end += struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count, count, size, start, 0)
+        return directory + self._emit(end)
+
+
+def _read_entries(entries, executor):
+    """
+    依次读取文件并提交压缩任务
+
+    Yields:
+        tuple: ('start', entry) / ('block', Future 或 bytes) / ('end', entry)
+    """
+    for file_path, arcname in entries:
+        try:
+            f = open(file_path, 'rb')
+        except FileNotFoundError:
+            # 文件在打包过程中被删除，跳过该文件
+            logging.warning(f"打包时文件不存在，已跳过: {file_path}")
+            continue
+
+        with f:
+            stat = os.fstat(f.fileno())
+            block = f.read(BLOCK_SIZE)
+            level = choose_level(arcname, block)
+            entry = _Entry(arcname, stat.st_mtime, stat.st_size, level)
+            yield 'start', entry
+
+            while block:
+                next_block = f.read(BLOCK_SIZE)
+                entry.crc = zlib.crc32(block, entry.crc)
+                entry.size += len(block)
+                if level:
+                    yield 'block', executor.submit(_compress_block, block, level, not next_block)
+                else:
+                    yield 'block', block
+                block = next_block
+
+            if level and entry.size == 0:
+                yield 'block', _compress_block(b'', level, True)
+            yield 'end', entry
+
+
+def iter_zip(entries):
+    """
+    生成 ZIP 数据
+
+    读取、并行压缩和输出以流水线方式进行，同时处理中的数据块数量有上限，内存占用固定。
+
+    Args:
+        entries (iterable): (文件路径, 压缩包内路径) 序列
+
+    Yields:
+        bytes: ZIP 数据块
+    """
+    executor = _get_executor()
+    writer = _ZipWriter()
+    window = deque()
+    max_pending = ARCHIVE_WORKERS * 4
+
+    def output(item):
+        kind, value = item
+        if kind == 'start':
+            current[0] = value
+            return writer.local_header(value)
+        if kind == 'block':
+            data = value if isinstance(value, bytes) else value.result()
+            return writer.data(current[0], data)
+        return writer.data_descriptor(value)
+
+    current = [None]
+    try:
+        for item in _read_entries(entries, executor):
+            window.append(item)
+            while len(window) > max_pending or (window and window[0][0] != 'block'):
+                yield output(window.popleft())
+        while window:
+            yield output(window.popleft())
+        yield writer.central_directory()
+    finally:
+        # 客户端中途断开时取消尚未开始的压缩任务
+        for kind, value in window:
+            if kind == 'block' and not isinstance(value, bytes):
+                value.cancel()
+
+
+def write_zip(entries, file_obj):
+    """
+    将 ZIP 数据写入文件对象
+
+    Args:
+        entries (iterable): (文件路径, 压缩包内路径) 序列
+        file_obj: 以二进制模式打开的文件对象
+    """
+    for data in iter_zip(entries):
+        file_obj.write(data)
+
+
+def folder_entries(folder_path, arc_prefix=''):
+    """
+    列出文件夹中的文件
+
+    Args:
+        folder_path (str): 文件夹路径
+        arc_prefix (str): 压缩包内的目录前缀
+
+    Returns:
+        list: (文件路径, 压缩包内路径) 列表
+    """
+    entries = []
+    for root, _, files in os.walk(folder_path):
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            arcname = os.path.relpath(file_path, folder_path)
+            entries.append((file_path, os.path.join(arc_prefix, arcname) if arc_prefix else arcname))
+    return entries
+
+
+def zip_response(entries, download_name):
+    """
+    返回流式 ZIP 下载响应
+
+    Args:
+        entries (iterable): (文件路径, 压缩包内路径) 序列
+        download_name (str): 下载文件名
+
+    Returns:
+        flask.Response: 分块传输的 ZIP 响应
+    """
+    ascii_name = download_name.encode('ascii', 'ignore').decode('ascii').replace('"', '') or 'download.zip'
+    headers = {
+        'Content-Disposition': f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name)}",
+        'X-Accel-Buffering': 'no'  # 反向代理不缓冲，尽快把数据发给客户端
+    }
+    return Response(iter_zip(entries), mimetype='application/zip', headers=headers, direct_passthrough=True)